@@ -0,0 +1,218 @@
+"""
+audio_capture.py
+
+Continuous microphone capture with voice-activity detection (VAD).
+
+- One sounddevice InputStream runs for the whole session and fills a
+  ring buffer of short frames (old audio is dropped if nobody reads it)
+- Energy + zero-crossing VAD with an adaptive noise floor (low percentile
+  of the last few seconds, so steady hum stops counting as speech)
+- `listen()` returns one utterance as soon as the speaker stops, instead
+  of always recording a fixed 3 s / 10 s window
+- A short pre-roll keeps the first syllable (e.g. the wake word) intact
+- sounddevice (PortAudio) is only imported when the stream is opened
+"""
+
+import collections
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Deque, Optional
+
+import numpy as np
+
+
+@dataclass
+class Utterance:
+    audio: np.ndarray        # float32 mono
+    samplerate: int
+    speech_end: float        # time.perf_counter() when the speaker stopped
+    detected_at: float       # time.perf_counter() when the cut was made
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / self.samplerate
+
+
+class VADCapture:
+    """Ring-buffered microphone input that cuts utterances at end-of-speech."""
+
+    def __init__(
+        self,
+        samplerate: int = 16000,
+        frame_ms: int = 30,
+        ring_seconds: float = 30.0,
+        pre_roll_ms: int = 300,
+        trigger_ms: int = 90,
+        hangover_ms: int = 600,
+        energy_margin_db: float = 10.0,
+        min_speech_db: float = -50.0,
+        zcr_max: float = 0.35,
+        noise_window_s: float = 5.0,
+        noise_percentile: float = 10.0,
+    ):
+        """
+        Args:
+            samplerate: Capture rate (Whisper expects 16 kHz)
+            frame_ms: VAD frame length
+            ring_seconds: Max. unread audio kept in the ring buffer
+            pre_roll_ms: Audio kept before the detected speech start
+            trigger_ms: Consecutive speech needed to start an utterance
+            hangover_ms: Silence needed to end an utterance
+            energy_margin_db: Speech must be this much louder than the noise floor
+            min_speech_db: Absolute lower bound for speech energy (dBFS)
+            zcr_max: Zero-crossing rate above which quiet frames count as noise
+            noise_window_s: History used for the noise floor
+            noise_percentile: Percentile of the frame energies taken as noise floor
+        """
+        self.samplerate = samplerate
+        self.frame_len = int(samplerate * frame_ms / 1000)
+        self.frame_s = self.frame_len / samplerate
+        self.pre_roll_frames = max(1, int(pre_roll_ms / frame_ms))
+        self.trigger_frames = max(1, int(trigger_ms / frame_ms))
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.energy_margin_db = energy_margin_db
+        self.min_speech_db = min_speech_db
+        self.zcr_max = zcr_max
+
+        self.noise_percentile = noise_percentile
+        self.noise_db = -60.0
+        # energies of all frames (speech included): the quiet end is the
+        # background, and a constant hum lifts the floor within the window.
+        # Seeded with the start value so the first loud frames are not the floor.
+        n = max(1, int(noise_window_s / self.frame_s))
+        self._recent_db: Deque[float] = collections.deque([self.noise_db] * n, maxlen=n)
+        self._ring: Deque[np.ndarray] = collections.deque(
+            maxlen=int(ring_seconds / self.frame_s)
+        )
+        self._cond = threading.Condition()
+        self._stream = None  # sounddevice.InputStream once started
+
+    # ------------------------------------------------------------------
+    def start(self):
+        if self._stream is not None:
+            return
+        import sounddevice as sd
+
+        self._stream = sd.InputStream(
+            samplerate=self.samplerate,
+            channels=1,
+            dtype="float32",
+            blocksize=self.frame_len,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def flush(self):
+        """Drop buffered audio (e.g. our own TTS output picked up by the mic)."""
+        with self._cond:
+            self._ring.clear()
+
+    def _callback(self, indata, frames, time_info, status):
+        with self._cond:
+            self._ring.append(indata[:, 0].copy())
+            self._cond.notify()
+
+    def _next_frame(self, timeout: float) -> Optional[np.ndarray]:
+        with self._cond:
+            if not self._ring and not self._cond.wait(timeout):
+                return None
+            return self._ring.popleft() if self._ring else None
+
+    # ------------------------------------------------------------------
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """Energy/zero-crossing decision for one frame; adapts the noise floor."""
+        rms = float(np.sqrt(np.mean(frame * frame)) + 1e-10)
+        db = 20.0 * math.log10(rms)
+        zcr = float(np.mean(np.abs(np.diff(np.signbit(frame).astype(np.int8)))))
+
+        loud = db > max(self.noise_db + self.energy_margin_db, self.min_speech_db)
+        # high ZCR is only accepted when clearly loud (fricatives), not for hiss
+        speech = loud and (zcr < self.zcr_max or db > self.noise_db + 2 * self.energy_margin_db)
+
+        self._recent_db.append(db)
+        self.noise_db = float(np.percentile(self._recent_db, self.noise_percentile))
+        return speech
+
+    def listen(
+        self,
+        max_seconds: float,
+        start_timeout: Optional[float] = None,
+        flush: bool = False,
+        stop: Optional[threading.Event] = None,
+        mute: Optional[Callable[[], bool]] = None,
+    ) -> Optional[Utterance]:
+        """
+        Block until one utterance was spoken and return it (cut at end-of-speech).
+
+        Args:
+            max_seconds: Hard limit for the utterance length
+            start_timeout: Give up (None) if no speech starts within this time
+            flush: Discard audio buffered before the call
+            stop: Give up (None) as soon as this event is set
+            mute: While this returns True (e.g. our own TTS is playing),
+                frames are dropped and no utterance can start
+        """
+        self.start()
+        if flush:
+            self.flush()
+
+        pre_roll: Deque[np.ndarray] = collections.deque(maxlen=self.pre_roll_frames)
+        frames = []
+        speech_run = 0
+        silence_run = 0
+        in_speech = False
+        waited = 0.0
+        max_frames = int(max_seconds / self.frame_s)
+
+        while True:
+            if stop is not None and stop.is_set():
+                return None
+            frame = self._next_frame(timeout=0.5)
+            if frame is None:
+                waited += 0.5
+                if not in_speech and start_timeout is not None and waited >= start_timeout:
+                    return None
+                continue
+
+            if mute is not None and mute():
+                pre_roll.clear()
+                frames = []
+                speech_run = 0
+                in_speech = False
+                continue
+
+            speech = self.is_speech(frame)
+
+            if not in_speech:
+                waited += self.frame_s
+                pre_roll.append(frame)
+                speech_run = speech_run + 1 if speech else 0
+                if speech_run >= self.trigger_frames:
+                    in_speech = True
+                    frames = list(pre_roll)
+                    silence_run = 0
+                elif start_timeout is not None and waited >= start_timeout:
+                    return None
+                continue
+
+            frames.append(frame)
+            silence_run = 0 if speech else silence_run + 1
+
+            if silence_run >= self.hangover_frames or len(frames) >= max_frames:
+                now = time.perf_counter()
+                # drop most of the trailing silence, Whisper does not need it
+                keep = len(frames) - max(0, silence_run - 3)
+                return Utterance(
+                    audio=np.concatenate(frames[:keep]).astype(np.float32),
+                    samplerate=self.samplerate,
+                    speech_end=now - silence_run * self.frame_s,
+                    detected_at=now,
+                )
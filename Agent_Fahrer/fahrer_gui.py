@@ -1,5 +1,7 @@
 import threading
 import queue
+import re
+import uuid
 import tkinter as tk
 from tkinter import scrolledtext
 from datetime import datetime, timedelta
@@ -23,12 +25,14 @@ class EssenMessage(Model):
     vegan: int
     glutenfrei: int
     client_sender: str
+    idempotency_key: str = ""
 
 
 class KaffeeMessage(Model):
     type: str
     zeit: str
     client_sender: str
+    idempotency_key: str = ""
 
 
 class HaustierMessage(Model):
@@ -38,6 +42,7 @@ class HaustierMessage(Model):
     betreuung_von: str
     betreuung_bis: str
     client_sender: str
+    idempotency_key: str = ""
 
 
 class HotelMessage(Model):
@@ -46,6 +51,7 @@ class HotelMessage(Model):
     zeit: str
     naechte: int
     client_sender: str
+    idempotency_key: str = ""
 
 
 class ParkplatzMessage(Model):
@@ -55,6 +61,8 @@ class ParkplatzMessage(Model):
     zeit: str
     reservation_id: str
     client_sender: str
+    idempotency_key: str = ""
+    von: str = ""   # Beginn "HH:MM" (leer = sofort), zeit = Ende
 
 
 class CentralServiceMessage(Model):
@@ -160,11 +168,14 @@ last_ctx = None
 @fahrerAgent.on_message(model=Message)
 async def on_message(ctx: Context, sender: str, msg: Message):
     display_sender = getattr(msg, "sender_name", None) or sender
+    text = getattr(msg, "message", "")
+    # parking confirmations end with "(RID=xxxx)"; needed for extend/release
+    rid = re.search(r"\(RID=([\w-]+)\)", text)
     message_queue.put(
         (
             display_sender,
-            getattr(msg, "message", ""),
-            getattr(msg, "reservation_id", None),
+            text,
+            rid.group(1) if rid else None,
         )
     )
 
@@ -182,6 +193,8 @@ async def process_commands(ctx: Context):
                 # Build central message with all selected service messages
                 msgs = []
                 now_str = datetime.now().strftime("%H:%M")
+                # one key per booking click; services replay their confirmation on retries
+                idempotency_key = str(uuid.uuid4())
 
                 # Parking
                 if data.get("park"):
@@ -195,6 +208,7 @@ async def process_commands(ctx: Context):
                         "zeit": data.get("park_zeit") or now_str,
                         "reservation_id": reservation_id,
                         "client_sender": fahrerAgent.address,
+                        "idempotency_key": idempotency_key,
                     }
                     msgs.append(park_msg)
 
@@ -209,6 +223,7 @@ async def process_commands(ctx: Context):
                         "vegan": 1 if food == "Vegan" else 0,
                         "glutenfrei": 1 if food == "Glutenfrei" else 0,
                         "client_sender": fahrerAgent.address,
+                        "idempotency_key": idempotency_key,
                     }
                     msgs.append(essen_msg)
 
@@ -220,6 +235,7 @@ async def process_commands(ctx: Context):
                         "zeit": data.get("hotel_time") or now_str,
                         "naechte": int(data.get("hotel_nights", 1)),
                         "client_sender": fahrerAgent.address,
+                        "idempotency_key": idempotency_key,
                     }
                     msgs.append(hotel_msg)
 
@@ -229,6 +245,7 @@ async def process_commands(ctx: Context):
                         "type": "kaffee",
                         "zeit": data.get("kaffee_time") or now_str,
                         "client_sender": fahrerAgent.address,
+                        "idempotency_key": idempotency_key,
                     }
                     msgs.append(kaffee_msg)
 
@@ -241,6 +258,7 @@ async def process_commands(ctx: Context):
                         "betreuung_von": data.get("pet_von"),
                         "betreuung_bis": data.get("pet_bis"),
                         "client_sender": fahrerAgent.address,
+                        "idempotency_key": idempotency_key,
                     }
                     msgs.append(haustier_msg)
 
@@ -256,18 +274,31 @@ async def process_commands(ctx: Context):
                 minutes = cmd.get("minutes", 30)
                 # Send an extend request via CentralService to keep GUI using only central
                 try:
-                    # reservation id not known at GUI level here; send empty and let central/parkplatz handle
                     extend_entry = {
                         "type": "parkplatz_extend",
-                        "reservation_id": "",
+                        "reservation_id": cmd["reservation_id"],
                         "minutes": int(minutes),
                         "client_sender": fahrerAgent.address,
+                        "idempotency_key": str(uuid.uuid4()),
                     }
                     central_msg = CentralServiceMessage(messages=[extend_entry])
                     await ctx.send(CENTRAL_SERVICE_ADDRESS, central_msg)
                     message_queue.put(("System", f"✓ Verlängerungs-Anfrage an CentralService gesendet (+{minutes}min)", None))
                 except Exception as e:
                     message_queue.put(("Error", f"✗ Fehler beim Senden der Verlängerung: {e}", None))
+            elif cmd["action"] == "release":
+                try:
+                    release_entry = {
+                        "type": "parkplatz_release",
+                        "reservation_id": cmd["reservation_id"],
+                        "client_sender": fahrerAgent.address,
+                        "idempotency_key": str(uuid.uuid4()),
+                    }
+                    central_msg = CentralServiceMessage(messages=[release_entry])
+                    await ctx.send(CENTRAL_SERVICE_ADDRESS, central_msg)
+                    message_queue.put(("System", f"✓ Freigabe von {cmd['reservation_id']} an CentralService gesendet", None))
+                except Exception as e:
+                    message_queue.put(("Error", f"✗ Fehler beim Senden der Freigabe: {e}", None))
             command_queue.task_done()
     except queue.Empty:
         pass
@@ -839,6 +870,18 @@ class FahrerGUI(ctk.CTk):
                 command=lambda m=minutes: self.extend(m)
             ).pack(side=tk.LEFT, padx=5)
 
+        ctk.CTkButton(
+            ext_frame,
+            text="🅿️ RELEASE",
+            width=100,
+            height=40,
+            corner_radius=10,
+            fg_color=self.colors["accent_purple"],
+            hover_color=self.lighten_color(self.colors["accent_purple"]),
+            font=("Rajdhani", 13, "bold"),
+            command=self.release
+        ).pack(side=tk.LEFT, padx=5)
+
         # Reservation info
         self.res_label = ctk.CTkLabel(
             parent,
@@ -1120,9 +1163,22 @@ class FahrerGUI(ctk.CTk):
 
     def extend(self, minutes: int):
         """Extend parking"""
-        command_queue.put({"action": "extend", "minutes": minutes})
+        if not self.last_reservation_id:
+            self.log_message("Error", "✗ No parking reservation to extend")
+            return
+        command_queue.put({"action": "extend", "minutes": minutes, "reservation_id": self.last_reservation_id})
         self.log_message("System", f"⏱️ Extension request: +{minutes} min")
 
+    def release(self):
+        """Release parking early"""
+        if not self.last_reservation_id:
+            self.log_message("Error", "✗ No parking reservation to release")
+            return
+        command_queue.put({"action": "release", "reservation_id": self.last_reservation_id})
+        self.log_message("System", f"🅿️ Release request: {self.last_reservation_id}")
+        self.last_reservation_id = None
+        self.res_label.configure(text="📋 Last Reservation: -")
+
     def lighten_color(self, hex_color):
         """Lighten a hex color"""
         hex_color = hex_color.lstrip('#')
@@ -9,12 +9,38 @@ LLM-based intent classifier for the Rest-Stop Voice Assistant.
     action: "parking|food|hotel|coffee|pet|help|unknown"
     parameters: { ... }
     confidence: 0.0 - 1.0
+- Deterministic German keyword matcher in front of the LLM for
+  unambiguous requests (no Ollama round-trip)
+- Pooled keep-alive HTTP session, prompt prefix built once and the model
+  kept loaded via Ollama's keep_alive
+- Cache of earlier LLM answers (exact + near-duplicate phrasings,
+  optionally persisted in SQLite)
+- Optional streaming: reading stops as soon as the JSON object is closed,
+  and the action can be reported before the parameters are generated
+- aclassify(): async, cancellable variant with deadline and in-flight limit
+- Optional hedging: a second (smaller) model races the first after a delay;
+  per-model latency and agreement statistics for tuning that delay
+- Offline LocalIntentClassifier (hashed n-grams, NumPy nearest-neighbour):
+  answers clear cases without the LLM and stands in when Ollama is down
 """
 
+import asyncio
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Callable, Deque, Dict, FrozenSet, List, Optional, Set, Tuple
 import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
 import requests
+import requests.adapters
 
 
 @dataclass
@@ -25,6 +51,613 @@ class Intent:
     original_text: str
 
 
+# ----------------------------------------------------------------------
+# Rule-based fast path
+# ----------------------------------------------------------------------
+
+NUMBER_WORDS = {
+    "ein": 1, "eine": 1, "einen": 1, "einer": 1, "eins": 1,
+    "zwei": 2, "drei": 3, "vier": 4, "fünf": 5, "fuenf": 5,
+    "sechs": 6, "sieben": 7, "acht": 8, "neun": 9, "zehn": 10,
+    "elf": 11, "zwölf": 12, "zwoelf": 12,
+    "fünfzehn": 15, "fuenfzehn": 15, "zwanzig": 20, "dreißig": 30, "dreissig": 30,
+    "vierzig": 40, "fünfundvierzig": 45, "fuenfundvierzig": 45,
+    "fünfzig": 50, "fuenfzig": 50, "sechzig": 60, "neunzig": 90,
+}
+_NUM = r"\b(\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r")"
+
+
+def _to_int(token: str) -> int:
+    return int(token) if token.isdigit() else NUMBER_WORDS[token]
+
+
+class RuleBasedIntentMatcher:
+    """
+    Keyword/pattern matcher for the closed rest-stop domain.
+
+    Returns an Intent only when exactly one action matches and all of its
+    key parameters are unambiguous; everything else goes to the LLM.
+    """
+
+    CONFIDENCE = 0.95
+
+    ACTIONS = {
+        "parking": r"\bpark|\bstellpl(a|ä)tz|\babstell",
+        "food": r"\bessen\b|\bmen(ü|ue)|\bgericht|\bmahlzeit|\brestaurant|\bmittagessen"
+                r"|\babendessen|\bfr(ü|ue)hst(ü|ue)ck|\bhunger|\bvegan|\bvegetari|\bglutenfrei",
+        "hotel": r"zimmer|\bhotel|(ü|ue)bernacht|\bn(ä|ae)chte\b",
+        "coffee": r"kaffee|\bcappuccino|\bespresso|\blatte\b|\bcaf(é|e)\b",
+        "pet": r"\bhund|\bkatze|\bhaustier|\btierbetreuung",
+    }
+    HELP = r"\bhilfe\b|\bhelfen\b|was kannst du|wie funktioniert"
+
+    VEHICLES = {
+        "PKW": r"\bpkw|\bauto\b|\bwagen\b|\be-auto|\belektroauto",
+        "LKW": r"\blkw|\blaster|\blastwagen|\btruck|\bsattelzug|\bbrummi",
+        "Bus": r"\bbus\b|\breisebus|\bbusse?\b",
+    }
+    FOOD_TYPES = {
+        "Vegan": r"\bvegan",
+        "Vegetarisch": r"\bvegetari",
+        "Glutenfrei": r"\bglutenfrei|\bohne gluten",
+        "Standard": r"\bstandard|\bnormal|\bfleisch|\bschnitzel|\bburger",
+    }
+    ROOM_TYPES = {
+        "einzel": r"\beinzel",
+        "doppel": r"\bdoppel",
+        "familie": r"\bfamilie",
+    }
+    ANIMALS = {
+        "hund": r"\bhund",
+        "katze": r"\bkatze",
+    }
+
+    def _one_of(self, table: Dict[str, str], text: str) -> Optional[str]:
+        """The single matching key, or None if none or several match."""
+        found = [k for k, pat in table.items() if re.search(pat, text)]
+        return found[0] if len(found) == 1 else None
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        text = text.lower().replace("-", " ").replace("e auto", "e-auto")
+        return re.sub(r"\s+", " ", text).strip()
+
+    def _duration_minutes(self, text: str) -> Optional[int]:
+        if re.search(r"\b(eineinhalb|anderthalb)\s+stunden?", text):
+            return 90
+        if re.search(r"\bhalbe\s+stunde", text):
+            return 30
+        m = re.search(_NUM + r"\s*(stunden?|std\b|h\b)", text)
+        if m:
+            return _to_int(m.group(1)) * 60
+        m = re.search(_NUM + r"\s*(minuten|min\b)", text)
+        if m:
+            return _to_int(m.group(1))
+        return None
+
+    def _nights(self, text: str) -> int:
+        m = re.search(_NUM + r"\s+n(ä|ae)chte?\b|" + _NUM + r"\s+nacht\b", text)
+        if not m:
+            return 1
+        return _to_int(m.group(1) or m.group(3))
+
+    def parameters(self, action: str, text: str) -> Dict:
+        """Parameters for an action decided elsewhere (unclear ones are left out)."""
+        return self._extract(action, self._normalize(text), strict=False)
+
+    def _extract(self, action: str, t: str, strict: bool) -> Optional[Dict]:
+        """
+        Parameters of `action` found in the normalized text `t`. With `strict`,
+        None if a key parameter is missing or unclear.
+        """
+        params: Dict = {}
+
+        if action == "parking":
+            vehicle = self._one_of(self.VEHICLES, t)
+            if vehicle:
+                params["vehicle"] = vehicle
+            elif strict:
+                return None
+            if re.search(r"\bohne\s+(e\s+)?(lade|strom)", t):
+                params["charging"] = "ohne"
+            elif re.search(r"\blade|\be-auto|\belektro|\bstrom", t):
+                params["charging"] = "mit"
+            duration = self._duration_minutes(t)
+            if duration:
+                params["duration_minutes"] = duration
+            elif strict and re.search(r"\b(stunde|minute)", t):
+                return None  # duration mentioned but not understood
+
+        elif action == "food":
+            food_type = self._one_of(self.FOOD_TYPES, t)
+            if food_type:
+                params["food_type"] = food_type
+            elif strict:
+                return None
+            if re.search(r"mitnehm|\bto go\b|\btogo\b|\bunterwegs", t):
+                params["togo"] = True
+            elif re.search(r"\bim restaurant|\bvor ort|\bhier essen", t):
+                params["togo"] = False
+
+        elif action == "hotel":
+            room_type = self._one_of(self.ROOM_TYPES, t)
+            if room_type:
+                params["room_type"] = room_type
+            elif strict:
+                return None
+            params["nights"] = self._nights(t)
+
+        elif action == "pet":
+            animal = self._one_of(self.ANIMALS, t)
+            if animal:
+                params["animal"] = animal
+            elif strict:
+                return None
+
+        return params
+
+    def match(self, text: str) -> Optional[Intent]:
+        t = self._normalize(text)
+        if not t:
+            return None
+
+        actions = [a for a, pat in self.ACTIONS.items() if re.search(pat, t)]
+
+        if not actions:
+            if re.search(self.HELP, t):
+                return Intent("help", {}, self.CONFIDENCE, text)
+            return None
+        if len(actions) > 1:
+            return None
+
+        action = actions[0]
+        params = self._extract(action, t, strict=True)
+        if params is None:
+            return None
+        return Intent(action, params, self.CONFIDENCE, text)
+
+
+# ----------------------------------------------------------------------
+# Intent cache
+# ----------------------------------------------------------------------
+
+class IntentCache:
+    """
+    Cache for classified utterances, keyed by normalized text.
+
+    - Tier 1: exact match of the normalized text (LRU + TTL)
+    - Tier 2: near-duplicates (Whisper variations like "Parkplatz" /
+      "Park Platz") by character-trigram Dice similarity, found via an
+      inverted trigram index. Only entries with the same numbers,
+      negations and parameter keywords qualify, so "zwei Nächte" never
+      hits "drei Nächte" and "mit Ladesäule" never hits "ohne".
+    - Optional SQLite file so the cache survives restarts
+    """
+
+    NEGATIONS = ("ohne", "kein", "nicht")
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        path: Optional[str] = None,
+        similarity: float = 0.85,
+    ):
+        """
+        Args:
+            max_entries: LRU bound
+            ttl_seconds: Entries older than this are ignored and evicted
+            path: SQLite file for persistence (None = memory only)
+            similarity: Min. trigram Dice coefficient for a tier-2 hit (>= 1.0 disables it)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+
+        # key -> (action, parameters, confidence, stored_at)
+        self._entries: "OrderedDict[str, Tuple[str, Dict, float, float]]" = OrderedDict()
+        self._grams: Dict[str, FrozenSet[str]] = {}
+        self._signatures: Dict[str, Tuple] = {}
+        self._index: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+        self.hits_exact = 0
+        self.hits_similar = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS intents ("
+                "key TEXT PRIMARY KEY, action TEXT, parameters TEXT, "
+                "confidence REAL, stored_at REAL)"
+            )
+            self._load()
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = text.lower().replace("ß", "ss")
+        text = re.sub(r"[^\w\s]", " ", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    @staticmethod
+    def _trigrams(key: str) -> FrozenSet[str]:
+        padded = f" {key} "
+        return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    def _signature(self, key: str) -> Tuple:
+        """Tokens that change the meaning although they barely change the text."""
+        numbers = tuple(_to_int(m) for m in re.findall(_NUM, key))
+        negations = tuple(w for w in self.NEGATIONS if re.search(rf"\b{w}", key))
+        keywords = tuple(
+            name
+            for table in (
+                RuleBasedIntentMatcher.VEHICLES,
+                RuleBasedIntentMatcher.FOOD_TYPES,
+                RuleBasedIntentMatcher.ROOM_TYPES,
+                RuleBasedIntentMatcher.ANIMALS,
+            )
+            for name, pat in table.items()
+            if re.search(pat, key)
+        )
+        return numbers, negations, keywords
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits_exact + self.hits_similar + self.misses
+        return (self.hits_exact + self.hits_similar) / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------
+    def get(self, text: str) -> Optional[Intent]:
+        key = self.normalize(text)
+        if not key:
+            return None
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[3] > self.ttl_seconds:
+                self._remove(key)
+                entry = None
+
+            if entry is None and self.similarity < 1.0:
+                similar = self._find_similar(key, now)
+                if similar is not None:
+                    entry = self._entries[similar]
+                    self._entries.move_to_end(similar)
+                    self.hits_similar += 1
+            elif entry is not None:
+                self._entries.move_to_end(key)
+                self.hits_exact += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+        action, params, conf, _ = entry
+        return Intent(action=action, parameters=dict(params), confidence=conf, original_text=text)
+
+    def put(self, text: str, intent: Intent):
+        key = self.normalize(text)
+        if not key:
+            return
+        now = time.time()
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (intent.action, dict(intent.parameters), intent.confidence, now)
+            self._add_to_index(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO intents VALUES (?, ?, ?, ?, ?)",
+                    (key, intent.action, json.dumps(intent.parameters), intent.confidence, now),
+                )
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ------------------------------------------------------------------
+    def _find_similar(self, key: str, now: float) -> Optional[str]:
+        grams = self._trigrams(key)
+        # Prefix filter: a candidate reaching the threshold must share at
+        # least one of the rarest `probe` trigrams, so only their (short)
+        # posting lists are scanned instead of those of " ic", "ich", ...
+        min_common = math.ceil(self.similarity * len(grams) / (2.0 - self.similarity))
+        probe = len(grams) - min_common + 1
+        rarest = sorted(grams, key=lambda g: len(self._index.get(g, ())))[:max(1, probe)]
+        candidates = set().union(*(self._index.get(g, ()) for g in rarest))
+
+        signature = self._signature(key)
+        best, best_score = None, self.similarity
+        for cand in candidates:
+            cand_grams = self._grams[cand]
+            score = 2.0 * len(grams & cand_grams) / (len(grams) + len(cand_grams))
+            if score < best_score:
+                continue
+            if now - self._entries[cand][3] > self.ttl_seconds:
+                continue
+            if self._signatures[cand] != signature:
+                continue
+            best, best_score = cand, score
+        return best
+
+    def _add_to_index(self, key: str):
+        grams = self._trigrams(key)
+        self._grams[key] = grams
+        self._signatures[key] = self._signature(key)
+        for g in grams:
+            self._index.setdefault(g, set()).add(key)
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        self._signatures.pop(key, None)
+        for g in self._grams.pop(key, ()):
+            keys = self._index.get(g)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[g]
+        if self._db is not None:
+            self._db.execute("DELETE FROM intents WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM intents WHERE stored_at < ?", (cutoff,))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, action, parameters, confidence, stored_at FROM intents "
+            "ORDER BY stored_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, action, params, conf, stored_at in reversed(rows):
+            self._entries[key] = (action, json.loads(params), conf, stored_at)
+            self._add_to_index(key)
+
+
+# ----------------------------------------------------------------------
+# Local classifier (no LLM daemon needed)
+# ----------------------------------------------------------------------
+
+DEFAULT_TRAINING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_training.jsonl")
+
+
+class LocalIntentClassifier:
+    """
+    Small offline classifier for when Ollama is slow or down.
+
+    - Features: words + character 3/4-grams, feature-hashed into a fixed
+      vector, TF-IDF weighted and L2-normalized
+    - Score per action: mean of the similarity to the action centroid and
+      to its nearest training example, both from one NumPy mat-vec product
+    - Parameters come from the rule-based extractors
+    - The margin between the best and second-best action tells the caller
+      whether the answer is clear enough to skip the LLM
+    """
+
+    ACTIONS = ("parking", "food", "hotel", "coffee", "pet", "help", "unknown")
+
+    def __init__(
+        self,
+        training_path: Optional[str] = DEFAULT_TRAINING_PATH,
+        extra_examples: Optional[List[Tuple[str, str]]] = None,
+        dim: int = 4096,
+    ):
+        """
+        Args:
+            training_path: JSONL file with {"text", "action"} lines
+            extra_examples: Additional (text, action) pairs, e.g. the LLM few-shot examples
+            dim: Size of the hashed feature space (power of two)
+        """
+        self.dim = dim
+        self.matcher = RuleBasedIntentMatcher()
+
+        examples = list(extra_examples or [])
+        if training_path and os.path.exists(training_path):
+            with open(training_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        examples.append((row["text"], row["action"]))
+        elif training_path:
+            print(f"[LocalIntentClassifier] Trainingsdatei fehlt: {training_path}")
+
+        self.fit(examples)
+
+    # ------------------------------------------------------------------
+    def _hashed(self, text: str) -> np.ndarray:
+        """Raw term counts in the hashed space (signed to cancel collisions)."""
+        indices: List[int] = []
+        weights: List[float] = []
+        for tok in IntentCache.normalize(text).split():
+            grams = ["w:" + tok]
+            padded = f"<{tok}>"
+            for n in (3, 4):
+                grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+            for g in grams:
+                h = zlib.crc32(g.encode("utf-8"))
+                indices.append(h & (self.dim - 1))
+                weights.append(1.0 if h & 0x80000000 else -1.0)
+        if not indices:
+            return np.zeros(self.dim, dtype=np.float32)
+        return np.bincount(indices, weights=weights, minlength=self.dim).astype(np.float32)
+
+    def features(self, text: str) -> np.ndarray:
+        vec = self._hashed(text) * self.idf
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def fit(self, examples: List[Tuple[str, str]]):
+        examples = sorted(
+            ((t, a) for t, a in examples if a in self.ACTIONS),
+            key=lambda ex: self.ACTIONS.index(ex[1]),
+        )
+        self.actions = [a for a in self.ACTIONS if any(ex[1] == a for ex in examples)]
+        if len(self.actions) < 2:
+            raise ValueError("LocalIntentClassifier braucht Beispiele für mindestens zwei Actions")
+
+        raw = np.stack([self._hashed(t) for t, _ in examples])
+        df = np.count_nonzero(raw, axis=0)
+        self.idf = (np.log((len(examples) + 1) / (df + 1)) + 1.0).astype(np.float32)
+
+        X = raw * self.idf
+        X /= np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-8)
+        labels = np.array([self.actions.index(a) for _, a in examples])
+
+        C = np.stack([X[labels == k].mean(axis=0) for k in range(len(self.actions))])
+        C /= np.maximum(np.linalg.norm(C, axis=1, keepdims=True), 1e-8)
+
+        self.X = X
+        self.C = C
+        # rows are grouped by action -> nearest neighbour per action via reduceat
+        self._starts = np.searchsorted(labels, np.arange(len(self.actions)))
+
+    # ------------------------------------------------------------------
+    def scores(self, text: str) -> np.ndarray:
+        q = self.features(text)
+        nearest = np.maximum.reduceat(self.X @ q, self._starts)
+        return 0.5 * (self.C @ q) + 0.5 * nearest
+
+    def predict(self, text: str) -> Tuple[Intent, float]:
+        """Best intent and its margin over the runner-up action."""
+        scores = self.scores(text)
+        second, best = np.argsort(scores)[-2:]
+        action = self.actions[best]
+        margin = float(scores[best] - scores[second])
+
+        params = self.matcher.parameters(action, text) if action not in ("help", "unknown") else {}
+        # raw similarities are small; the margin is what separates clear cases
+        confidence = min(0.99, 0.5 + 2.0 * margin)
+        return Intent(action, params, confidence, text), margin
+
+
+# ----------------------------------------------------------------------
+# Streaming JSON
+# ----------------------------------------------------------------------
+
+class IncrementalJSONParser:
+    """
+    Follows a JSON object arriving in arbitrary chunks of text.
+
+    - Skips anything before the first "{" (e.g. a ```json fence)
+    - `complete` turns True as soon as the top-level object closes, so the
+      caller can stop reading the stream right there
+    - `action` is set as soon as the top-level "action" string value is
+      closed, long before the parameters have been generated
+    """
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._key: Optional[str] = None
+        self._in_value = False
+        self.complete = False
+        self.action: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """The JSON object so far (exactly the object once `complete`)."""
+        return "".join(self._buf)
+
+    def feed(self, chunk: str) -> bool:
+        """Consume the next piece of model output; returns `complete`."""
+        for c in chunk:
+            if self.complete:
+                break
+            if not self._started:
+                if c != "{":
+                    continue
+                self._started = True
+
+            self._buf.append(c)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._string.append(c)
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._end_string("".join(self._string))
+                else:
+                    self._string.append(c)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string = []
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.complete = True
+            elif self._depth == 1 and c == ":":
+                self._in_value = True
+            elif self._depth == 1 and c == ",":
+                self._in_value = False
+
+        return self.complete
+
+    def _end_string(self, value: str):
+        if self._depth != 1:
+            return
+        if not self._in_value:
+            self._key = value
+        elif self._key == "action" and self.action is None:
+            self.action = value
+
+
+# ----------------------------------------------------------------------
+# Per-model statistics (hedging)
+# ----------------------------------------------------------------------
+
+class ModelStats:
+    """Latency window and outcome counters of one Ollama model."""
+
+    def __init__(self, window: int = 500):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.wins = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    def record(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(len(values) * p))]
+
+    def summary(self) -> str:
+        if not self.latencies:
+            return f"keine Messwerte, {self.errors} Fehler, {self.cancelled} abgebrochen"
+        return (
+            f"n={len(self.latencies)} p50={self.percentile(0.5) * 1000:.0f} ms "
+            f"p95={self.percentile(0.95) * 1000:.0f} ms, {self.wins} gewonnen, "
+            f"{self.errors} Fehler, {self.cancelled} abgebrochen"
+        )
+
+
 class LLMIntentClassifier:
     """Uses an LLM (local or cloud via Ollama) to classify user intents."""
 
@@ -33,16 +666,75 @@ class LLMIntentClassifier:
         model: str = "gpt-oss:20b-cloud",
         api_url: str = "http://localhost:11434",
         request_timeout: int = 60,
+        use_fast_path: bool = True,
+        keep_alive: str = "30m",
+        pool_size: int = 4,
+        use_cache: bool = True,
+        cache_path: Optional[str] = None,
+        cache_min_confidence: float = 0.7,
+        stream: bool = False,
+        max_in_flight: int = 2,
+        hedge_model: Optional[str] = None,
+        hedge_delay: float = 1.5,
+        hedge_min_confidence: float = 0.6,
+        shadow_sample_rate: float = 0.0,
+        use_local: bool = False,
+        local_min_margin: float = 0.1,
     ):
         """
         Args:
             model: Name of the Ollama model, e.g. "gpt-oss:20b-cloud" or "deepseek-v3.1:671b-cloud"
             api_url: Ollama API base URL ("http://localhost:11434" for local daemon)
             request_timeout: HTTP timeout in seconds
+            use_fast_path: Try the rule-based matcher before calling the LLM
+            keep_alive: How long Ollama keeps the model (and its prompt cache) loaded
+            pool_size: Max. pooled keep-alive connections to the Ollama server
+            use_cache: Reuse earlier LLM answers for repeated (or nearly repeated) phrasings
+            cache_path: SQLite file that keeps the cache across restarts
+            cache_min_confidence: LLM answers below this confidence are not cached
+            stream: Read the answer token by token and stop at the closing brace
+                (always on when classify() gets an on_action callback)
+            max_in_flight: Max. concurrent LLM requests of aclassify()
+            hedge_model: Second (e.g. small local) model that aclassify() also asks
+                when `model` has not answered after `hedge_delay` seconds
+            hedge_delay: Seconds before the hedge request is sent (see suggest_hedge_delay())
+            hedge_min_confidence: An answer below this confidence does not win the race
+            shadow_sample_rate: Share of hedged requests where the loser is not
+                cancelled but finished in the background to measure agreement
+            use_local: Run the offline LocalIntentClassifier before the LLM (opt-in,
+                the voice assistant enables it with USE_LOCAL_INTENT); its
+                answer is also used when the LLM fails
+            local_min_margin: Score margin above which the local answer is taken
+                without asking the LLM (tune with Agent_Test/bench_intent_classifier.py)
         """
         self.model = model
         self.api_url = api_url.rstrip("/")
         self.request_timeout = request_timeout
+        self.keep_alive = keep_alive
+        self.fast_path = RuleBasedIntentMatcher() if use_fast_path else None
+        self.fast_path_hits = 0
+        self.cache = IntentCache(path=cache_path) if use_cache else None
+        self.cache_min_confidence = cache_min_confidence
+        self.stream = stream
+        self.max_in_flight = max_in_flight
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._aio_session = None
+
+        self.hedge_model = hedge_model
+        self.hedge_delay = hedge_delay
+        self.hedge_min_confidence = hedge_min_confidence
+        self.shadow_sample_rate = shadow_sample_rate
+        self.model_stats: Dict[str, ModelStats] = {}
+        self.hedges_fired = 0
+        self.compared = 0
+        self.agreed = 0
+        self._shadow_tasks: Set[asyncio.Task] = set()
+
+        self.local_min_margin = local_min_margin
+        self.local_hits = 0
+        self.local_fallbacks = 0
+        self.use_local = use_local
+        self.llm_calls = 0
 
         # ------------------------------------------------------------
         # System prompt: completely German, narrow domain
@@ -231,41 +923,362 @@ REGELN:
             },
         ]
 
+        # System prompt + few-shot turns are identical for every request.
+        # Built once; sending the exact same prefix lets Ollama reuse the
+        # already evaluated prompt tokens of the loaded model.
+        self.prefix_messages = self._build_prefix()
+
+        # One pooled keep-alive connection instead of a new TCP (and TLS)
+        # handshake per utterance
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Offline classifier, trained on intent_training.jsonl + the few-shot examples
+        self.local: Optional[LocalIntentClassifier] = None
+        if self.use_local:
+            few_shot = [(ex["user"], json.loads(ex["response"])["action"]) for ex in self.examples]
+            self.local = LocalIntentClassifier(extra_examples=few_shot)
+
+    def _build_prefix(self) -> List[Dict[str, str]]:
+        """Call again after changing system_prompt or examples."""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        for ex in self.examples:
+            messages.append({"role": "user", "content": ex["user"]})
+            messages.append({"role": "assistant", "content": ex["response"]})
+        return messages
+
+    def _chat_payload(self, text: str, stream: bool = False, model: Optional[str] = None, **options) -> Dict:
+        return {
+            "model": model or self.model,
+            "messages": self.prefix_messages + [{"role": "user", "content": text}],
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": 0.0,
+                "top_p": 0.9,
+                **options,
+            },
+        }
+
+    @staticmethod
+    def _parse_reply(assistant_message: str, text: str) -> Intent:
+        """Turn the model's JSON answer into an Intent (raises JSONDecodeError)."""
+        # Handle ```json ... ``` wrappers if present
+        json_str = assistant_message.strip()
+        if json_str.startswith("```json"):
+            json_str = json_str[7:]
+        if json_str.startswith("```"):
+            json_str = json_str[3:]
+        if json_str.endswith("```"):
+            json_str = json_str[:-3]
+        json_str = json_str.strip()
+
+        parsed = json.loads(json_str)
+
+        action = parsed.get("action", "unknown")
+        params = parsed.get("parameters", {}) or {}
+        conf = float(parsed.get("confidence", 0.0))
+
+        return Intent(
+            action=action,
+            parameters=params,
+            confidence=conf,
+            original_text=text,
+        )
+
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
-    def classify(self, text: str) -> Intent:
+    def classify(
+        self,
+        text: str,
+        on_action: Optional[Callable[[str], None]] = None,
+    ) -> Intent:
         """
         Classify user intent using the configured LLM via Ollama.
 
         Args:
             text: User's transcribed speech (German)
+            on_action: Called (from this thread) with the provisional action as
+                soon as the streamed answer contains it; only on the LLM path
 
         Returns:
             Intent object
         """
+        intent, guess = self._lookup_local(text)
+        if intent is not None:
+            return intent
+
+        intent = self._classify_llm(text, on_action)
+        if intent is None:
+            return self._degraded(text, guess)
+        self._remember(text, intent)
+        return intent
+
+    async def aclassify(
+        self,
+        text: str,
+        on_action: Optional[Callable[[str], None]] = None,
+        deadline: Optional[float] = None,
+    ) -> Intent:
+        """
+        Async variant of classify() for the agent's event loop (aiohttp).
+
+        Cancelling the awaiting task closes the HTTP response, which also
+        stops the generation in Ollama. At most `max_in_flight` LLM requests
+        run at the same time; further callers wait for a free slot.
+
+        Args:
+            text: User's transcribed speech (German)
+            on_action: Called (on the event loop) with the provisional action
+            deadline: Seconds until the request is given up (default: request_timeout)
+        """
+        intent, guess = self._lookup_local(text)
+        if intent is not None:
+            return intent
+
+        if self._inflight is None:
+            self._inflight = asyncio.Semaphore(self.max_in_flight)
+
+        self.llm_calls += 1
+        timeout = deadline if deadline is not None else self.request_timeout
+
+        if self.hedge_model:
+            request = self._race(text, on_action)
+        else:
+            request = self._ask_model(self.model, text, on_action)
+
+        try:
+            # the deadline includes waiting for a free in-flight slot
+            intent = await asyncio.wait_for(request, timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"[LLMIntentClassifier] Deadline von {timeout:g} s überschritten")
+            return self._degraded(text, guess)
+        except json.JSONDecodeError as e:
+            print(f"[LLMIntentClassifier] JSON parse error: {e}")
+            return self._degraded(text, guess)
+        except Exception as e:
+            print(f"[LLMIntentClassifier] HTTP/LLM error: {e}")
+            return self._degraded(text, guess)
+
+        self._remember(text, intent)
+        return intent
+
+    # ------------------------------------------------------------------
+    # Hedging
+    # ------------------------------------------------------------------
+    async def _ask_model(
+        self,
+        model: str,
+        text: str,
+        on_action: Optional[Callable[[str], None]] = None,
+    ) -> Intent:
+        stats = self.model_stats.setdefault(model, ModelStats())
+        t0 = time.perf_counter()
+        try:
+            async with self._inflight:
+                message = await self._achat(text, on_action, model)
+            try:
+                intent = self._parse_reply(message, text)
+            except json.JSONDecodeError:
+                print(f"Raw response ({model}): {message}")
+                raise
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.record(time.perf_counter() - t0)
+        return intent
+
+    async def _race(
+        self,
+        text: str,
+        on_action: Optional[Callable[[str], None]] = None,
+    ) -> Intent:
+        """
+        Ask `model`; if it has no usable answer after `hedge_delay` (or fails
+        earlier), ask `hedge_model` too. The first well-formed answer with
+        enough confidence wins, the other request is cancelled.
+        """
+        if on_action is not None:
+            inner = on_action
+            announced: List[str] = []
+
+            def on_action(action: str):
+                if not announced:
+                    announced.append(action)
+                    inner(action)
+
+        primary = asyncio.create_task(self._ask_model(self.model, text, on_action))
+        models = {primary: self.model}
+        hedge: Optional[asyncio.Task] = None
+        results: Dict[str, Intent] = {}
+        winner: Optional[asyncio.Task] = None
+        error: Optional[BaseException] = None
+        pending = {primary}
+        wait_timeout: Optional[float] = self.hedge_delay
+
         try:
-            messages = [{"role": "system", "content": self.system_prompt}]
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                wait_timeout = None
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    intent = task.result()
+                    results[models[task]] = intent
+                    if winner is None and intent.confidence >= self.hedge_min_confidence:
+                        winner = task
+                if winner is not None:
+                    break
+                if hedge is None:
+                    # primary is slow, failed or unsure -> ask the hedge model now
+                    hedge = asyncio.create_task(self._ask_model(self.hedge_model, text, on_action))
+                    models[hedge] = self.hedge_model
+                    pending.add(hedge)
+                    self.hedges_fired += 1
+        finally:
+            unfinished = [t for t in models if not t.done()]
+            if winner is not None and len(results) < 2 and random.random() < self.shadow_sample_rate:
+                if hedge is None:
+                    hedge = asyncio.create_task(self._ask_model(self.hedge_model, text))
+                    models[hedge] = self.hedge_model
+                    unfinished.append(hedge)
+                shadow = asyncio.create_task(self._finish_shadow(unfinished, models, results))
+                self._shadow_tasks.add(shadow)
+                shadow.add_done_callback(self._shadow_tasks.discard)
+            else:
+                for task in unfinished:
+                    task.cancel()
+
+        if len(results) == 2:
+            self._record_agreement(results)
+
+        if winner is not None:
+            self.model_stats[models[winner]].wins += 1
+            return winner.result()
+        if results:
+            return max(results.values(), key=lambda i: i.confidence)
+        raise error if error is not None else RuntimeError("keine Antwort")
+
+    async def _finish_shadow(
+        self,
+        tasks: List[asyncio.Task],
+        models: Dict[asyncio.Task, str],
+        results: Dict[str, Intent],
+    ):
+        done = await asyncio.gather(*tasks, return_exceptions=True)
+        results = dict(results)
+        for task, result in zip(tasks, done):
+            if isinstance(result, Intent):
+                results[models[task]] = result
+        if len(results) == 2:
+            self._record_agreement(results)
+
+    def _record_agreement(self, results: Dict[str, Intent]):
+        a, b = results.values()
+        self.compared += 1
+        if a.action == b.action and a.parameters == b.parameters:
+            self.agreed += 1
+
+    def suggest_hedge_delay(self, percentile: float = 0.95, min_samples: int = 20) -> Optional[float]:
+        """
+        Hedge delay derived from the primary model's observed latency: hedging
+        at its p95 sends the extra request for roughly the slowest 5 %.
+        """
+        stats = self.model_stats.get(self.model)
+        if stats is None or len(stats.latencies) < min_samples:
+            return None
+        return stats.percentile(percentile)
+
+    def hedge_report(self) -> str:
+        lines = [f"{model}: {stats.summary()}" for model, stats in self.model_stats.items()]
+        if self.compared:
+            lines.append(f"Übereinstimmung: {self.agreed}/{self.compared} ({self.agreed / self.compared:.0%})")
+        lines.append(f"Hedge-Anfragen: {self.hedges_fired} von {self.llm_calls} LLM-Aufrufen")
+        suggested = self.suggest_hedge_delay()
+        if suggested is not None:
+            lines.append(f"Vorschlag hedge_delay: {suggested:.2f} s (aktuell {self.hedge_delay:.2f} s)")
+        return "\n".join(lines)
+
+    # ------------------------------------------------------------------
+    # Shared helpers
+    # ------------------------------------------------------------------
+    def _lookup_local(self, text: str) -> Tuple[Optional[Intent], Optional[Intent]]:
+        """
+        Rule-based fast path, cache of earlier LLM answers, then the local
+        classifier. Returns (answer, None) if one of them is confident, else
+        (None, local guess) so the guess can stand in if the LLM fails.
+        """
+        if self.fast_path is not None:
+            intent = self.fast_path.match(text)
+            if intent is not None:
+                self.fast_path_hits += 1
+                return intent, None
 
-            # Few-shot examples
-            for ex in self.examples:
-                messages.append({"role": "user", "content": ex["user"]})
-                messages.append({"role": "assistant", "content": ex["response"]})
+        if self.cache is not None:
+            intent = self.cache.get(text)
+            if intent is not None:
+                return intent, None
 
-            # User query
-            messages.append({"role": "user", "content": text})
+        if self.local is not None:
+            guess, margin = self.local.predict(text)
+            if margin >= self.local_min_margin:
+                self.local_hits += 1
+                return guess, None
+            return None, guess
+        return None, None
 
-            response = requests.post(
+    def _degraded(self, text: str, guess: Optional[Intent]) -> Intent:
+        """Answer when the LLM failed: the local guess if there is one."""
+        if guess is None:
+            return self._fallback(text)
+        self.local_fallbacks += 1
+        print(f"[LLMIntentClassifier] LLM nicht verfügbar, nutze lokales Ergebnis: {guess.action}")
+        return guess
+
+    def _remember(self, text: str, intent: Intent):
+        if self.cache is not None and intent.confidence >= self.cache_min_confidence:
+            self.cache.put(text, intent)
+
+    @staticmethod
+    def _fallback(text: str) -> Intent:
+        return Intent(
+            action="unknown",
+            parameters={},
+            confidence=0.0,
+            original_text=text,
+        )
+
+    @staticmethod
+    def _notify_action(on_action: Callable[[str], None], action: str):
+        try:
+            on_action(action)
+        except Exception as e:
+            print(f"[LLMIntentClassifier] on_action error: {e}")
+
+    def _classify_llm(
+        self,
+        text: str,
+        on_action: Optional[Callable[[str], None]] = None,
+    ) -> Optional[Intent]:
+        """LLM answer, or None if the request or the JSON failed."""
+        self.llm_calls += 1
+        try:
+            if self.stream or on_action is not None:
+                assistant_message = self._chat_streaming(text, on_action)
+                return self._parse_reply(assistant_message, text)
+
+            response = self.session.post(
                 f"{self.api_url}/api/chat",
-                json={
-                    "model": self.model,
-                    "messages": messages,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.0,
-                        "top_p": 0.9,
-                    },
-                },
+                json=self._chat_payload(text),
                 timeout=self.request_timeout,
             )
 
@@ -276,53 +1289,164 @@ REGELN:
 
             result = response.json()
             assistant_message = result["message"]["content"].strip()
-
-            # Handle ```json ... ``` wrappers if present
-            json_str = assistant_message
-            if json_str.startswith("```json"):
-                json_str = json_str[7:]
-            if json_str.startswith("```"):
-                json_str = json_str[3:]
-            if json_str.endswith("```"):
-                json_str = json_str[:-3]
-            json_str = json_str.strip()
-
-            parsed = json.loads(json_str)
-
-            action = parsed.get("action", "unknown")
-            params = parsed.get("parameters", {}) or {}
-            conf = float(parsed.get("confidence", 0.0))
-
-            return Intent(
-                action=action,
-                parameters=params,
-                confidence=conf,
-                original_text=text,
-            )
+            return self._parse_reply(assistant_message, text)
 
         except json.JSONDecodeError as e:
             print(f"[LLMIntentClassifier] JSON parse error: {e}")
             print(f"Raw response: {locals().get('assistant_message', '')}")
-            return Intent(
-                action="unknown",
-                parameters={},
-                confidence=0.0,
-                original_text=text,
-            )
+            return None
         except Exception as e:
             print(f"[LLMIntentClassifier] HTTP/LLM error: {e}")
-            return Intent(
-                action="unknown",
-                parameters={},
-                confidence=0.0,
-                original_text=text,
+            return None
+
+    def _chat_streaming(
+        self,
+        text: str,
+        on_action: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Read the NDJSON stream of /api/chat until the JSON object is closed.
+
+        Leaving the `with` block closes the connection; Ollama stops the
+        generation when its client goes away, so trailing tokens (closing
+        fences, explanations) are never generated.
+        """
+        parser = IncrementalJSONParser()
+        raw: List[str] = []
+        announced = False
+
+        with self.session.post(
+            f"{self.api_url}/api/chat",
+            json=self._chat_payload(text, stream=True),
+            timeout=self.request_timeout,
+            stream=True,
+        ) as response:
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"Ollama API error {response.status_code}: {response.text}"
+                )
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama API error: {chunk['error']}")
+
+                piece = chunk.get("message", {}).get("content", "")
+                raw.append(piece)
+                parser.feed(piece)
+
+                if on_action is not None and not announced and parser.action:
+                    announced = True
+                    self._notify_action(on_action, parser.action)
+
+                if parser.complete or chunk.get("done"):
+                    break
+
+        return parser.text if parser.complete else "".join(raw)
+
+    async def _achat(
+        self,
+        text: str,
+        on_action: Optional[Callable[[str], None]] = None,
+        model: Optional[str] = None,
+    ) -> str:
+        session = self._get_aio_session()
+        streaming = self.stream or on_action is not None
+        parser = IncrementalJSONParser()
+        raw: List[str] = []
+        announced = False
+
+        async with session.post(
+            f"{self.api_url}/api/chat",
+            json=self._chat_payload(text, stream=streaming, model=model),
+        ) as response:
+            finished = False
+            try:
+                if response.status != 200:
+                    raise RuntimeError(
+                        f"Ollama API error {response.status}: {await response.text()}"
+                    )
+
+                if not streaming:
+                    result = await response.json(content_type=None)
+                    finished = True
+                    return result["message"]["content"].strip()
+
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(f"Ollama API error: {chunk['error']}")
+
+                    piece = chunk.get("message", {}).get("content", "")
+                    raw.append(piece)
+                    parser.feed(piece)
+
+                    if on_action is not None and not announced and parser.action:
+                        announced = True
+                        self._notify_action(on_action, parser.action)
+
+                    if chunk.get("done"):
+                        finished = True
+                        break
+                    if parser.complete:
+                        break
+            finally:
+                # Early cutoff, deadline or cancellation: drop the connection
+                # so Ollama stops generating instead of finishing the answer
+                if not finished:
+                    response.close()
+
+        return parser.text if parser.complete else "".join(raw)
+
+    def _get_aio_session(self):
+        import aiohttp  # only needed by aclassify(); ships with uagents
+
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_in_flight),
+            )
+        return self._aio_session
+
+    async def aclose(self):
+        if self._aio_session is not None:
+            await self._aio_session.close()
+            self._aio_session = None
+
+    def warmup(self) -> Optional[float]:
+        """
+        Load the model and evaluate the prompt prefix once, so the first real
+        utterance does not pay for it. Returns the duration in seconds or None.
+        """
+        t0 = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.api_url}/api/chat",
+                json=self._chat_payload("Hallo", num_predict=1),
+                timeout=self.request_timeout,
             )
+            if response.status_code != 200:
+                print(f"[LLMIntentClassifier] Warm-up fehlgeschlagen: {response.status_code}")
+                return None
+        except Exception as e:
+            print(f"[LLMIntentClassifier] Warm-up fehlgeschlagen: {e}")
+            return None
+        return time.perf_counter() - t0
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
 
     # ------------------------------------------------------------------
     def test_connection(self) -> bool:
         """Test if Ollama is reachable and the model exists."""
         try:
-            resp = requests.get(f"{self.api_url}/api/tags", timeout=5)
+            resp = self.session.get(f"{self.api_url}/api/tags", timeout=5)
             if resp.status_code != 200:
                 print(f"✗ Ollama API error: {resp.status_code}")
                 return False
@@ -0,0 +1,180 @@
+"""
+stt_batching.py
+
+Micro-batching of Whisper transcriptions for several voice assistants.
+
+- One shared model: utterances from all cabs/kiosks go into one queue
+- The first waiting utterance opens a batch; it is closed when max_batch
+  utterances are collected or max_wait_ms have passed, whichever is first
+- Utterances carry their language; a batch is split by language and each
+  group is decoded with its own language token
+- faster-whisper: all utterances of a batch are padded to 30 s of
+  log-mel features and decoded by one CTranslate2 generate() call;
+  if that fails (old faster-whisper, odd input) the batch falls back to
+  one model.transcribe() per utterance
+- Batches run in a worker thread, the event loop keeps collecting the
+  next batch meanwhile
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# Transcribes a list of float32 16 kHz arrays in one language (None = the
+# function's default), returns one text per array
+BatchFn = Callable[[List[np.ndarray], Optional[str]], List[str]]
+
+
+def whisper_batch_fn(model, language: Optional[str] = "de", beam_size: int = 5) -> BatchFn:
+    """
+    Batch function for a faster_whisper.WhisperModel.
+
+    `language` is used for batches without a language of their own.
+    Utterances longer than 30 s are cut by the batched path; the voice
+    assistant records at most MAX_RECORD_SECONDS (10 s) anyway.
+    """
+    def sequential(audios: List[np.ndarray], lang: Optional[str] = None) -> List[str]:
+        texts = []
+        for audio in audios:
+            segments, _ = model.transcribe(audio, beam_size=beam_size, language=lang or language)
+            texts.append(" ".join(seg.text for seg in segments).strip())
+        return texts
+
+    try:
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+        from faster_whisper.transcribe import get_ctranslate2_storage
+    except ImportError:
+        print("⚠️ faster-whisper ohne Batch-API, transkribiere einzeln.")
+        return sequential
+
+    tokenizers: Dict[str, tuple] = {}
+
+    def tokenizer_for(lang: str):
+        # one tokenizer + decoder prompt per language, built on first use
+        if lang not in tokenizers:
+            tokenizer = Tokenizer(
+                model.hf_tokenizer,
+                model.model.is_multilingual,
+                task="transcribe",
+                language=lang,
+            )
+            tokenizers[lang] = (tokenizer, list(tokenizer.sot_sequence) + [tokenizer.no_timestamps])
+        return tokenizers[lang]
+
+    def batched(audios: List[np.ndarray], lang: Optional[str] = None) -> List[str]:
+        lang = lang or language
+        if len(audios) == 1 or lang is None:
+            # single utterance / language detection: the normal path is just as fast
+            return sequential(audios, lang)
+        try:
+            tokenizer, prompt = tokenizer_for(lang)
+            features = np.stack([pad_or_trim(model.feature_extractor(audio)) for audio in audios])
+            results = model.model.generate(
+                get_ctranslate2_storage(features),
+                [prompt] * len(audios),
+                beam_size=beam_size,
+                suppress_blank=True,
+            )
+            return [tokenizer.decode(r.sequences_ids[0]).strip() for r in results]
+        except Exception as e:
+            print(f"⚠️ Batch-Dekodierung fehlgeschlagen ({e}), transkribiere einzeln.")
+            return sequential(audios, lang)
+
+    return batched
+
+
+@dataclass
+class _Job:
+    audio: np.ndarray
+    future: asyncio.Future
+    language: Optional[str] = None
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """Collects concurrent transcription requests into batches for one model."""
+
+    def __init__(self, batch_fn: BatchFn, max_batch: int = 8, max_wait_ms: float = 50.0):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+        self.queue_wait_ms: List[float] = []
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    def start(self):
+        """Start the batching worker on the running event loop (idempotent)."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def transcribe(self, audio: np.ndarray, language: Optional[str] = None) -> str:
+        """Queue one utterance and wait for its transcript (None = default language)."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Job(audio, future, language))
+        return await future
+
+    async def _collect(self) -> List[_Job]:
+        jobs = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(jobs) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                jobs.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return jobs
+
+    async def _run(self):
+        while True:
+            jobs = await self._collect()
+            # callers that gave up (timeout/cancel) do not cost model time
+            jobs = [job for job in jobs if not job.future.done()]
+            if not jobs:
+                continue
+
+            started = time.perf_counter()
+            self.queue_wait_ms.extend((started - job.enqueued) * 1000 for job in jobs)
+            groups: Dict[Optional[str], List[_Job]] = defaultdict(list)
+            for job in jobs:
+                groups[job.language].append(job)
+            for language, group in groups.items():
+                await self._decode(group, language)
+
+    async def _decode(self, jobs: List[_Job], language: Optional[str]):
+        try:
+            texts = await asyncio.to_thread(self.batch_fn, [job.audio for job in jobs], language)
+        except Exception as e:
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(jobs)
+        for job, text in zip(jobs, texts):
+            if not job.future.done():
+                job.future.set_result(text)
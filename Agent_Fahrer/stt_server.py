@@ -0,0 +1,139 @@
+"""
+stt_server.py
+
+Shared speech-to-text agent for several voice assistants on one edge box.
+
+- Holds ONE Faster-Whisper model instead of one per cab/kiosk
+- Voice assistants send SttRequest (16 kHz int16 PCM, base64) and get
+  an SttResponse with the same correlation_id back, asynchronously
+- Concurrent utterances are micro-batched (stt_batching.MicroBatcher):
+  a batch closes after STT_MAX_BATCH utterances or STT_MAX_WAIT_MS and is
+  decoded per SttRequest.language
+- Enable in voice_assistant.py with STT_SERVER_ADDRESS = <printed address>
+"""
+
+import asyncio
+import base64
+import time
+
+import numpy as np
+from uagents import Agent, Context, Model
+
+from stt_batching import MicroBatcher, whisper_batch_fn
+
+# ---- Models (must match voice_assistant.py) ----
+
+class SttRequest(Model):
+    audio_b64: str          # 16 kHz mono int16 PCM, base64
+    samplerate: int
+    language: str
+    correlation_id: str
+
+
+class SttResponse(Model):
+    correlation_id: str
+    text: str
+    error: str = ""
+
+
+# ============================================================
+#                    CONFIGURATION
+# ============================================================
+
+STT_MODEL_SIZE = "small"
+STT_DEVICE = "cpu"           # "cuda" makes batching pay off most
+STT_COMPUTE_TYPE = "int8"
+STT_LANGUAGE = "de"          # for requests without a language
+STT_MAX_BATCH = 8
+STT_MAX_WAIT_MS = 60         # extra latency a lone utterance pays at most
+
+sttAgent = Agent(
+    name="SttServer",
+    port=8020,
+    seed="sttServerAgent",
+    endpoint=["http://localhost:8020/submit"],
+)
+
+batcher: MicroBatcher | None = None
+model_ready = asyncio.Event()
+# the event loop only keeps weak references to tasks -> hold them until done
+_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+def load_model_blocking() -> MicroBatcher:
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel(STT_MODEL_SIZE, device=STT_DEVICE, compute_type=STT_COMPUTE_TYPE)
+    # warm-up, so the first driver does not pay for lazy initialisation
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language=STT_LANGUAGE)
+    list(segments)
+    return MicroBatcher(
+        whisper_batch_fn(model, language=STT_LANGUAGE),
+        max_batch=STT_MAX_BATCH,
+        max_wait_ms=STT_MAX_WAIT_MS,
+    )
+
+
+def decode_audio(msg: SttRequest) -> np.ndarray:
+    pcm = np.frombuffer(base64.b64decode(msg.audio_b64), dtype=np.int16)
+    audio = pcm.astype(np.float32) / 32768.0
+    if msg.samplerate != 16000 and len(audio):
+        # Whisper wants 16 kHz; linear resampling is enough for speech
+        n = int(len(audio) * 16000 / msg.samplerate)
+        audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+async def transcribe_and_reply(ctx: Context, sender: str, msg: SttRequest):
+    t0 = time.perf_counter()
+    try:
+        await model_ready.wait()
+        if batcher is None:
+            raise RuntimeError("STT-Modell nicht geladen")
+        text = await batcher.transcribe(decode_audio(msg), msg.language or None)
+        reply = SttResponse(correlation_id=msg.correlation_id, text=text)
+    except Exception as e:
+        reply = SttResponse(correlation_id=msg.correlation_id, text="", error=str(e))
+    await ctx.send(sender, reply)
+    ctx.logger.info(
+        f"STT {msg.correlation_id[:8]} in {(time.perf_counter() - t0) * 1000:.0f} ms "
+        f"(Ø Batch {batcher.mean_batch_size if batcher else 0:.1f})"
+    )
+
+
+@sttAgent.on_message(model=SttRequest)
+async def stt_handler(ctx: Context, sender: str, msg: SttRequest):
+    # Handler returns at once: the next request can join the same batch
+    _spawn(transcribe_and_reply(ctx, sender, msg))
+
+
+async def load_model(ctx: Context):
+    """Load the model once in the background; requests wait for model_ready."""
+    global batcher
+    t0 = time.perf_counter()
+    try:
+        batcher = await asyncio.to_thread(load_model_blocking)
+        batcher.start()
+        ctx.logger.info(f"Whisper ({STT_MODEL_SIZE}) geladen in {time.perf_counter() - t0:.1f} s")
+    except Exception as e:
+        ctx.logger.error(f"Whisper konnte nicht geladen werden: {e}")
+    model_ready.set()
+
+
+@sttAgent.on_event("startup")
+async def starter(ctx: Context):
+    # not awaited: the agent accepts requests while Whisper is still loading
+    _spawn(load_model(ctx))
+
+
+if __name__ == "__main__":
+    print("📝 STT-Server gestartet…")
+    print(f"📍 Adresse: {sttAgent.address}")
+    sttAgent.run()
@@ -0,0 +1,362 @@
+"""
+tts_engine.py
+
+Long-lived Piper TTS engine for the voice assistant.
+
+- Loads the ONNX voice once and keeps it loaded
+- In-process via the `piper` Python package (piper-tts) if installed,
+  otherwise one persistent `piper --output-raw` CLI worker fed over stdin
+- Streams raw 16-bit PCM chunks straight into a sounddevice output
+  stream while the rest of the sentence is still being synthesized
+- PhraseCache: PCM of already spoken phrases is kept (LRU, byte bound),
+  keyed on sha256(voice model, text); fixed prompts can be pre-rendered.
+  Template sentences (fixed prefix + time/count at the end) reuse the
+  cached prefix and only synthesize the slot; other text with digits is
+  streamed as one fresh utterance
+"""
+
+import hashlib
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+# Text with digits ("14:35", "2", "B12") is never cached as a whole
+_DIGIT = re.compile(r"\d")
+# Template slot: a time or count at the very end of a digit-free prefix,
+# e.g. "Ihr Parkplatz ist reserviert bis 14:35 Uhr."
+_SLOT = re.compile(r"^(?P<prefix>\D*\D)\s+(?P<slot>(?:\d{1,2}:\d{2}|\d+)(?:\s*Uhr)?[.!?]?)$")
+
+
+class PhraseCache:
+    """LRU cache of synthesized int16 PCM, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_path: str, text: str) -> str:
+        return hashlib.sha256(f"{model_path}\0{text}".encode("utf-8")).hexdigest()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries  # no hit/miss counting, no LRU update
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pcm = self._entries.get(key)
+            if pcm is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pcm
+
+    def put(self, key: str, pcm: bytes):
+        if len(pcm) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = pcm
+            self.bytes += len(pcm)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+
+class PiperTTSEngine:
+    """Keeps one Piper voice loaded and plays text as it is synthesized."""
+
+    def __init__(
+        self,
+        model_path: str,
+        config_path: Optional[str] = None,
+        piper_cmd: str = "piper",
+        first_audio_timeout: float = 10.0,
+        idle_gap: float = 0.4,
+        cache_bytes: int = 32 * 1024 * 1024,
+        stitch_gap_ms: float = 80.0,
+    ):
+        """
+        Args:
+            model_path: Path to the Piper .onnx voice
+            config_path: Path to the voice config (default: <model_path>.json)
+            piper_cmd: Piper executable for the CLI worker backend
+            first_audio_timeout: Max seconds to wait for the first PCM chunk (CLI backend)
+            idle_gap: Seconds without new PCM after which an utterance counts as
+                finished if Piper does not log its end marker (CLI backend)
+            cache_bytes: Size bound of the PhraseCache (0 = no cache)
+            stitch_gap_ms: Pause inserted where cached and fresh parts are joined
+        """
+        self.model_path = model_path
+        self.config_path = config_path or f"{model_path}.json"
+        self.piper_cmd = piper_cmd
+        self.first_audio_timeout = first_audio_timeout
+        self.idle_gap = idle_gap
+        self.cache = PhraseCache(cache_bytes) if cache_bytes else None
+        self.stitch_gap_ms = stitch_gap_ms
+
+        self.sample_rate = self._read_sample_rate()
+        self.backend: Optional[str] = None
+        self.last_time_to_first_audio: Optional[float] = None
+
+        self._voice = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._audio_q: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        # synthesis and playback are locked separately, so the next text can
+        # be synthesized while the current one is still playing
+        self._lock = threading.RLock()
+        self._play_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        """Load the voice (in-process if possible, else start the CLI worker)."""
+        if self.backend is not None:
+            return
+
+        try:
+            from piper import PiperVoice  # piper-tts
+
+            self._voice = PiperVoice.load(self.model_path, config_path=self.config_path)
+            self.sample_rate = int(self._voice.config.sample_rate)
+            self.backend = "inprocess"
+        except ImportError:
+            self._start_cli_worker()
+            self.backend = "cli"
+
+    def close(self):
+        if self._proc is not None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=2)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+        self.backend = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def stream(self, text: str) -> Iterator[bytes]:
+        """Yield raw int16 mono PCM chunks for `text` as they are synthesized."""
+        self.start()
+        text = " ".join(text.split())  # Piper reads one utterance per line
+        if not text:
+            return
+
+        with self._lock:
+            if self.backend == "inprocess":
+                if hasattr(self._voice, "synthesize_stream_raw"):  # piper-tts 1.2
+                    yield from self._voice.synthesize_stream_raw(text)
+                else:  # piper-tts >= 1.3
+                    for chunk in self._voice.synthesize(text):
+                        yield chunk.audio_int16_bytes
+                return
+
+            yield from self._stream_cli(text)
+
+    def render(self, text: str) -> bytes:
+        """Full PCM for `text`, from the cache if possible (stored on a miss)."""
+        return b"".join(self._cached_stream(" ".join(text.split())))
+
+    def prerender(self, texts: Iterable[str]) -> int:
+        """Synthesize fixed prompts into the cache; returns how many were new."""
+        if self.cache is None:
+            return 0
+        new = 0
+        for text in texts:
+            key = PhraseCache.key(self.model_path, " ".join(text.split()))
+            if key not in self.cache:
+                self.render(text)
+                new += 1
+        return new
+
+    def pcm(self, text: str) -> Iterator[bytes]:
+        """
+        PCM chunks for `text`, using the cache.
+
+        Plain text is one cache entry (streamed on a miss). A template
+        sentence whose prefix is already cached plays that prefix and
+        synthesizes only the slot at the end, joined with a short pause.
+        Any other text with digits is streamed once as a whole, so it
+        sounds like one sentence and starts playing right away.
+        """
+        text = " ".join(text.split())
+        if self.cache is None:
+            yield from self.stream(text)
+            return
+
+        if not _DIGIT.search(text):
+            yield from self._cached_stream(text)
+            return
+
+        slot = _SLOT.match(text)
+        if slot and PhraseCache.key(self.model_path, slot["prefix"]) in self.cache:
+            gap = b"\0\0" * int(self.sample_rate * self.stitch_gap_ms / 1000)
+            yield self._trim(self.render(slot["prefix"]))
+            yield gap
+            yield self._trim(b"".join(self.stream(slot["slot"])))
+            return
+
+        yield from self.stream(text)
+
+    def speak(self, text: str):
+        """Synthesize and play `text`, blocking until playback is finished."""
+        self.start()
+        self.play(self.pcm(text))
+
+    @property
+    def playing(self) -> bool:
+        """True while play() is writing audio to the speaker."""
+        return self._play_lock.locked()
+
+    def play(self, chunks: Iterable[bytes]):
+        """
+        Play int16 PCM chunks as they arrive, blocking until playback is finished.
+
+        `chunks` may be produced by another thread (e.g. a queue filled by
+        pcm()), which lets synthesis of the next text overlap playback.
+        """
+        import sounddevice as sd
+
+        with self._play_lock:
+            t0 = time.perf_counter()
+            first = True
+            carry = b""
+            # leaving the context stops the stream, which waits for pending buffers
+            with sd.RawOutputStream(samplerate=self.sample_rate, channels=1, dtype="int16") as out:
+                for chunk in chunks:
+                    if first:
+                        self.last_time_to_first_audio = time.perf_counter() - t0
+                        first = False
+                    chunk = carry + chunk
+                    # int16 frames: keep an odd trailing byte for the next chunk
+                    cut = len(chunk) - (len(chunk) % 2)
+                    carry = chunk[cut:]
+                    if cut:
+                        out.write(chunk[:cut])
+
+            if not first:
+                print(f"⏱️ TTS erstes Audio nach {self.last_time_to_first_audio * 1000:.0f} ms ({self.backend})")
+
+    # ------------------------------------------------------------------
+    # Phrase cache helpers
+    # ------------------------------------------------------------------
+    def _cached_stream(self, text: str) -> Iterator[bytes]:
+        if self.cache is None:
+            yield from self.stream(text)
+            return
+        key = PhraseCache.key(self.model_path, text)
+        pcm = self.cache.get(key)
+        if pcm is not None:
+            yield pcm
+            return
+        chunks = []
+        for chunk in self.stream(text):
+            chunks.append(chunk)
+            yield chunk
+        self.cache.put(key, b"".join(chunks))
+
+    def _trim(self, pcm: bytes, threshold: int = 200) -> bytes:
+        """Cut leading/trailing silence, keeping 20 ms so consonants are not clipped."""
+        samples = np.frombuffer(pcm[: len(pcm) - len(pcm) % 2], dtype=np.int16)
+        loud = np.flatnonzero(np.abs(samples.astype(np.int32)) > threshold)
+        if len(loud) == 0:
+            return samples.tobytes()
+        margin = int(self.sample_rate * 0.02)
+        return samples[max(0, loud[0] - margin): loud[-1] + margin].tobytes()
+
+    # ------------------------------------------------------------------
+    # CLI worker backend
+    # ------------------------------------------------------------------
+    def _start_cli_worker(self):
+        self._proc = subprocess.Popen(
+            [self.piper_cmd, "-m", self.model_path, "-c", self.config_path, "--output-raw"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+        )
+        threading.Thread(target=self._pump_stdout, daemon=True).start()
+        threading.Thread(target=self._pump_stderr, daemon=True).start()
+
+    def _pump_stdout(self):
+        fd = self._proc.stdout.fileno()
+        while True:
+            data = os.read(fd, 4096)
+            if not data:
+                break
+            self._audio_q.put(data)
+
+    def _pump_stderr(self):
+        # The C++ piper logs one "Real-time factor" line per finished utterance
+        for line in iter(self._proc.stderr.readline, b""):
+            if b"Real-time factor" in line:
+                self._audio_q.put(None)
+
+    def _stream_cli(self, text: str) -> Iterator[bytes]:
+        if self._proc is None or self._proc.poll() is not None:
+            raise RuntimeError("Piper-Worker läuft nicht")
+
+        # Leftovers of a previous (aborted) utterance must not leak into this one
+        while not self._audio_q.empty():
+            self._audio_q.get_nowait()
+
+        self._proc.stdin.write((text + "\n").encode("utf-8"))
+        self._proc.stdin.flush()
+
+        got_audio = False
+        ended = False
+        while True:
+            if ended:
+                # end marker on stderr may overtake the last stdout bytes
+                timeout = 0.05
+            elif got_audio:
+                timeout = self.idle_gap
+            else:
+                timeout = self.first_audio_timeout
+
+            try:
+                item = self._audio_q.get(timeout=timeout)
+            except queue.Empty:
+                if got_audio or ended:
+                    return
+                raise RuntimeError("Piper hat kein Audio geliefert")
+
+            if item is None:
+                ended = True
+                continue
+
+            got_audio = True
+            yield item
+
+    # ------------------------------------------------------------------
+    def _read_sample_rate(self) -> int:
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                return int(json.load(f)["audio"]["sample_rate"])
+        except Exception:
+            return 22050
@@ -5,27 +5,47 @@ Voice Assistant Agent for your rest-stop simulation.
 
 - Faster-Whisper (tiny) for STT
 - Ollama + LLMIntentClassifier for intent → structured command
-- Piper TTS for speech output (via CLI + WAV files)
+- Piper TTS for speech output (persistent engine, streamed PCM playback)
 - Talks to CentralService, which forwards to the service agents
 - Uses a wake word ("DAINO") so it only listens when called
-- Non-blocking: uses asyncio.to_thread so the agent can receive replies
+- Continuous VAD capture: utterances are cut at end-of-speech
+- MFCC/DTW wake-word spotter, so Whisper only runs after a wake-word hit
+- Non-blocking: uses asyncio.to_thread so the agent can receive replies;
+  intent classification runs natively on the event loop (cancellable)
+- Streamed LLM answer: a short acknowledgement is spoken as soon as the
+  action is known
+- Barge-in: speaking again while the request is still being classified
+  cancels that classification and starts over with the new utterance
+- Fast startup: Whisper, Piper and the LLM are loaded concurrently in the
+  background (with a warm-up run each) while the agent already receives
+  replies; faster_whisper / sounddevice / soundfile are imported lazily
+- Optional shared STT server (stt_server.py): with STT_SERVER_ADDRESS set,
+  audio is sent there and batched with other cabs instead of loading
+  Whisper locally
+- Fixed prompts are pre-rendered into the TTS phrase cache at startup
+- Pipelined replies: the next service reply is synthesized while the
+  current one is playing (optionally merged into one spoken summary)
 """
 
 import asyncio
+import base64
 import os
+import queue
 import time
 import tempfile
 import subprocess
+import threading
+import uuid
 from datetime import datetime, timedelta
 from typing import List
 
 import numpy as np
-import sounddevice as sd
-import soundfile as sf
-from faster_whisper import WhisperModel
 from uagents import Agent, Context, Model
 
+from audio_capture import VADCapture
 from intent_classifier import LLMIntentClassifier, Intent
+from wake_word import WakeWordSpotter
+from tts_engine import PiperTTSEngine
 
 # ============================================================
 #                  SHARED MESSAGE MODELS
@@ -41,12 +61,14 @@ class EssenMessage(Model):
     vegan: int
     glutenfrei: int
     client_sender: str
+    idempotency_key: str = ""
 
 
 class KaffeeMessage(Model):
     type: str
     zeit: str
     client_sender: str
+    idempotency_key: str = ""
 
 
 class HaustierMessage(Model):
@@ -56,6 +78,7 @@ class HaustierMessage(Model):
     betreuung_von: str
     betreuung_bis: str
     client_sender: str
+    idempotency_key: str = ""
 
 
 class HotelMessage(Model):
@@ -64,6 +87,7 @@ class HotelMessage(Model):
     zeit: str
     naechte: int
     client_sender: str
+    idempotency_key: str = ""
 
 
 class ParkplatzMessage(Model):
@@ -73,12 +97,28 @@ class ParkplatzMessage(Model):
     zeit: str
     reservation_id: str
     client_sender: str
+    idempotency_key: str = ""
+    von: str = ""   # Beginn "HH:MM" (leer = sofort), zeit = Ende
 
 
 class CentralServiceMessage(Model):
     messages: list  # list of dicts
 
 
+# ---- Shared STT server (must match stt_server.py) ----
+class SttRequest(Model):
+    audio_b64: str          # 16 kHz mono int16 PCM, base64
+    samplerate: int
+    language: str
+    correlation_id: str
+
+
+class SttResponse(Model):
+    correlation_id: str
+    text: str
+    error: str = ""
+
+
 # ---- Generic reply from ANY service ----
 # Must match the Message model in all services exactly!
 class Message(Model):
@@ -100,11 +140,30 @@ STT_MODEL_SIZE = "small"      # "tiny" is fast, good for testing
 STT_DEVICE = "cpu"           # "cuda" if you have GPU
 STT_COMPUTE_TYPE = "int8"    # good for CPU speed
 
+# Address printed by stt_server.py: one batched Whisper for several cabs
+# (None = load Whisper in this process)
+STT_SERVER_ADDRESS = None
+STT_SERVER_TIMEOUT_S = 10.0  # then transcribe locally (if loaded) or give up
+
 # TTS config (Piper CLI)
 PIPER_MODEL_PATH = "piper_voices/de_DE-thorsten-low.onnx"  # adjust if needed
-TTS_OUTPUT_DIR = "tts_output"
+TTS_OUTPUT_DIR = "tts_output"  # only used by the one-shot Piper fallback
 os.makedirs(TTS_OUTPUT_DIR, exist_ok=True)
 
+# PCM of spoken phrases is cached (fixed prompts pre-rendered at startup)
+TTS_CACHE_MB = 32
+
+# Service replies are synthesized one ahead of playback. With
+# MERGE_PENDING_REPLIES, confirmations arriving within MERGE_WINDOW_S of
+# each other are spoken as one text (no gaps, one synthesis call)
+MERGE_PENDING_REPLIES = False
+MERGE_WINDOW_S = 0.3
+
+# Captures go straight from the microphone into Whisper as NumPy arrays.
+# Set to True to additionally write every capture to AUDIO_DEBUG_DIR.
+DEBUG_DUMP_AUDIO = False
+AUDIO_DEBUG_DIR = "audio_debug"
+
 # Wake word config
 WAKE_WORD = "Hallo"          # what you say to activate the assistant
 WAKE_RECORD_SECONDS = 3      # short chunk for wake-word listening
@@ -112,23 +171,87 @@ WAKE_RECORD_SECONDS = 3      # short chunk for wake-word listening
 # Max recording length for full requests
 MAX_RECORD_SECONDS = 10
 
+# Voice-activity detection: cut utterances when the driver stops talking
+# (False = old fixed-length recordings above)
+USE_VAD_CAPTURE = True
+WAKE_MAX_SECONDS = 4         # longest utterance checked for the wake word
+VAD_HANGOVER_MS = 600        # silence that ends an utterance
+
+# Wake-word spotter (enroll templates with: python wake_word.py enroll)
+WAKE_TEMPLATE_DIR = "wake_templates"
+WAKE_SPOTTER_THRESHOLD = 0.35
+WAKE_CONFIRM_WITH_WHISPER = True   # Whisper double-checks each spotter hit
+
+# Earlier LLM answers are reused for repeated phrasings (None = memory only)
+INTENT_CACHE_PATH = "intent_cache.sqlite"
+
+# Offline classifier (intent_training.jsonl): clear cases skip the LLM and it
+# keeps the assistant usable when Ollama is down
+USE_LOCAL_INTENT = True
+
+# Stream the LLM answer and say a short "one moment" as soon as the action
+# is known, while the parameters are still being generated
+SPECULATIVE_ACK = True
+INTENT_DEADLINE_S = 15.0     # give up on the LLM after this long
+
+# Keep listening while the request is classified: if the driver speaks
+# again (e.g. a correction), the running classification is cancelled and
+# the new utterance is classified instead (needs USE_VAD_CAPTURE)
+BARGE_IN = True
+SPECULATIVE_ACK_TEXTS = {
+    "parking": "Einen Moment, ich buche Ihren Parkplatz.",
+    "food": "Einen Moment, ich bestelle Ihr Essen.",
+    "hotel": "Einen Moment, ich buche Ihr Zimmer.",
+    "coffee": "Einen Moment, ich bestelle Ihren Kaffee.",
+    "pet": "Einen Moment, ich kümmere mich um die Tierbetreuung.",
+}
+
+# Hedging: if the main model has not answered after HEDGE_DELAY_S, a second
+# (small, local) model gets the same request; the first good answer wins.
+# None = off. Tune the delay with the "Vorschlag hedge_delay" log line.
+HEDGE_MODEL = None           # e.g. "llama3.2:3b"
+HEDGE_DELAY_S = 1.5
+HEDGE_SHADOW_RATE = 0.05     # share of requests where both models finish (agreement stats)
+
+# Startup: run one inference per model before the first request, so the
+# first driver does not pay for allocations / lazy initialisation
+STARTUP_WARMUP = True
+
 # Language for Whisper ("de", "en", or None for auto detect)
 CURRENT_LANGUAGE = "de" 
 
+# Fixed prompts (pre-rendered into the TTS phrase cache)
+PROMPT_WAKE = "Wie kann ich Ihnen helfen?"
+PROMPT_NOT_UNDERSTOOD = (
+    "Ich habe nichts verstanden. "
+    f"Bitte sag '{WAKE_WORD}', um es noch einmal zu versuchen."
+)
+PROMPT_HELP = (
+    "Ich kann dir bei Parkplatz, Essen, Hotel, Kaffee "
+    "und Haustierbetreuung helfen. "
+    f"Bitte sag '{WAKE_WORD}' und formuliere deine Anfrage noch einmal."
+)
+PROMPT_NO_ACTION = "Ich konnte keine passende Aktion finden."
+PROMPT_ERROR = "Es ist ein Fehler aufgetreten. Bitte versuche es erneut."
+FIXED_PROMPTS = [
+    PROMPT_WAKE, PROMPT_NOT_UNDERSTOOD, PROMPT_HELP, PROMPT_NO_ACTION, PROMPT_ERROR,
+    *SPECULATIVE_ACK_TEXTS.values(),
+]
+
 # ============================================================
 #              INIT STT + LLM + AGENT + QUEUE
 # ============================================================
 
-print("🔊 Lade Faster-Whisper …")
-stt_model = WhisperModel(
-    STT_MODEL_SIZE,
-    device=STT_DEVICE,
-    compute_type=STT_COMPUTE_TYPE,
-)
+# Heavy models are loaded by startup_pipeline() once the agent runs;
+# voice_main waits for models_ready.
+stt_model = None
+
+# Keeps the voice loaded for the whole session instead of one piper process per sentence
+tts_engine = PiperTTSEngine(PIPER_MODEL_PATH, cache_bytes=TTS_CACHE_MB * 1024 * 1024)
 
-print("🧠 Initialisiere LLM-Intent-Classifier …")
-# Use defaults from intent_classifier.py (you can set model/api there)
-intent_classifier = LLMIntentClassifier()
+# Built by startup_pipeline() as well: training the offline classifier and
+# opening the sqlite cache should not run on import
+intent_classifier: LLMIntentClassifier | None = None
 
 assistantAgent = Agent(
     name="VoiceAssistant",
@@ -139,11 +262,41 @@ assistantAgent = Agent(
 
 print(f"[VoiceAssistant] gestartet! Adresse: {assistantAgent.address}")
 
+# Continuous microphone stream (only opened when USE_VAD_CAPTURE is on)
+capture = VADCapture(hangover_ms=VAD_HANGOVER_MS)
+
+# Cheap keyword spotting in front of Whisper
+wake_spotter = WakeWordSpotter(WAKE_TEMPLATE_DIR, WAKE_SPOTTER_THRESHOLD)
+if not wake_spotter.ready:
+    print(
+        f"⚠️ Keine Wake-Word-Templates in '{WAKE_TEMPLATE_DIR}' – "
+        "Whisper prüft jede Äußerung (python wake_word.py enroll)."
+    )
+
+# Set by startup_pipeline() when STT, TTS and the LLM are loaded
+models_ready = asyncio.Event()
+startup_timings: dict[str, float] = {}
+
+# STT server requests waiting for their SttResponse, by correlation_id
+pending_stt: dict[str, asyncio.Future] = {}
+
+# Running LLM classification (cancelled when a new request starts)
+classify_task: asyncio.Task | None = None
+
+# End-of-speech -> intent latencies (ms) of this session
+eos_to_intent_ms: List[float] = []
+
 # Queue for replies so they are spoken in order
 reply_queue: asyncio.Queue[Message] = asyncio.Queue()
 
+# Synthesized replies waiting for playback: (text, PCM chunk queue).
+# maxsize 1 = synthesize at most one reply ahead of the one playing.
+playback_queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+# Background tasks started by starter(); the event loop only keeps weak references
+_tasks: set[asyncio.Task] = set()
+
 # State flags
-_started = False
 waiting_for_wake_word = True
 waiting_for_request = False
 awaiting_replies = False
@@ -151,13 +304,111 @@ expected_replies = 0
 received_replies = 0
 
 
+# ============================================================
+#                  STARTUP PIPELINE
+# ============================================================
+
+def load_stt_blocking():
+    """Load Faster-Whisper and run one transcription on silence (blocking)."""
+    global stt_model
+    from faster_whisper import WhisperModel
+
+    stt_model = WhisperModel(
+        STT_MODEL_SIZE,
+        device=STT_DEVICE,
+        compute_type=STT_COMPUTE_TYPE,
+    )
+    if STARTUP_WARMUP:
+        # generators: the decoder only runs when the segments are consumed
+        segments, _ = stt_model.transcribe(
+            np.zeros(16000, dtype=np.float32), beam_size=5, language=CURRENT_LANGUAGE
+        )
+        list(segments)
+
+
+def start_tts_blocking():
+    """Load the Piper voice and pre-render the fixed prompts (blocking)."""
+    try:
+        tts_engine.start()
+        if STARTUP_WARMUP:
+            tts_engine.prerender(clean_text_for_tts(p) for p in FIXED_PROMPTS)
+    except Exception as e:
+        print(f"⚠️ Piper-TTS-Engine nicht verfügbar ({e}), nutze Fallback.")
+
+
+def load_llm_blocking():
+    """
+    Build the intent classifier (offline model, cache) and load the LLM,
+    evaluating its prompt prefix now instead of on the first request (blocking).
+    """
+    global intent_classifier
+    # Use defaults from intent_classifier.py (you can set model/api there)
+    intent_classifier = LLMIntentClassifier(
+        cache_path=INTENT_CACHE_PATH,
+        use_local=USE_LOCAL_INTENT,
+        stream=True,
+        hedge_model=HEDGE_MODEL,
+        hedge_delay=HEDGE_DELAY_S,
+        shadow_sample_rate=HEDGE_SHADOW_RATE,
+    )
+    if STARTUP_WARMUP:
+        intent_classifier.warmup()
+
+
+async def _timed(name: str, fn):
+    t0 = time.perf_counter()
+    try:
+        await asyncio.to_thread(fn)
+    except Exception as e:
+        print(f"❌ Start von {name} fehlgeschlagen: {e}")
+    startup_timings[name] = time.perf_counter() - t0
+
+
+async def startup_pipeline():
+    """
+    Load STT, TTS and the LLM concurrently in worker threads.
+
+    The agent is already running (and queueing service replies) while
+    this happens; voice_main and speaker_loop wait for models_ready.
+    """
+    print("⏳ Lade Modelle parallel …")
+    t0 = time.perf_counter()
+    loaders = [
+        _timed("Piper", start_tts_blocking),
+        _timed("LLM", load_llm_blocking),
+    ]
+    if STT_SERVER_ADDRESS is None:
+        loaders.append(_timed("Whisper", load_stt_blocking))
+    await asyncio.gather(*loaders)
+    total = time.perf_counter() - t0
+    parts = ", ".join(f"{name} {secs:.1f} s" for name, secs in startup_timings.items())
+    print(f"⏱️ Start: {total:.1f} s gesamt ({parts})")
+    models_ready.set()
+
+
 # ============================================================
 #                    AUDIO HELPERS
 # ============================================================
 
-def record_audio_blocking(duration: int, samplerate: int = 16000) -> str:
-    """Record from microphone and return path to temp WAV file (blocking)."""
+def dump_audio_for_debug(audio: np.ndarray, samplerate: int = 16000):
+    """Write a capture to AUDIO_DEBUG_DIR (only if DEBUG_DUMP_AUDIO is on)."""
+    if not DEBUG_DUMP_AUDIO or audio is None:
+        return
     try:
+        import soundfile as sf
+
+        os.makedirs(AUDIO_DEBUG_DIR, exist_ok=True)
+        name = datetime.now().strftime("capture_%Y%m%d_%H%M%S_%f.wav")
+        sf.write(os.path.join(AUDIO_DEBUG_DIR, name), audio, samplerate)
+    except Exception as e:
+        print(f"⚠️ Debug-Dump fehlgeschlagen: {e}")
+
+
+def record_audio_blocking(duration: int, samplerate: int = 16000) -> np.ndarray | None:
+    """Record a fixed-length window and return it as float32 mono array (blocking)."""
+    try:
+        import sounddevice as sd
+
         print(f"\n🎙️ Aufnahme startet (max {duration} Sekunden)…")
         audio = sd.rec(
             int(duration * samplerate),
@@ -167,27 +418,67 @@ def record_audio_blocking(duration: int, samplerate: int = 16000) -> str:
         )
         sd.wait()
         print("✅ Aufnahme beendet.")
+        return audio[:, 0]
 
-        tmp = tempfile.NamedTemporaryFile(
-            dir=TTS_OUTPUT_DIR, suffix=".wav", delete=False
-        )
-        sf.write(tmp.name, audio, samplerate)
-        return tmp.name
+    except Exception as e:
+        print(f"❌ Mikrofonfehler: {e}")
+        return None
+
+
+def capture_utterance_blocking(max_seconds: int, flush: bool = False):
+    """
+    Capture one utterance (blocking), entirely in memory.
+
+    Returns (audio, speech_end): a float32 16 kHz array (or None) and the
+    perf_counter() time the driver stopped talking. With VAD capture
+    disabled this is a fixed-length recording and speech_end = now.
+    """
+    if not USE_VAD_CAPTURE:
+        audio = record_audio_blocking(max_seconds)
+        dump_audio_for_debug(audio)
+        return audio, time.perf_counter()
 
+    try:
+        utt = capture.listen(max_seconds, start_timeout=5.0, flush=flush)
     except Exception as e:
         print(f"❌ Mikrofonfehler: {e}")
-        return ""
+        return None, time.perf_counter()
 
+    if utt is None:
+        return None, time.perf_counter()
+    print(f"✅ Äußerung erkannt ({utt.duration:.1f} s).")
+    dump_audio_for_debug(utt.audio, utt.samplerate)
+    return utt.audio, utt.speech_end
 
-def transcribe_blocking(path: str, language: str = CURRENT_LANGUAGE) -> str:
-    """Use Faster-Whisper to transcribe audio file (blocking)."""
-    if not path:
+
+def capture_barge_in_blocking(stop: threading.Event):
+    """
+    Wait for the driver to speak again until `stop` is set (blocking).
+
+    Our own playback (e.g. the speculative acknowledgement) is ignored.
+    Returns (audio, speech_end); audio is None once `stop` was set.
+    """
+    try:
+        utt = capture.listen(MAX_RECORD_SECONDS, stop=stop, mute=lambda: tts_engine.playing)
+    except Exception as e:
+        print(f"❌ Mikrofonfehler: {e}")
+        return None, time.perf_counter()
+
+    if utt is None:
+        return None, time.perf_counter()
+    dump_audio_for_debug(utt.audio, utt.samplerate)
+    return utt.audio, utt.speech_end
+
+
+def transcribe_blocking(audio: np.ndarray | None, language: str = CURRENT_LANGUAGE) -> str:
+    """Use Faster-Whisper to transcribe a float32 16 kHz array (blocking, no disk I/O)."""
+    if audio is None or len(audio) == 0 or stt_model is None:
         return ""
 
     try:
         print("📝 Transkribiere Audio …")
         segments, info = stt_model.transcribe(
-            path,
+            audio,
             beam_size=5,
             language=language,  # forced to 'de'
         )
@@ -199,68 +490,149 @@ def transcribe_blocking(path: str, language: str = CURRENT_LANGUAGE) -> str:
         return ""
 
 
+async def transcribe(ctx: Context, audio: np.ndarray | None, language: str = CURRENT_LANGUAGE) -> str:
+    """Transcribe via the shared STT server if configured, else with the local model."""
+    if STT_SERVER_ADDRESS is None or audio is None or len(audio) == 0:
+        return await asyncio.to_thread(transcribe_blocking, audio, language)
+
+    correlation_id = str(uuid.uuid4())
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    future = asyncio.get_running_loop().create_future()
+    pending_stt[correlation_id] = future
+    try:
+        print("📝 Transkribiere Audio (STT-Server) …")
+        await ctx.send(STT_SERVER_ADDRESS, SttRequest(
+            audio_b64=base64.b64encode(pcm.tobytes()).decode("ascii"),
+            samplerate=16000,
+            language=language or "",
+            correlation_id=correlation_id,
+        ))
+        text = await asyncio.wait_for(future, STT_SERVER_TIMEOUT_S)
+        print(f"🗣️ Erkannt: {text}")
+        return text
+    except Exception as e:
+        print(f"❌ STT-Server-Fehler: {str(e) or 'Zeitüberschreitung'}")
+        return await asyncio.to_thread(transcribe_blocking, audio, language)
+    finally:
+        pending_stt.pop(correlation_id, None)
+
+
+def clean_text_for_tts(s: str) -> str:
+    """Remove emojis and sanitize text for TTS."""
+    if not s:
+        return s
+
+    out_chars = []
+    for ch in s:
+        cp = ord(ch)
+
+        # Skip emojis (most are in these ranges)
+        if (0x1F300 <= cp <= 0x1F9FF or  # Emoticons, symbols, pictographs
+            0x2600 <= cp <= 0x26FF or     # Miscellaneous symbols
+            0x2700 <= cp <= 0x27BF or     # Dingbats
+            0xFE00 <= cp <= 0xFE0F or     # Variation selectors
+            0x1F000 <= cp <= 0x1F02F or   # Mahjong, domino tiles
+            0x1F0A0 <= cp <= 0x1F0FF):    # Playing cards
+            continue
+
+        # Skip surrogates (0xD800-0xDFFF)
+        if 0xD800 <= cp <= 0xDFFF:
+            continue
+
+        # Replace control characters (except whitespace) with space
+        if cp < 0x20 and ch not in "\n\r\t":
+            out_chars.append(" ")
+            continue
+
+        # Skip other problematic characters
+        if cp > 0x10FFFF:  # Beyond valid Unicode
+            continue
+
+        out_chars.append(ch)
+
+    result = "".join(out_chars)
+    # Clean up multiple spaces
+    while "  " in result:
+        result = result.replace("  ", " ")
+    return result.strip()
+
+
 def tts_speak_blocking(text: str):
-    """Use Piper CLI to synthesize and play speech (blocking)."""
+    """Speak text with the persistent Piper engine (blocking)."""
     if not text:
         return
 
+    # FIRST: Remove/replace emojis and problematic characters BEFORE any processing
+    cleaned_text = clean_text_for_tts(text)
+
+    if not cleaned_text:
+        print("⚠️ TTS: Text wurde vollständig gefiltert, nichts zu sagen.")
+        return
+
+    print(f"🔈 Assistant sagt: {cleaned_text}")
+
     try:
-        # FIRST: Remove/replace emojis and problematic characters BEFORE any processing
-        def clean_text_for_tts(s: str) -> str:
-            """Remove emojis and sanitize text for TTS."""
-            if not s:
-                return s
-            
-            out_chars = []
-            for ch in s:
-                cp = ord(ch)
-                
-                # Skip emojis (most are in these ranges)
-                if (0x1F300 <= cp <= 0x1F9FF or  # Emoticons, symbols, pictographs
-                    0x2600 <= cp <= 0x26FF or     # Miscellaneous symbols
-                    0x2700 <= cp <= 0x27BF or     # Dingbats
-                    0xFE00 <= cp <= 0xFE0F or     # Variation selectors
-                    0x1F000 <= cp <= 0x1F02F or   # Mahjong, domino tiles
-                    0x1F0A0 <= cp <= 0x1F0FF):    # Playing cards
-                    continue
-                
-                # Skip surrogates (0xD800-0xDFFF)
-                if 0xD800 <= cp <= 0xDFFF:
-                    continue
-                
-                # Replace control characters (except whitespace) with space
-                if cp < 0x20 and ch not in "\n\r\t":
-                    out_chars.append(" ")
-                    continue
-                
-                # Skip other problematic characters
-                if cp > 0x10FFFF:  # Beyond valid Unicode
-                    continue
-                    
-                out_chars.append(ch)
-            
-            result = "".join(out_chars)
-            # Clean up multiple spaces
-            while "  " in result:
-                result = result.replace("  ", " ")
-            return result.strip()
-
-        cleaned_text = clean_text_for_tts(text)
-        
-        if not cleaned_text:
-            print("⚠️ TTS: Text wurde vollständig gefiltert, nichts zu sagen.")
-            return
-            
-        print(f"🔈 Assistant sagt: {cleaned_text}")
+        tts_engine.speak(cleaned_text)
+        return
+    except FileNotFoundError:
+        print("❌ Piper nicht gefunden. Ist es installiert und im PATH?")
+    except Exception as e:
+        print(f"❌ TTS-Engine-Fehler: {e}")
+
+    tts_speak_oneshot(cleaned_text)
+
+
+def render_reply_blocking(text: str, chunks: queue.Queue):
+    """Synthesis stage: feed PCM chunks of `text` into `chunks` (blocking)."""
+    try:
+        for chunk in tts_engine.pcm(text):
+            chunks.put(chunk)
+        chunks.put(None)
+    except Exception as e:
+        chunks.put(e)
+
+
+def play_reply_blocking(text: str, chunks: queue.Queue):
+    """Playback stage: play chunks as the synthesis stage delivers them (blocking)."""
+    played = False
+
+    def pcm():
+        nonlocal played
+        while True:
+            item = chunks.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            played = True
+            yield item
+
+    print(f"🔈 Assistant sagt: {text}")
+    try:
+        tts_engine.play(pcm())
+        return
+    except Exception as e:
+        print(f"❌ TTS-Engine-Fehler: {e}")
+    if not played:
+        tts_speak_oneshot(text)
 
-        # Clean old wav files in the folder
-        for fname in os.listdir(TTS_OUTPUT_DIR):
-            if fname.lower().endswith(".wav"):
-                try:
-                    os.remove(os.path.join(TTS_OUTPUT_DIR, fname))
-                except OSError:
-                    pass
 
+def merge_replies(msgs: List[Message]) -> str:
+    """One spoken summary for several replies; outdated acks are dropped."""
+    confirmations = [m for m in msgs if m.type != "status"]
+    texts = []
+    for m in confirmations or msgs:
+        text = clean_text_for_tts(m.message)
+        if text:
+            texts.append(text if text[-1] in ".!?" else text + ".")
+    return " ".join(texts)
+
+
+def tts_speak_oneshot(cleaned_text: str):
+    """Fallback: one Piper CLI call per utterance via WAV file, then pyttsx3."""
+    wav_path = None
+    try:
+        # Own temp file per call, removed afterwards (never wipe the whole folder)
         tmp = tempfile.NamedTemporaryFile(
             dir=TTS_OUTPUT_DIR, suffix=".wav", delete=False
         )
@@ -272,7 +644,7 @@ def tts_speak_blocking(text: str):
             "-m", PIPER_MODEL_PATH,
             "-f", wav_path,
         ]
-        
+
         try:
             proc = subprocess.run(
                 cmd,
@@ -301,14 +673,21 @@ def tts_speak_blocking(text: str):
                 print("❌ Kein TTS-Fallback verfügbar (pyttsx3 fehlgeschlagen oder nicht installiert).")
                 return
 
+        import sounddevice as sd
+        import soundfile as sf
+
         data, samplerate = sf.read(wav_path)
         sd.play(data, samplerate)
         sd.wait()
 
-    except FileNotFoundError:
-        print("❌ Piper nicht gefunden. Ist es installiert und im PATH?")
     except Exception as e:
         print(f"❌ TTS-Fehler: {e}")
+    finally:
+        if wav_path:
+            try:
+                os.remove(wav_path)
+            except OSError:
+                pass
 
 
 # ============================================================
@@ -320,6 +699,8 @@ def build_central_message(intent: Intent, sender_address: str) -> CentralService
     now = datetime.now()
     jetzt = now.strftime("%H:%M")
     in_2_stunden = (now + timedelta(hours=2)).strftime("%H:%M")
+    # one key per spoken request, so retries of it are not booked twice
+    idempotency_key = str(uuid.uuid4())
 
     msgs: list[dict] = []
 
@@ -335,6 +716,7 @@ def build_central_message(intent: Intent, sender_address: str) -> CentralService
             zeit=jetzt,
             reservation_id=intent.parameters.get("reservation_id", ""),
             client_sender=sender_address,
+            idempotency_key=idempotency_key,
         )
         msgs.append(park_msg.dict())
 
@@ -353,6 +735,7 @@ def build_central_message(intent: Intent, sender_address: str) -> CentralService
             vegan=vegan,
             glutenfrei=glutenfrei,
             client_sender=sender_address,
+            idempotency_key=idempotency_key,
         )
         msgs.append(essen_msg.dict())
 
@@ -366,6 +749,7 @@ def build_central_message(intent: Intent, sender_address: str) -> CentralService
             zeit=jetzt,
             naechte=naechte,
             client_sender=sender_address,
+            idempotency_key=idempotency_key,
         )
         msgs.append(hotel_msg.dict())
 
@@ -374,6 +758,7 @@ def build_central_message(intent: Intent, sender_address: str) -> CentralService
             type="kaffee",
             zeit=jetzt,
             client_sender=sender_address,
+            idempotency_key=idempotency_key,
         )
         msgs.append(kaffee_msg.dict())
 
@@ -387,6 +772,7 @@ def build_central_message(intent: Intent, sender_address: str) -> CentralService
             betreuung_von=jetzt,
             betreuung_bis=in_2_stunden,
             client_sender=sender_address,
+            idempotency_key=idempotency_key,
         )
         msgs.append(haustier_msg.dict())
 
@@ -418,11 +804,116 @@ async def on_service_reply(ctx: Context, sender: str, msg: Message):
             waiting_for_wake_word = True
 
 
+@assistantAgent.on_message(model=SttResponse)
+async def on_stt_reply(ctx: Context, sender: str, msg: SttResponse):
+    """Hand a transcript from the STT server to the waiting transcribe() call."""
+    future = pending_stt.get(msg.correlation_id)
+    if future is None or future.done():
+        return  # late answer after a timeout
+    if msg.error:
+        future.set_exception(RuntimeError(msg.error))
+    else:
+        future.set_result(msg.text)
+
+
+async def synth_loop():
+    """
+    Stage 1: take replies from reply_queue and synthesize them.
+
+    A reply is handed to the speaker loop before its synthesis starts,
+    so playback begins with the first chunk; the loop then moves on to
+    the next reply while this one is still playing.
+    """
+    # replies that arrive while Piper is still loading wait in the queue
+    await models_ready.wait()
+    while True:
+        msgs = [await reply_queue.get()]
+        if MERGE_PENDING_REPLIES:
+            await asyncio.sleep(MERGE_WINDOW_S)
+            while not reply_queue.empty():
+                msgs.append(reply_queue.get_nowait())
+        text = merge_replies(msgs)
+        if not text:
+            continue
+
+        chunks: queue.Queue = queue.Queue()
+        await playback_queue.put((text, chunks))
+        await asyncio.to_thread(render_reply_blocking, text, chunks)
+
+
 async def speaker_loop():
-    """Background task: read replies from queue and speak them one by one."""
+    """Stage 2: play synthesized replies one by one."""
     while True:
-        msg: Message = await reply_queue.get()
-        await asyncio.to_thread(tts_speak_blocking, msg.message)
+        text, chunks = await playback_queue.get()
+        await asyncio.to_thread(play_reply_blocking, text, chunks)
+
+
+def cancel_classification():
+    """Abort a classification that is still waiting for the LLM."""
+    global classify_task
+    if classify_task is not None and not classify_task.done():
+        classify_task.cancel()
+    classify_task = None
+
+
+async def classify_request(ctx: Context, text: str, speech_end: float):
+    """
+    Classify the driver's request while listening for them to speak again.
+
+    A new utterance cancels the running classification and replaces the
+    request. Returns (text, intent, speech_end) of the request that was
+    finally classified.
+    """
+    global classify_task
+
+    while True:
+        cancel_classification()
+        on_action = make_speculative_ack() if SPECULATIVE_ACK else None
+        task = asyncio.create_task(
+            intent_classifier.aclassify(text, on_action, deadline=INTENT_DEADLINE_S)
+        )
+        classify_task = task
+
+        new_text = ""
+        if BARGE_IN and USE_VAD_CAPTURE:
+            stop = threading.Event()
+            while not task.done() and not new_text:
+                listen_task = asyncio.ensure_future(
+                    asyncio.to_thread(capture_barge_in_blocking, stop)
+                )
+                await asyncio.wait({task, listen_task}, return_when=asyncio.FIRST_COMPLETED)
+                if task.done():
+                    stop.set()
+                audio, new_end = await listen_task
+                if audio is not None:
+                    new_text = await transcribe(ctx, audio, CURRENT_LANGUAGE)
+
+        if new_text:
+            print(f"✋ Neue Anfrage, vorherige verworfen: {new_text}")
+            text, speech_end = new_text, new_end
+            continue
+
+        intent = await task
+        classify_task = None
+        return text, intent, speech_end
+
+
+def make_speculative_ack():
+    """
+    Callback for intent_classifier.(a)classify(on_action=...): hands the
+    acknowledgement to the speaker loop (also safe from a worker thread).
+    """
+    loop = asyncio.get_running_loop()
+
+    def on_action(action: str):
+        ack = SPECULATIVE_ACK_TEXTS.get(action)
+        if not ack:
+            return
+        print(f"💬 Vorläufige Aktion: {action}")
+        msg = Message(type="status", message=ack, zeit=datetime.now().strftime("%H:%M"))
+        loop.call_soon_threadsafe(reply_queue.put_nowait, msg)
+
+    return on_action
 
 
 # ============================================================
@@ -443,6 +934,10 @@ async def voice_main(ctx: Context):
     global waiting_for_wake_word, waiting_for_request
     global awaiting_replies, expected_replies, received_replies
 
+    await models_ready.wait()
+    if intent_classifier is None:
+        print("❌ Intent-Klassifikator nicht verfügbar – Voice Assistant beendet.")
+        return
     print("\n🎧 Voice Assistant bereit.")
     print(f"   Sag einfach '{WAKE_WORD}', wenn du Hilfe brauchst.\n")
 
@@ -454,19 +949,29 @@ async def voice_main(ctx: Context):
 
             # 1) WAIT FOR WAKE WORD
             if waiting_for_wake_word:
-                wav_path = await asyncio.to_thread(
-                    record_audio_blocking, WAKE_RECORD_SECONDS
-                )
-                text = await asyncio.to_thread(
-                    transcribe_blocking, wav_path, CURRENT_LANGUAGE
+                audio, _ = await asyncio.to_thread(
+                    capture_utterance_blocking,
+                    WAKE_MAX_SECONDS if USE_VAD_CAPTURE else WAKE_RECORD_SECONDS,
                 )
+                if audio is None:
+                    continue
+
+                # Cheap keyword spotting first; Whisper only runs after a hit
+                spotted = False
+                if wake_spotter.ready:
+                    if not await asyncio.to_thread(wake_spotter.detect, audio):
+                        continue
+                    spotted = True
+
+                if spotted and not WAKE_CONFIRM_WITH_WHISPER:
+                    text = WAKE_WORD
+                else:
+                    text = await transcribe(ctx, audio, CURRENT_LANGUAGE)
 
                 if text:
                     lower = text.lower()
                     if WAKE_WORD.lower() in lower:
-                        await asyncio.to_thread(
-                            tts_speak_blocking, "Wie kann ich Ihnen helfen?"
-                        )
+                        await asyncio.to_thread(tts_speak_blocking, PROMPT_WAKE)
                         waiting_for_wake_word = False
                         waiting_for_request = True
                         continue
@@ -475,18 +980,14 @@ async def voice_main(ctx: Context):
 
             # 2) RECORD THE DRIVER'S REQUEST
             if waiting_for_request:
-                wav_path = await asyncio.to_thread(
-                    record_audio_blocking, MAX_RECORD_SECONDS
-                )
-                text = await asyncio.to_thread(
-                    transcribe_blocking, wav_path, CURRENT_LANGUAGE
+                # flush: do not transcribe our own "Wie kann ich Ihnen helfen?"
+                audio, speech_end = await asyncio.to_thread(
+                    capture_utterance_blocking, MAX_RECORD_SECONDS, True
                 )
+                text = await transcribe(ctx, audio, CURRENT_LANGUAGE)
 
                 if not text:
-                    msg = (
-                        "Ich habe nichts verstanden. "
-                        f"Bitte sag '{WAKE_WORD}', um es noch einmal zu versuchen."
-                    )
+                    msg = PROMPT_NOT_UNDERSTOOD
                     print(msg)
                     await asyncio.to_thread(tts_speak_blocking, msg)
                     waiting_for_request = False
@@ -495,19 +996,28 @@ async def voice_main(ctx: Context):
 
                 print(f"🗣️ Fahreranfrage: {text}")
 
-                # Intent classification
-                intent = await asyncio.to_thread(intent_classifier.classify, text)
+                # Intent classification (native asyncio); speaking again
+                # while it runs cancels it and replaces the request
+                text, intent, speech_end = await classify_request(ctx, text, speech_end)
                 print(
                     f"→ Intent: {intent.action}, "
                     f"params={intent.parameters}, conf={intent.confidence:.2f}"
                 )
 
+                latency_ms = (time.perf_counter() - speech_end) * 1000.0
+                eos_to_intent_ms.append(latency_ms)
+                print(
+                    f"⏱️ Sprachende → Intent: {latency_ms:.0f} ms "
+                    f"(Median {sorted(eos_to_intent_ms)[len(eos_to_intent_ms) // 2]:.0f} ms "
+                    f"über {len(eos_to_intent_ms)} Anfragen)"
+                )
+                if intent_classifier.cache is not None:
+                    print(f"   Intent-Cache-Trefferquote: {intent_classifier.cache.hit_rate:.0%}")
+                if HEDGE_MODEL and intent_classifier.llm_calls and intent_classifier.llm_calls % 10 == 0:
+                    print(intent_classifier.hedge_report())
+
                 if intent.confidence < 0.4 or intent.action in ("unknown", "help"):
-                    msg = (
-                        "Ich kann dir bei Parkplatz, Essen, Hotel, Kaffee "
-                        "und Haustierbetreuung helfen. "
-                        f"Bitte sag '{WAKE_WORD}' und formuliere deine Anfrage noch einmal."
-                    )
+                    msg = PROMPT_HELP
                     print(msg)
                     await asyncio.to_thread(tts_speak_blocking, msg)
                     waiting_for_request = False
@@ -516,7 +1026,7 @@ async def voice_main(ctx: Context):
 
                 central_msg = build_central_message(intent, assistantAgent.address)
                 if not central_msg:
-                    msg = "Ich konnte keine passende Aktion finden."
+                    msg = PROMPT_NO_ACTION
                     print(msg)
                     await asyncio.to_thread(tts_speak_blocking, msg)
                     waiting_for_request = False
@@ -535,13 +1045,12 @@ async def voice_main(ctx: Context):
 
         except KeyboardInterrupt:
             print("\n👋 Voice Assistant manuell beendet.")
+            cancel_classification()
             break
         except Exception as e:
             print(f"❌ Fehler im Voice-Loop: {e}")
-            await asyncio.to_thread(
-                tts_speak_blocking,
-                "Es ist ein Fehler aufgetreten. Bitte versuche es erneut.",
-            )
+            cancel_classification()
+            await asyncio.to_thread(tts_speak_blocking, PROMPT_ERROR)
             waiting_for_wake_word = True
             waiting_for_request = False
             awaiting_replies = False
@@ -551,16 +1060,13 @@ async def voice_main(ctx: Context):
 #          STARTUP HOOK – START BACKGROUND TASKS ONCE
 # ============================================================
 
-@assistantAgent.on_interval(period=1.0)
+@assistantAgent.on_event("startup")
 async def starter(ctx: Context):
-    """Start the voice loop + speaker loop once, without blocking the agent."""
-    global _started
-    if _started:
-        return
-    _started = True
-
-    asyncio.create_task(speaker_loop())
-    asyncio.create_task(voice_main(ctx))
+    """Start model loading, the voice loop + reply pipeline once, without blocking the agent."""
+    for coro in (startup_pipeline(), synth_loop(), speaker_loop(), voice_main(ctx)):
+        task = asyncio.create_task(coro)
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
 
 
 # ============================================================
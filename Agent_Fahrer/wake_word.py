@@ -0,0 +1,204 @@
+"""
+wake_word.py
+
+Lightweight wake-word spotter ("Hallo") in front of Faster-Whisper.
+
+- MFCC features computed with NumPy only (no model download)
+- Subsequence DTW against a few enrolled recordings of the wake word,
+  so "Hallo" is also found at the start of a longer utterance
+- Costs a few milliseconds per utterance instead of a Whisper run
+
+Enroll templates once (records 5 samples into wake_templates/):
+
+    python wake_word.py enroll
+"""
+
+import glob
+import os
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+
+# ============================================================
+#                    FEATURES
+# ============================================================
+
+def _mel_filterbank(n_mels: int, n_fft: int, samplerate: int) -> np.ndarray:
+    def hz_to_mel(f):
+        return 2595.0 * np.log10(1.0 + f / 700.0)
+
+    def mel_to_hz(m):
+        return 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+
+    mels = np.linspace(hz_to_mel(60.0), hz_to_mel(samplerate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / samplerate).astype(int)
+
+    fb = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            fb[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            fb[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return fb
+
+
+class MFCCExtractor:
+    """25 ms / 10 ms framed MFCCs with cepstral mean normalization."""
+
+    def __init__(self, samplerate: int = 16000, n_mels: int = 40, n_mfcc: int = 13):
+        self.samplerate = samplerate
+        self.win = int(0.025 * samplerate)
+        self.hop = int(0.010 * samplerate)
+        self.n_fft = 1 << (self.win - 1).bit_length()
+        self.window = np.hamming(self.win).astype(np.float32)
+        self.fb = _mel_filterbank(n_mels, self.n_fft, samplerate)
+
+        # DCT-II basis, first coefficient (energy) dropped
+        k = np.arange(n_mfcc + 1)[1:, None]
+        n = np.arange(n_mels)[None, :]
+        self.dct = np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)).astype(np.float32)
+
+    def __call__(self, audio: np.ndarray) -> np.ndarray:
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if len(audio) < self.win:
+            audio = np.pad(audio, (0, self.win - len(audio)))
+
+        audio = np.append(audio[0], audio[1:] - 0.97 * audio[:-1])  # pre-emphasis
+        n_frames = 1 + (len(audio) - self.win) // self.hop
+        idx = np.arange(self.win)[None, :] + self.hop * np.arange(n_frames)[:, None]
+        frames = audio[idx] * self.window
+
+        power = np.abs(np.fft.rfft(frames, n=self.n_fft)) ** 2
+        log_mel = np.log(power @ self.fb.T + 1e-8)
+        mfcc = log_mel @ self.dct.T
+        mfcc -= mfcc.mean(axis=0, keepdims=True)
+
+        # unit length per frame -> cosine distance is 1 - dot product
+        mfcc /= np.linalg.norm(mfcc, axis=1, keepdims=True) + 1e-8
+        return mfcc
+
+
+# ============================================================
+#                    MATCHING
+# ============================================================
+
+def subsequence_dtw(template: np.ndarray, utterance: np.ndarray, stall_penalty: float = 0.2) -> float:
+    """
+    Length-normalized cost of the best match of `template` anywhere in `utterance`.
+
+    Every template frame advances the utterance by 0, 1 or 2 frames, so one
+    row of the cost matrix depends only on the previous row and is computed
+    as a single vectorized NumPy step. Inputs shorter than 2 frames cannot
+    be matched and cost inf.
+    """
+    if len(template) < 2 or len(utterance) < 2:
+        return float("inf")
+    cost = 1.0 - template @ utterance.T          # (n_template, n_utterance)
+    inf = np.float32(np.inf)
+
+    prev = cost[0].copy()                          # free start anywhere
+    for i in range(1, len(template)):
+        diag = np.concatenate(([inf], prev[:-1]))
+        skip = np.concatenate(([inf, inf], prev[:-2]))
+        stall = prev + stall_penalty
+        prev = cost[i] + np.minimum(np.minimum(diag, skip), stall)
+
+    return float(prev.min() / len(template))       # free end anywhere
+
+
+class WakeWordSpotter:
+    """Decides whether an utterance contains the wake word, without Whisper."""
+
+    def __init__(
+        self,
+        template_dir: str = "wake_templates",
+        threshold: float = 0.35,
+        samplerate: int = 16000,
+    ):
+        """
+        Args:
+            template_dir: Folder with enrolled 16 kHz mono WAV recordings of the wake word
+            threshold: Max. normalized DTW cost that counts as a hit (tune with
+                Agent_Test/bench_wake_word.py)
+            samplerate: Expected audio rate
+        """
+        self.template_dir = template_dir
+        self.threshold = threshold
+        self.samplerate = samplerate
+        self.features = MFCCExtractor(samplerate)
+        self.templates: List[np.ndarray] = []
+        self.load_templates()
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.templates)
+
+    def load_templates(self):
+        import soundfile as sf
+
+        self.templates = []
+        for path in sorted(glob.glob(os.path.join(self.template_dir, "*.wav"))):
+            audio, sr = sf.read(path, dtype="float32")
+            if audio.ndim > 1:
+                audio = audio.mean(axis=1)
+            if sr != self.samplerate:
+                print(f"⚠️ Wake-Template {path} hat {sr} Hz statt {self.samplerate} Hz, übersprungen.")
+                continue
+            self.templates.append(self.features(audio))
+
+    def score(self, audio: np.ndarray) -> float:
+        """Best (lowest) normalized DTW cost over all templates."""
+        if not self.templates:
+            return float("inf")
+        feats = self.features(audio)
+        return min(subsequence_dtw(t, feats) for t in self.templates)
+
+    def detect(self, audio: Optional[np.ndarray]) -> bool:
+        if audio is None or len(audio) == 0:
+            return False
+        return self.score(audio) <= self.threshold
+
+    def enroll(self, audio: np.ndarray) -> str:
+        """Store one recording of the wake word as an additional template."""
+        import soundfile as sf
+
+        os.makedirs(self.template_dir, exist_ok=True)
+        # next free number: skipped templates or deleted files must not be overwritten
+        used = set()
+        for existing in glob.glob(os.path.join(self.template_dir, "wake_*.wav")):
+            stem = os.path.splitext(os.path.basename(existing))[0][len("wake_"):]
+            if stem.isdigit():
+                used.add(int(stem))
+        n = max(used, default=0) + 1
+        path = os.path.join(self.template_dir, f"wake_{n:02d}.wav")
+        sf.write(path, audio, self.samplerate)
+        self.templates.append(self.features(audio))
+        return path
+
+
+# ============================================================
+#                    ENROLLMENT CLI
+# ============================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "enroll":
+        print(__doc__)
+        sys.exit(0)
+
+    from audio_capture import VADCapture
+
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    spotter = WakeWordSpotter()
+    capture = VADCapture()
+
+    print(f"Sag {count}× das Wake Word, jeweils mit kurzer Pause.")
+    for n in range(count):
+        print(f"\n🎙️ Aufnahme {n + 1}/{count} …")
+        utt = capture.listen(max_seconds=2.0, flush=True)
+        if utt is None:
+            continue
+        print(f"✅ Gespeichert: {spotter.enroll(utt.audio)} ({utt.duration:.2f} s)")
+    capture.close()
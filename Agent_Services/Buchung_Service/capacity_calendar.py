@@ -0,0 +1,167 @@
+"""
+capacity_calendar.py
+
+Zeitabhängige Belegung der Parkplätze statt einfacher Zähler.
+
+Pro Kategorie (z. B. ("PKW", "lade")) liegt die Belegung in Minuten-Buckets
+als Ring über die Uhrzeit: Minute m landet in Bucket m % größe. Buchbar
+ist bis zu einem Horizont (Standard 48 h) im Voraus; der Ring ist mindestens
+doppelt so groß, damit laufende Reservierungen (höchstens einen Horizont
+lang) nie mit künftigen kollidieren. Darüber ein Segmentbaum mit
+"Bereich addieren" und "Bereich-Maximum":
+
+- frei(kat, art, von, bis)     = Kapazität - max. Belegung in [von, bis)
+- reservieren / freigeben      = +n / -n auf [von, bis)
+
+Alles O(log Buckets), unabhängig von der Zahl der Reservierungen.
+
+Der Ring setzt voraus, dass jede Reservierung spätestens an ihrem Ende
+wieder freigegeben wird (im Service erledigt das der Ablauf über den
+DeadlineIndex) – sonst stünde ihre Belegung eine Ringlänge später wieder
+im Kalender. Reservierungen, die nach dem Horizont enden, werden abgelehnt.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+Kategorie = Tuple[str, str]
+
+
+class _MaxAddTree:
+    """Iterativer Segmentbaum: Bereich addieren, Bereich-Maximum (lazy)."""
+
+    def __init__(self, size: int):
+        self.n = size                       # Zweierpotenz
+        self.h = size.bit_length() - 1
+        self.t = [0] * (2 * size)           # Maximum im Teilbaum inkl. eigener Addition
+        self.d = [0] * size                 # noch nicht nach unten gegebene Addition
+
+    def _apply(self, p: int, v: int):
+        self.t[p] += v
+        if p < self.n:
+            self.d[p] += v
+
+    # max() als Builtin-Aufruf ist hier spürbar langsamer als ein Vergleich
+    def _build(self, p: int):
+        t, d = self.t, self.d
+        while p > 1:
+            p >>= 1
+            a, b = t[2 * p], t[2 * p + 1]
+            t[p] = (a if a > b else b) + d[p]
+
+    def _push(self, p: int):
+        t, d, n = self.t, self.d, self.n
+        for s in range(self.h, 0, -1):
+            i = p >> s
+            v = d[i]
+            if v:
+                for c in (2 * i, 2 * i + 1):
+                    t[c] += v
+                    if c < n:
+                        d[c] += v
+                d[i] = 0
+
+    def add(self, lo: int, hi: int, v: int):
+        """Addiert v auf die Buckets [lo, hi)."""
+        l, r = lo + self.n, hi + self.n
+        while l < r:
+            if l & 1:
+                self._apply(l, v)
+                l += 1
+            if r & 1:
+                r -= 1
+                self._apply(r, v)
+            l >>= 1
+            r >>= 1
+        self._build(lo + self.n)
+        self._build(hi - 1 + self.n)
+
+    def max(self, lo: int, hi: int) -> int:
+        """Maximum über die Buckets [lo, hi)."""
+        l, r = lo + self.n, hi + self.n
+        self._push(l)
+        self._push(r - 1)
+        res = 0
+        t = self.t
+        while l < r:
+            if l & 1:
+                if t[l] > res:
+                    res = t[l]
+                l += 1
+            if r & 1:
+                r -= 1
+                if t[r] > res:
+                    res = t[r]
+            l >>= 1
+            r >>= 1
+        return res
+
+
+class CapacityCalendar:
+    """Belegung pro (Kategorie, Art) über die Zeit, Minuten-genau."""
+
+    def __init__(self, kapazitaet: Dict[Kategorie, int], horizont_minuten: int = 48 * 60):
+        self.kapazitaet = dict(kapazitaet)
+        self.horizont = horizont_minuten
+        self._size = 1 << max(1, (2 * horizont_minuten - 1).bit_length())
+        self._baeume = {kat: _MaxAddTree(self._size) for kat in self.kapazitaet}
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _minute(t: datetime, aufrunden: bool = False) -> int:
+        ts = t.timestamp()
+        m = int(ts // 60)
+        return m + 1 if aufrunden and ts > m * 60 else m
+
+    def _bereiche(self, von: datetime, bis: datetime) -> List[Tuple[int, int]]:
+        """[von, bis) als ein oder zwei Bucket-Bereiche im Ring."""
+        start = self._minute(von)
+        ende = max(start + 1, self._minute(bis, aufrunden=True))
+        if ende - start > self.horizont:
+            raise ValueError(f"Zeitraum länger als der Horizont ({self.horizont} min)")
+        lo, hi = start % self._size, ende % self._size
+        if lo < hi:
+            return [(lo, hi)]
+        return [(lo, self._size)] + ([(0, hi)] if hi else [])
+
+    # ------------------------------------------------------------------
+    def belegt(self, kat: str, art: str, von: datetime, bis: datetime) -> int:
+        """Höchste gleichzeitige Belegung im Zeitraum [von, bis)."""
+        baum = self._baeume[(kat, art)]
+        return max(baum.max(lo, hi) for lo, hi in self._bereiche(von, bis))
+
+    def frei(self, kat: str, art: str, von: datetime, bis: datetime) -> int:
+        """Plätze, die im ganzen Zeitraum [von, bis) frei sind."""
+        if (kat, art) not in self._baeume:
+            return 0
+        return self.kapazitaet[(kat, art)] - self.belegt(kat, art, von, bis)
+
+    def buchbar(self, von: datetime, bis: datetime, jetzt: Optional[datetime] = None) -> bool:
+        """True, wenn [von, bis) nicht länger als der Horizont ist und nicht danach endet."""
+        ende = self._minute(bis, aufrunden=True)
+        return (ende - self._minute(von) <= self.horizont
+                and ende - self._minute(jetzt or datetime.now()) <= self.horizont)
+
+    def reservieren(
+        self, kat: str, art: str, von: datetime, bis: datetime, n: int = 1,
+        jetzt: Optional[datetime] = None,
+    ) -> bool:
+        """Belegt n Plätze in [von, bis), falls durchgehend frei und innerhalb des Horizonts."""
+        if not self.buchbar(von, bis, jetzt):
+            return False
+        try:
+            if self.frei(kat, art, von, bis) < n:
+                return False
+        except ValueError:
+            return False
+        self._add(kat, art, von, bis, n)
+        return True
+
+    def freigeben(self, kat: str, art: str, von: datetime, bis: datetime, n: int = 1):
+        """Gibt n zuvor reservierte Plätze in [von, bis) wieder frei."""
+        self._add(kat, art, von, bis, -n)
+
+    def _add(self, kat: str, art: str, von: datetime, bis: datetime, n: int):
+        baum = self._baeume[(kat, art)]
+        for lo, hi in self._bereiche(von, bis):
+            baum.add(lo, hi, n)
@@ -0,0 +1,105 @@
+"""
+idempotency.py
+
+Begrenzter TTL-Cache für Idempotenz-Schlüssel der Buchungs-Services.
+
+Clients schicken dieselbe Buchung periodisch erneut. Trägt die Anfrage
+einen `idempotency_key`, merkt sich der Service die ursprüngliche
+Bestätigung und spielt sie bei Wiederholungen erneut aus, ohne noch
+einmal Kapazität zu belegen.
+
+Mit einem StateStore werden die Einträge mitgeschrieben (Tabelle
+"bestaetigungen", im selben Commit wie die Buchung) und nach einem
+Neustart per restore() wieder geladen – sonst würde eine Wiederholung
+nach dem Neustart ein zweites Mal buchen.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional
+
+TABELLE = "bestaetigungen"
+
+
+class IdempotencyCache:
+    """LRU-Cache (Client, Schlüssel) -> Antwort-Felder mit Ablaufzeit."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 3600.0, store=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.store = store      # optional StateStore, Einträge überleben dann einen Neustart
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, client: str, key: str) -> Optional[dict]:
+        """Gespeicherte Antwort für (client, key) oder None."""
+        if not key:
+            return None
+        entry = self._entries.get((client, key))
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, reply = entry
+        if expires < time.monotonic():
+            del self._entries[(client, key)]
+            self._vergessen(client, key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end((client, key))
+        self.hits += 1
+        return reply
+
+    def put(self, client: str, key: str, reply: dict):
+        """Speichert die Antwort; ohne Schlüssel passiert nichts."""
+        if not key:
+            return
+        self._entries[(client, key)] = (time.monotonic() + self.ttl_seconds, reply)
+        self._entries.move_to_end((client, key))
+        if self.store is not None:
+            # Ablauf als Uhrzeit, monotonic() gilt nur bis zum Neustart
+            self.store.put(TABELLE, f"{client}|{key}", {
+                "client": client, "key": key, "reply": reply, "ablauf": time.time() + self.ttl_seconds,
+            })
+        self._evict()
+
+    def discard(self, client: str, key: str) -> Optional[dict]:
+        """Vergisst die Antwort für (client, key), z. B. wenn die Buchung nicht mehr besteht."""
+        if not key:
+            return None
+        entry = self._entries.pop((client, key), None)
+        if entry is None:
+            return None
+        self._vergessen(client, key)
+        return entry[1]
+
+    def restore(self) -> int:
+        """Lädt die Einträge aus dem (geöffneten) StateStore; liefert die Anzahl."""
+        if self.store is None:
+            return 0
+        jetzt, mono = time.time(), time.monotonic()
+        for eintrag in sorted(self.store.table(TABELLE).values(), key=lambda e: e["ablauf"]):
+            rest = eintrag["ablauf"] - jetzt
+            if rest <= 0:
+                self._vergessen(eintrag["client"], eintrag["key"])
+                continue
+            self._entries[(eintrag["client"], eintrag["key"])] = (mono + rest, eintrag["reply"])
+        self._evict()
+        return len(self._entries)
+
+    def _vergessen(self, client: str, key: str):
+        if self.store is not None:
+            self.store.delete(TABELLE, f"{client}|{key}")
+
+    def _evict(self):
+        now = time.monotonic()
+        # abgelaufene Einträge vorne abräumen, danach auf Größe kürzen
+        while self._entries:
+            expires, _ = next(iter(self._entries.values()))
+            if expires >= now and len(self._entries) <= self.max_entries:
+                break
+            (client, key), _ = self._entries.popitem(last=False)
+            self._vergessen(client, key)
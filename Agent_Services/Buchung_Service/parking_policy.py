@@ -0,0 +1,317 @@
+"""
+parking_policy.py
+
+Austauschbare Vergabe-Strategien für Parkplätze inkl. Fallbacks.
+
+Für jedes Fahrzeug liefert `kandidaten()` die möglichen Belegungen in der
+bisherigen Reihenfolge (eigener Platz zuerst, dann Fallbacks wie
+LKW → Bus-Platz oder 3× PKW). Eine Policy wählt daraus:
+
+- GreedyPolicy             erster passender Kandidat (altes Verhalten)
+- ReserveProtectingPolicy  Fallbacks dürfen eine Reserve pro Kategorie
+                           nicht anbrechen (z. B. 2 der 3 Busplätze)
+- LookaheadPolicy          bewertet Fallbacks mit der erwarteten Nachfrage
+                           der betroffenen Kategorie im Zeitraum
+                           (DemandProfile, z. B. Busse am Abend) und lehnt
+                           ab, wenn die Belegung voraussichtlich einem
+                           späteren eigenen Fahrzeug den Platz nimmt
+
+Dazu ein TraceRecorder (Anfragen als JSONL mitschreiben) und simulate(),
+das eine Trace gegen einen CapacityCalendar mit einer Policy abspielt.
+"""
+
+import heapq
+import json
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from capacity_calendar import CapacityCalendar, Kategorie
+
+
+@dataclass(frozen=True)
+class Kandidat:
+    """Eine mögliche Belegung: Antworttext und benötigte Plätze pro Kategorie."""
+    text: str
+    bedarf: Tuple[Tuple[Kategorie, int], ...]
+    fallback: bool = False
+    vorrang: bool = False   # Behinderten-Fahrzeuge: Fallback wird nie aus Vorsicht abgelehnt
+
+
+# Frei-Abfrage für den Zeitraum der Anfrage: (kat, art) -> freie Plätze
+FreiFn = Callable[[str, str], int]
+
+
+def _pkw_mix(n: int, text: str, vorrang: bool = False) -> List[Kandidat]:
+    """n PKW-Plätze, zuerst ohne, dann mit Ladesäule (wie früher consume_pkw_slots)."""
+    out = []
+    for lade in range(n + 1):
+        bedarf = tuple((k, c) for k, c in ((("PKW", "frei"), n - lade), (("PKW", "lade"), lade)) if c)
+        out.append(Kandidat(text, bedarf, fallback=True, vorrang=vorrang))
+    return out
+
+
+def _lkw(prefix: str = "", vorrang: bool = False) -> List[Kandidat]:
+    return [
+        Kandidat(prefix + "🚚🔌 LKW-Ladeparkplatz reserviert.", ((("LKW", "lade"), 1),),
+                 fallback=bool(prefix), vorrang=vorrang),
+        Kandidat(prefix + "🚚 (Fallback) Bus-Parkplatz für LKW reserviert.", ((("BUS", "lade"), 1),),
+                 fallback=True, vorrang=vorrang),
+        *_pkw_mix(3, prefix + "🚚 (Fallback) 3× PKW → LKW-Platz reserviert.", vorrang),
+    ]
+
+
+def kandidaten(fahrzeugart: str, lade: bool) -> List[Kandidat]:
+    """Mögliche Belegungen für ein Fahrzeug, eigener Platz zuerst."""
+    f = fahrzeugart.lower()
+
+    if "pkw" in f and "behindert" in f:
+        eigen = (Kandidat("♿🔌 Behinderten-PKW-Ladeparkplatz reserviert.", ((("PKW_Behindert", "lade"), 1),))
+                 if lade else
+                 Kandidat("♿ PKW-Behindertenparkplatz reserviert.", ((("PKW_Behindert", "frei"), 1),)))
+        return [eigen, *_pkw_mix(2, "♿ (Fallback) 2× PKW → Behindertenplatz reserviert.", vorrang=True)]
+
+    if "pkw" in f:
+        if lade:
+            return [Kandidat("🔌🚗 PKW-Ladeparkplatz reserviert.", ((("PKW", "lade"), 1),))]
+        return [Kandidat("🚗 PKW-Parkplatz reserviert.", ((("PKW", "frei"), 1),))]
+
+    if "lkw" in f and "behindert" in f:
+        return [
+            Kandidat("♿🚚🔌 Behinderten-LKW-Parkplatz reserviert.", ((("LKW_Behindert", "lade"), 1),)),
+            *_lkw("♿🚚 (Fallback) ", vorrang=True),
+        ]
+
+    if "lkw" in f:
+        return _lkw()
+
+    if "bus" in f:
+        return [Kandidat("🚌🔌 Bus-Parkplatz reserviert.", ((("BUS", "lade"), 1),))]
+
+    return []
+
+
+def passt(k: Kandidat, frei: FreiFn) -> bool:
+    return all(frei(kat, art) >= n for (kat, art), n in k.bedarf)
+
+
+# ============================================================
+#                     POLICIES
+# ============================================================
+
+class GreedyPolicy:
+    """Erster Kandidat, für den genug frei ist."""
+
+    name = "greedy"
+
+    def choose(self, kandidaten: List[Kandidat], frei: FreiFn, von: datetime, bis: datetime) -> Optional[Kandidat]:
+        for k in kandidaten:
+            if passt(k, frei):
+                return k
+        return None
+
+
+class ReserveProtectingPolicy(GreedyPolicy):
+    """Wie Greedy, aber Fallbacks (außer mit Vorrang) lassen pro Kategorie eine feste Reserve frei."""
+
+    name = "reserve"
+
+    DEFAULT_RESERVE = {
+        ("BUS", "lade"): 2,
+        ("PKW", "frei"): 5,
+        ("PKW", "lade"): 5,
+    }
+
+    def __init__(self, reserve: Optional[Dict[Kategorie, int]] = None):
+        self.reserve = dict(self.DEFAULT_RESERVE if reserve is None else reserve)
+
+    def choose(self, kandidaten, frei, von, bis):
+        for k in kandidaten:
+            if not passt(k, frei):
+                continue
+            if k.fallback and not k.vorrang and any(frei(kat, art) - n < self.reserve.get((kat, art), 0)
+                                  for (kat, art), n in k.bedarf):
+                continue
+            return k
+        return None
+
+
+class DemandProfile:
+    """Erwartete Ankünfte pro Kategorie und Stunde des Tages (aus einer Trace gelernt)."""
+
+    def __init__(self, rate: Optional[Dict[Kategorie, List[float]]] = None):
+        self.rate: Dict[Kategorie, List[float]] = defaultdict(lambda: [0.0] * 24)
+        for kat, werte in (rate or {}).items():
+            self.rate[kat] = list(werte)
+
+    @classmethod
+    def from_trace(cls, records: Iterable[dict]) -> "DemandProfile":
+        """Zählt Anfragen nach eigener Kategorie und Beginn-Stunde, geteilt durch die Anzahl Tage."""
+        counts: Dict[Kategorie, List[float]] = defaultdict(lambda: [0.0] * 24)
+        tage = set()
+        for r in records:
+            ks = kandidaten(r["fahrzeugart"], r["ladestation"])
+            if not ks:
+                continue
+            von = _dt(r["von"])
+            counts[ks[0].bedarf[0][0]][von.hour] += 1
+            tage.add(von.date())
+        n = max(1, len(tage))
+        return cls({kat: [c / n for c in werte] for kat, werte in counts.items()})
+
+    def erwartet(self, kat: Kategorie, von: datetime, bis: datetime) -> float:
+        """Erwartete Ankünfte der Kategorie, die in [von, bis) beginnen."""
+        werte = self.rate.get(kat)
+        if not werte:
+            return 0.0
+        summe, t = 0.0, von
+        while t < bis:
+            naechste = (t + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+            stueck = min(naechste, bis) - t
+            summe += werte[t.hour] * stueck.total_seconds() / 3600
+            t = naechste
+        return summe
+
+
+def _poisson_ab(lam: float, k: int) -> float:
+    """P(X >= k) für X ~ Poisson(lam)."""
+    if k <= 0:
+        return 1.0
+    if lam <= 0:
+        return 0.0
+    term = math.exp(-lam)
+    cdf = term
+    for i in range(1, k):
+        term *= lam / i
+        cdf += term
+        if term < 1e-12 and i > lam:
+            break
+    return max(0.0, 1.0 - cdf)
+
+
+class LookaheadPolicy(GreedyPolicy):
+    """
+    Eigener Platz wie Greedy; Fallbacks nur, wenn sie voraussichtlich nicht stören.
+
+    Preis eines Fallbacks = Summe über die belegten Kategorien von
+    P(eigene Ankünfte im Zeitraum >= verbleibende freie Plätze + 1), also die erwartete Zahl späterer eigener Fahrzeuge, die deswegen
+    abgewiesen werden. Gewählt wird der günstigste Fallback, sofern sein
+    Preis unter `schwelle` liegt; 1.0 = lohnt sich, solange er weniger
+    Ablehnungen kostet als die Ablehnung der aktuellen Anfrage. Fallbacks
+    mit Vorrang werden nie abgelehnt, nur der günstigste gewählt.
+
+    `gewichte` bewertet eine spätere Ablehnung je Kategorie: ein Bus hat
+    keinen Fallback und viele Fahrgäste, ein abgewiesener Bus zählt daher
+    standardmäßig wie 5 abgewiesene Fahrzeuge.
+    """
+
+    name = "lookahead"
+
+    DEFAULT_GEWICHTE = {
+        ("BUS", "lade"): 5.0,
+    }
+
+    def __init__(self, profil: DemandProfile, schwelle: float = 1.0,
+                 gewichte: Optional[Dict[Kategorie, float]] = None):
+        self.profil = profil
+        self.schwelle = schwelle
+        self.gewichte = dict(self.DEFAULT_GEWICHTE if gewichte is None else gewichte)
+
+    def preis(self, k: Kandidat, frei: FreiFn, von: datetime, bis: datetime) -> float:
+        summe = 0.0
+        for (kat, art), n in k.bedarf:
+            lam = self.profil.erwartet((kat, art), von, bis)
+            rest = frei(kat, art) - n
+            # jeder der n Plätze kann einem späteren eigenen Fahrzeug fehlen
+            summe += self.gewichte.get((kat, art), 1.0) * sum(_poisson_ab(lam, rest + 1 + i) for i in range(n))
+        return summe
+
+    def choose(self, kandidaten, frei, von, bis):
+        moeglich = [k for k in kandidaten if passt(k, frei)]
+        if not moeglich:
+            return None
+        if not moeglich[0].fallback:
+            return moeglich[0]
+        preis, k = min(((self.preis(k, frei, von, bis), k) for k in moeglich), key=lambda e: e[0])
+        return k if preis < self.schwelle or k.vorrang else None
+
+
+POLICIES = {
+    "greedy": GreedyPolicy,
+    "reserve": ReserveProtectingPolicy,
+    "lookahead": LookaheadPolicy,
+}
+
+
+# ============================================================
+#                     VERGABE + SIMULATION
+# ============================================================
+
+def allocate(kalender: CapacityCalendar, policy, fahrzeugart: str, lade: bool,
+             von: datetime, bis: datetime, jetzt: Optional[datetime] = None):
+    """Wählt per Policy und belegt im Kalender; liefert (text, belegt) oder (None, [])."""
+    if not kalender.buchbar(von, bis, jetzt):
+        return None, []
+    wahl = policy.choose(kandidaten(fahrzeugart, lade), lambda kat, art: kalender.frei(kat, art, von, bis), von, bis)
+    if wahl is None:
+        return None, []
+    belegt = []
+    for (kat, art), n in wahl.bedarf:
+        kalender.reservieren(kat, art, von, bis, n=n, jetzt=jetzt)
+        belegt += [(kat, art)] * n
+    return wahl.text, belegt
+
+
+def _dt(v) -> datetime:
+    return v if isinstance(v, datetime) else datetime.fromisoformat(v)
+
+
+class TraceRecorder:
+    """Hängt jede Parkplatz-Anfrage als JSON-Zeile an (für simulate())."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def record(self, anfrage: datetime, fahrzeugart: str, lade: bool, von: datetime, bis: datetime, ok: bool):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "anfrage": anfrage.isoformat(timespec="seconds"),
+                "fahrzeugart": fahrzeugart,
+                "ladestation": lade,
+                "von": von.isoformat(timespec="seconds"),
+                "bis": bis.isoformat(timespec="seconds"),
+                "ok": ok,
+            }, ensure_ascii=False) + "\n")
+
+
+def load_trace(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def simulate(records: Iterable[dict], policy, kapazitaet: Dict[Kategorie, int]) -> Dict[str, Counter]:
+    """
+    Spielt eine Trace mit einer Policy ab (Reservierungen laufen an `bis` ab).
+
+    Liefert {"anfragen": Counter, "abgelehnt": Counter} je Fahrzeugart.
+    """
+    kalender = CapacityCalendar(kapazitaet)
+    anfragen, abgelehnt = Counter(), Counter()
+    ablauf = []     # (bis, n, belegt, von)
+    for n, r in enumerate(sorted(records, key=lambda r: r["anfrage"])):
+        jetzt, von, bis = _dt(r["anfrage"]), _dt(r["von"]), _dt(r["bis"])
+        while ablauf and ablauf[0][0] <= jetzt:
+            e_bis, _, belegt, e_von = heapq.heappop(ablauf)
+            for kat, art in belegt:
+                kalender.freigeben(kat, art, e_von, e_bis)
+
+        art = r["fahrzeugart"]
+        anfragen[art] += 1
+        _, belegt = allocate(kalender, policy, art, r["ladestation"], von, bis, jetzt=jetzt)
+        if belegt:
+            heapq.heappush(ablauf, (bis, n, belegt, von))
+        else:
+            abgelehnt[art] += 1
+    return {"anfragen": anfragen, "abgelehnt": abgelehnt}
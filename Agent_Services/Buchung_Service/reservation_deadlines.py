@@ -0,0 +1,74 @@
+"""
+reservation_deadlines.py
+
+Zeitlich sortierter Index für Reservierungs-Fristen (Erinnerung + Ablauf).
+
+Statt alle Reservierungen periodisch zu durchlaufen, liegen die Fristen
+in einem Min-Heap. Der Wartungs-Task schläft genau bis zur nächsten
+Frist und bearbeitet nur fällige Einträge.
+
+Änderungen (neu planen / stornieren) sind O(log n): alte Heap-Einträge
+werden nicht gesucht, sondern über eine Versionsnummer pro Reservierung
+als veraltet erkannt und beim Herausnehmen verworfen.
+"""
+
+import heapq
+import itertools
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+REMINDER = "reminder"
+EXPIRY = "expiry"
+
+
+class DeadlineIndex:
+    """Min-Heap über (Zeitpunkt, Art, Reservierungs-ID)."""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, int, str, str]] = []
+        self._versions: Dict[str, int] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def schedule(self, rid: str, end: datetime, reminder_at: Optional[datetime] = None):
+        """Plant (oder ersetzt) Erinnerung und Ablauf einer Reservierung."""
+        version = self._versions.get(rid, 0) + 1
+        self._versions[rid] = version
+        if len(self._heap) > 4 * len(self._versions) + 64:
+            self._compact()
+        if reminder_at is not None:
+            heapq.heappush(self._heap, (reminder_at, next(self._seq), version, rid, REMINDER))
+        heapq.heappush(self._heap, (end, next(self._seq), version, rid, EXPIRY))
+
+    def cancel(self, rid: str):
+        """Entfernt alle Fristen einer Reservierung (lazy, O(1))."""
+        self._versions.pop(rid, None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        """Zeitpunkt der nächsten gültigen Frist oder None."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[Tuple[str, str]]:
+        """Liefert alle bis `now` fälligen (rid, art)-Paare in zeitlicher Reihenfolge."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, version, rid, kind = heapq.heappop(self._heap)
+            if self._versions.get(rid) != version:
+                continue
+            if kind == EXPIRY:
+                del self._versions[rid]
+            due.append((rid, kind))
+        return due
+
+    def _compact(self):
+        # veraltete Einträge (nach vielen Umplanungen) auf einmal entfernen
+        self._heap = [e for e in self._heap if self._versions.get(e[3]) == e[2]]
+        heapq.heapify(self._heap)
+
+    def _drop_stale(self):
+        while self._heap and self._versions.get(self._heap[0][3]) != self._heap[0][2]:
+            heapq.heappop(self._heap)
@@ -1,6 +1,13 @@
 import datetime
+import os
+import sys
 from uagents import Model, Agent, Context
 
+from idempotency import IdempotencyCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from state_store import StateStore  # noqa: E402
+
 
 # ---------- Input-Modell ----------
 class EssenMessage(Model):
@@ -11,6 +18,7 @@ class EssenMessage(Model):
     vegan: int
     glutenfrei: int
     client_sender: str
+    idempotency_key: str = ""
 
 
 # ---------- Output-Modell ----------
@@ -38,11 +46,26 @@ bestellungen_pro_stunde = {str(h).zfill(2): 0 for h in range(oeffnung.hour, schl
 
 gerichte = ["standard", "vegetarisch", "vegan", "glutenfrei"]
 
+# Bestellzähler und Bestätigungen überleben einen Neustart (WAL + Snapshot, siehe state_store.py)
+store = StateStore("essen")
+bestellungen_pro_stunde.update(store.open().get("zustand", {}).get("bestellungen_pro_stunde", {}))
+
+# Bestätigungen je (Client, idempotency_key)
+bestaetigungen = IdempotencyCache(store=store)
+bestaetigungen.restore()
+
 
 @essensserviceAgent.on_message(model=EssenMessage)
 async def essen_handler(ctx: Context, sender: str, msg: EssenMessage):
     client = msg.client_sender or sender
 
+    # Wiederholte Anfrage? -> ursprüngliche Bestätigung erneut senden
+    cached = bestaetigungen.get(client, msg.idempotency_key)
+    if cached:
+        await ctx.send(client, Message(**cached))
+        ctx.logger.info(f"Wiederholung {msg.idempotency_key} von {client} – Bestätigung erneut gesendet")
+        return
+
     # Zeit prüfen
     try:
         zeit = datetime.datetime.strptime(msg.zeit, "%H:%M").time()
@@ -87,14 +110,28 @@ async def essen_handler(ctx: Context, sender: str, msg: EssenMessage):
     if not gewaehlt:
         antwort = "😔 Kein Gericht ausgewählt oder Gericht nicht verfügbar."
     else:
-        bestellungen_pro_stunde[stunde] += 1
         antwort = f"🍽️ Gericht '{gewaehlt}' ist für {msg.zeit} reserviert!"
 
-    await ctx.send(client, Message(
-        type="essen_bestaetigung",
-        message=antwort,
-        zeit=msg.zeit
-    ))
+    reply = {"type": "essen_bestaetigung", "message": antwort, "zeit": msg.zeit}
+    if gewaehlt:
+        bestellungen_pro_stunde[stunde] += 1
+        store.put("zustand", "bestellungen_pro_stunde", bestellungen_pro_stunde)
+        bestaetigungen.put(client, msg.idempotency_key, reply)
+
+        def zuruecknehmen():
+            bestellungen_pro_stunde[stunde] -= 1
+            store.put("zustand", "bestellungen_pro_stunde", bestellungen_pro_stunde)
+            bestaetigungen.discard(client, msg.idempotency_key)
+
+        if not await store.commit_or_undo(zuruecknehmen):
+            reply = {
+                "type": "essen_fehler",
+                "message": "❌ Buchung konnte nicht gespeichert werden, bitte erneut versuchen.",
+                "zeit": msg.zeit,
+            }
+            antwort = reply["message"]
+
+    await ctx.send(client, Message(**reply))
 
     ctx.logger.info(f"Essen bestätigt: {antwort}")
 
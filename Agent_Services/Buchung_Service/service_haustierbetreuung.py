@@ -1,5 +1,12 @@
 from uagents import Agent, Context, Model
 import datetime
+import os
+import sys
+
+from idempotency import IdempotencyCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from state_store import StateStore  # noqa: E402
 
 
 # ---------- Input-Modell ----------
@@ -10,6 +17,7 @@ class HaustierMessage(Model):
     betreuung_von: str
     betreuung_bis: str
     client_sender: str
+    idempotency_key: str = ""
 
 
 # ---------- Output-Modell ----------
@@ -33,12 +41,27 @@ kapazitaet = {
     "katze": 20
 }
 
+# Kapazitäten und Bestätigungen überleben einen Neustart (WAL + Snapshot, siehe state_store.py)
+store = StateStore("haustier")
+kapazitaet.update(store.open().get("zustand", {}).get("kapazitaet", {}))
+
+# Bestätigungen je (Client, idempotency_key)
+bestaetigungen = IdempotencyCache(store=store)
+bestaetigungen.restore()
+
 
 @petHotelAgent.on_message(model=HaustierMessage)
 async def handler(ctx: Context, sender: str, msg: HaustierMessage):
 
     client = msg.client_sender or sender
 
+    # Wiederholte Anfrage? -> ursprüngliche Bestätigung erneut senden
+    cached = bestaetigungen.get(client, msg.idempotency_key)
+    if cached:
+        await ctx.send(client, Message(**cached))
+        ctx.logger.info(f"Wiederholung {msg.idempotency_key} von {client} – Bestätigung erneut gesendet")
+        return
+
     # Zeit prüfen (HH:MM)
     try:
         datetime.datetime.strptime(msg.zeit, "%H:%M").time()
@@ -71,11 +94,13 @@ async def handler(ctx: Context, sender: str, msg: HaustierMessage):
     art = msg.haustierart.lower()
 
     antwort = "❌ Es sind keine Plätze mehr frei."
+    reserviert = None    # reservierte Tierart
 
     # Hund
     if "hund" in art:
         if kapazitaet["hund"] > 0:
             kapazitaet["hund"] -= 1
+            reserviert = "hund"
             antwort = (
                 f"🐶 Hundebetreuung reserviert!\n"
                 f"⏱️ {msg.betreuung_von} – {msg.betreuung_bis}"
@@ -88,6 +113,7 @@ async def handler(ctx: Context, sender: str, msg: HaustierMessage):
     elif "katze" in art:
         if kapazitaet["katze"] > 0:
             kapazitaet["katze"] -= 1
+            reserviert = "katze"
             antwort = (
                 f"🐱 Katzenbetreuung reserviert!\n"
                 f"⏱️ {msg.betreuung_von} – {msg.betreuung_bis}"
@@ -99,15 +125,25 @@ async def handler(ctx: Context, sender: str, msg: HaustierMessage):
     else:
         antwort = "❌ Bitte 'Hund' oder 'Katze' angeben."
 
+    reply = {"type": "haustier_bestaetigung", "message": antwort, "zeit": msg.zeit}
+    if reserviert:
+        store.put("zustand", "kapazitaet", kapazitaet)
+        bestaetigungen.put(client, msg.idempotency_key, reply)
+
+        def zuruecknehmen():
+            kapazitaet[reserviert] += 1
+            store.put("zustand", "kapazitaet", kapazitaet)
+            bestaetigungen.discard(client, msg.idempotency_key)
+
+        if not await store.commit_or_undo(zuruecknehmen):
+            reply = {
+                "type": "haustier_fehler",
+                "message": "❌ Buchung konnte nicht gespeichert werden, bitte erneut versuchen.",
+                "zeit": msg.zeit,
+            }
+
     # Antwort senden
-    await ctx.send(
-        client,
-        Message(
-            type="haustier_bestaetigung",
-            message=antwort,
-            zeit=msg.zeit
-        )
-    )
+    await ctx.send(client, Message(**reply))
 
     ctx.logger.info(
         f"Antwort an {client} gesendet | Hund={kapazitaet['hund']} | Katze={kapazitaet['katze']}"
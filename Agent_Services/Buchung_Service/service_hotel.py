@@ -1,5 +1,12 @@
 from uagents import Agent, Context, Model
 import datetime
+import os
+import sys
+
+from idempotency import IdempotencyCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from state_store import StateStore  # noqa: E402
 
 
 # ---------- Hotel-Input Modell ----------
@@ -9,6 +16,7 @@ class HotelMessage(Model):
     zeit: str
     naechte: int
     client_sender: str
+    idempotency_key: str = ""
 
 
 # ---------- Antwortmodell ----------
@@ -32,6 +40,14 @@ zimmer = {
     "familie": 5
 }
 
+# Zimmerbestand und Bestätigungen überleben einen Neustart (WAL + Snapshot, siehe state_store.py)
+store = StateStore("hotel")
+zimmer.update(store.open().get("zustand", {}).get("zimmer", {}))
+
+# Bestätigungen je (Client, idempotency_key)
+bestaetigungen = IdempotencyCache(store=store)
+bestaetigungen.restore()
+
 
 @hotelAgent.on_message(model=HotelMessage)
 async def hotel_handler(ctx: Context, sender: str, msg: HotelMessage):
@@ -40,6 +56,13 @@ async def hotel_handler(ctx: Context, sender: str, msg: HotelMessage):
 
     client = hotel_msg.client_sender or sender
 
+    # Wiederholte Anfrage? -> ursprüngliche Bestätigung erneut senden
+    cached = bestaetigungen.get(client, hotel_msg.idempotency_key)
+    if cached:
+        await ctx.send(client, Message(**cached))
+        ctx.logger.info(f"Wiederholung {hotel_msg.idempotency_key} von {client} – Bestätigung erneut gesendet")
+        return
+
     # Zeit prüfen
     try:
         datetime.datetime.strptime(hotel_msg.zeit, "%H:%M").time()
@@ -55,30 +78,44 @@ async def hotel_handler(ctx: Context, sender: str, msg: HotelMessage):
         return
 
     antwort_text = "❌ Kein geeignetes Zimmer verfügbar."
+    gebucht = None    # gebuchte Zimmerart
 
     z = hotel_msg.zimmerart.lower()
 
     if "einzel" in z and zimmer["einzel"] > 0:
         zimmer["einzel"] -= 1
+        gebucht = "einzel"
         antwort_text = f"🏨 Einzelzimmer gebucht für {hotel_msg.naechte} Nacht/Nächte."
 
     elif "doppel" in z and zimmer["doppel"] > 0:
         zimmer["doppel"] -= 1
+        gebucht = "doppel"
         antwort_text = f"🏨 Doppelzimmer gebucht für {hotel_msg.naechte} Nacht/Nächte."
 
     elif ("familie" in z or "familien" in z) and zimmer["familie"] > 0:
         zimmer["familie"] -= 1
+        gebucht = "familie"
         antwort_text = f"🏨 Familienzimmer gebucht für {hotel_msg.naechte} Nacht/Nächte."
 
+    reply = {"type": "hotel_bestaetigung", "message": antwort_text, "zeit": hotel_msg.zeit}
+    if gebucht:
+        store.put("zustand", "zimmer", zimmer)
+        bestaetigungen.put(client, hotel_msg.idempotency_key, reply)
+
+        def zuruecknehmen():
+            zimmer[gebucht] += 1
+            store.put("zustand", "zimmer", zimmer)
+            bestaetigungen.discard(client, hotel_msg.idempotency_key)
+
+        if not await store.commit_or_undo(zuruecknehmen):
+            reply = {
+                "type": "hotel_fehler",
+                "message": "❌ Buchung konnte nicht gespeichert werden, bitte erneut versuchen.",
+                "zeit": hotel_msg.zeit,
+            }
+
     # Antwort senden
-    await ctx.send(
-        client,
-        Message(
-            type="hotel_bestaetigung",
-            message=antwort_text,
-            zeit=hotel_msg.zeit
-        )
-    )
+    await ctx.send(client, Message(**reply))
 
     ctx.logger.info(f"Antwort an {client} gesendet. Zimmerstatus: {zimmer}")
 
@@ -1,5 +1,12 @@
 from uagents import Agent, Context, Model
 import datetime
+import os
+import sys
+
+from idempotency import IdempotencyCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from state_store import StateStore  # noqa: E402
 
 
 # ---------- Input-Modell ----------
@@ -7,6 +14,7 @@ class KaffeeMessage(Model):
     type: str
     zeit: str
     client_sender: str
+    idempotency_key: str = ""
 
 
 # ---------- Output-Modell ----------
@@ -24,11 +32,24 @@ kaffeeAgent = Agent(
     endpoint=["http://localhost:8008/submit"],
 )
 
+# Bestätigungen je (Client, idempotency_key); überleben einen Neustart (siehe state_store.py)
+store = StateStore("kaffee")
+store.open()
+bestaetigungen = IdempotencyCache(store=store)
+bestaetigungen.restore()
+
 
 @kaffeeAgent.on_message(model=KaffeeMessage)
 async def kaffee_handler(ctx: Context, sender: str, msg: KaffeeMessage):
     client = msg.client_sender or sender
 
+    # Wiederholte Anfrage? -> ursprüngliche Bestätigung erneut senden
+    cached = bestaetigungen.get(client, msg.idempotency_key)
+    if cached:
+        await ctx.send(client, Message(**cached))
+        ctx.logger.info(f"Wiederholung {msg.idempotency_key} von {client} – Bestätigung erneut gesendet")
+        return
+
     # Zeit prüfen
     try:
         bestellzeit = datetime.datetime.strptime(msg.zeit, "%H:%M")
@@ -40,11 +61,13 @@ async def kaffee_handler(ctx: Context, sender: str, msg: KaffeeMessage):
 
     antwort = f"☕ Kaffee ist um {fertig_str} abholbereit."
 
-    await ctx.send(client, Message(
-        type="kaffee_bestaetigung",
-        message=antwort,
-        zeit=fertig_str
-    ))
+    reply = {"type": "kaffee_bestaetigung", "message": antwort, "zeit": fertig_str}
+    bestaetigungen.put(client, msg.idempotency_key, reply)
+    # kein Bestand zu schützen: schlägt das Speichern fehl, gilt die Bestellung
+    # trotzdem, nur eine Wiederholung nach einem Neustart wird nicht erkannt
+    await store.commit_or_undo(lambda: bestaetigungen.discard(client, msg.idempotency_key))
+
+    await ctx.send(client, Message(**reply))
 
     ctx.logger.info(f"Kaffee-Bestätigung: {antwort}")
 
@@ -1,8 +1,20 @@
 from uagents import Agent, Context, Model
+import asyncio
+import os
+import sys
 import uuid
+from collections import Counter
 from datetime import datetime, timedelta
 import re
 
+from capacity_calendar import CapacityCalendar
+from idempotency import IdempotencyCache
+from parking_policy import GreedyPolicy, TraceRecorder, allocate
+from reservation_deadlines import DeadlineIndex, REMINDER, EXPIRY
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from state_store import StateStore  # noqa: E402
+
 
 # ============================================================
 #                     MODELS
@@ -15,6 +27,32 @@ class ParkplatzMessage(Model):
     zeit: str
     reservation_id: str
     client_sender: str
+    idempotency_key: str = ""
+    von: str = ""   # Beginn "HH:MM" (leer = sofort), zeit = Ende
+
+
+class ParkplatzGruppenMessage(Model):
+    type: str
+    fahrzeuge: list   # Liste aus dicts: {"fahrzeugart": "LKW", "ladestation": true, "anzahl": 30}
+    zeit: str
+    client_sender: str
+    idempotency_key: str = ""
+    von: str = ""
+
+
+class ParkplatzExtendMessage(Model):
+    type: str
+    reservation_id: str
+    minutes: int
+    client_sender: str
+    idempotency_key: str = ""
+
+
+class ParkplatzReleaseMessage(Model):
+    type: str
+    reservation_id: str
+    client_sender: str
+    idempotency_key: str = ""
 
 
 class Message(Model):
@@ -70,7 +108,7 @@ lkw_lade = lkw_total - behindert_lkw_mit_lade
 
 bus_lade = bus_total
 
-parkplatz_status = {
+parkplatz_kapazitaet = {
     "PKW": {"frei": pkw_frei, "lade": pkw_lade},
     "PKW_Behindert": {"frei": behindert_pkw_ohne_lade, "lade": behindert_pkw_mit_lade},
     "LKW": {"lade": lkw_lade},
@@ -78,6 +116,21 @@ parkplatz_status = {
     "BUS": {"lade": bus_lade}
 }
 
+# Belegung über die Zeit (Minuten-Buckets, 48 h im Voraus buchbar)
+parkplatz_kalender = CapacityCalendar({
+    (kat, art): n
+    for kat, arten in parkplatz_kapazitaet.items()
+    for art, n in arten.items()
+})
+
+# Vergabe-Strategie für Fallbacks (siehe parking_policy.py):
+# GreedyPolicy() = erster freie Kandidat, ReserveProtectingPolicy(),
+# LookaheadPolicy(DemandProfile.from_trace(load_trace(...)))
+PARKING_POLICY = GreedyPolicy()
+
+# Pfad für eine JSONL-Trace aller Anfragen (für simulate() / Benchmark), None = aus
+PARKING_TRACE_PATH = None
+trace_recorder = TraceRecorder(PARKING_TRACE_PATH) if PARKING_TRACE_PATH else None
 
 
 # ============================================================
@@ -86,6 +139,26 @@ parkplatz_status = {
 
 reservations = {}
 
+# Fristen (Erinnerung + Ablauf) zeitlich sortiert
+deadlines = DeadlineIndex()
+REMINDER_MINUTES = 5
+
+# Reservierungen und Bestätigungen überleben einen Neustart (WAL + Snapshot, siehe state_store.py)
+store = StateStore("parkplatz")
+
+# Bestätigungen je (Client, idempotency_key); eine Bestätigung gilt nur,
+# solange ihre Reservierung besteht (sonst würde eine Wiederholung nach
+# Ablauf/Freigabe eine längst freigegebene Buchung bestätigen). Die
+# Reservierung merkt sich dazu ihre Schlüssel unter "bestaetigungen".
+bestaetigungen = IdempotencyCache(store=store)
+SPEICHERFEHLER = "❌ Reservierung konnte nicht gespeichert werden, bitte erneut versuchen."
+
+# Weckt den Wartungs-Task, wenn eine frühere Frist hinzukommt
+_deadline_changed = None
+
+# Wartungs-Task (die Event-Loop hält nur eine schwache Referenz darauf)
+_maintenance_task = None
+
 
 # ============================================================
 #                     HELPER-FUNKTIONEN
@@ -108,33 +181,171 @@ def parse_time_field(zeit_str: str):
     return None
 
 
-def total_pkw_available():
-    return parkplatz_status["PKW"]["frei"] + parkplatz_status["PKW"]["lade"]
-
-
-def consume_pkw_slots(n: int):
-    consumed = 0
-    take = min(n, parkplatz_status["PKW"]["frei"])
-    parkplatz_status["PKW"]["frei"] -= take
-    consumed += take
-    rest = n - consumed
-    if rest > 0:
-        take2 = min(rest, parkplatz_status["PKW"]["lade"])
-        parkplatz_status["PKW"]["lade"] -= take2
-        consumed += take2
-    return consumed
-
-
-def try_allocate_lkw():
-    if parkplatz_status["LKW"]["lade"] > 0:
-        parkplatz_status["LKW"]["lade"] -= 1
-        return True, "🚚🔌 LKW-Ladeparkplatz reserviert."
-    if parkplatz_status.get("BUS", {}).get("lade", 0) > 0:
-        parkplatz_status["BUS"]["lade"] -= 1
-        return True, "🚚 (Fallback) Bus-Parkplatz für LKW reserviert."
-    if total_pkw_available() >= 3 and consume_pkw_slots(3) == 3:
-        return True, "🚚 (Fallback) 3× PKW → LKW-Platz reserviert."
-    return False, None
+def reservation_window(msg):
+    """
+    Zeitraum [von, bis) einer (Gruppen-)Anfrage; ohne `von` ab sofort, ohne Ende (oder "0") 60 Minuten.
+
+    Eine Dauer in Minuten ("120") zählt ab `von`, eine Uhrzeit ("18:30") vor
+    `von` meint den Folgetag.
+    """
+    von = parse_time_field(msg.von) or datetime.now()
+    zeit = (msg.zeit or "").strip()
+    if zeit.isdigit():
+        return von, von + timedelta(minutes=int(zeit) or 60)
+    bis = parse_time_field(zeit) or (von + timedelta(minutes=60))
+    if bis <= von:
+        bis += timedelta(days=1)
+    return von, bis
+
+
+def cache_confirmation(client: str, key: str, reply: dict, rids):
+    """Merkt sich die Bestätigung für Wiederholungen, gebunden an die Reservierungen `rids`."""
+    bestaetigungen.put(client, key, reply)
+    if key:
+        for rid in rids:
+            reservations[rid]["bestaetigungen"].append((client, key))
+            persist_reservation(rid)
+
+
+def forget_confirmations(r: dict):
+    """Verwirft die Bestätigungen einer beendeten Reservierung; liefert [(client, key, reply)]."""
+    vergessen = []
+    for client, key in r["bestaetigungen"]:
+        reply = bestaetigungen.discard(client, key)
+        if reply is not None:
+            vergessen.append((client, key, reply))
+    return vergessen
+
+
+def drop_reservation(rid: str):
+    """
+    Beendet eine Reservierung: löschen, Fristen stornieren, Bestätigungen
+    vergessen, Plätze im ganzen Zeitraum freigeben. Liefert (r, vergessen)
+    für reinstate_reservation() oder (None, []), wenn es sie nicht gibt.
+    """
+    r = reservations.pop(rid, None)
+    if r is None:
+        return None, []
+    store.delete("reservations", rid)
+    deadlines.cancel(rid)
+    vergessen = forget_confirmations(r)
+    # ganzer Zeitraum: die vergangenen Minuten fragt niemand mehr ab,
+    # müssen aber für den Ring ebenfalls wieder auf 0
+    release_slots(r["belegt"], r["start"], r["end"])
+    return r, vergessen
+
+
+def reinstate_reservation(rid: str, r: dict, vergessen) -> bool:
+    """Macht drop_reservation() rückgängig, sofern die Plätze noch frei sind."""
+    gebucht = []
+    for (kategorie, art), n in Counter(r["belegt"]).items():
+        if not parkplatz_kalender.reservieren(kategorie, art, r["start"], r["end"], n=n, jetzt=datetime.now()):
+            for k, a, m in gebucht:
+                parkplatz_kalender.freigeben(k, a, r["start"], r["end"], n=m)
+            print(f"⚠️ Reservierung {rid} kann nicht wiederhergestellt werden – Plätze inzwischen vergeben")
+            return False
+        gebucht.append((kategorie, art, n))
+    reservations[rid] = r
+    persist_reservation(rid)
+    schedule_reservation(rid, r["end"])
+    for client, key, reply in vergessen:
+        bestaetigungen.put(client, key, reply)
+    return True
+
+
+def release_slots(belegt, von: datetime, bis: datetime):
+    """Gibt belegte Plätze im Zeitraum [von, bis) im Kalender frei."""
+    for kategorie, art in belegt:
+        parkplatz_kalender.freigeben(kategorie, art, von, bis)
+
+
+def schedule_reservation(rid: str, end: datetime):
+    """Trägt Erinnerung und Ablauf einer Reservierung in den Frist-Index ein."""
+    deadlines.schedule(rid, end, reminder_at=end - timedelta(minutes=REMINDER_MINUTES))
+    if _deadline_changed is not None:
+        _deadline_changed.set()
+
+
+def allocate_single(fahrzeugart: str, lade: bool, von: datetime, bis: datetime):
+    """
+    Belegt einen Platz für ein Fahrzeug inkl. Fallbacks (Auswahl per PARKING_POLICY).
+
+    Liefert (antwort, belegt); belegt ist leer, wenn nichts frei war.
+    """
+    antwort, belegt = allocate(parkplatz_kalender, PARKING_POLICY, fahrzeugart, lade, von, bis)
+    if trace_recorder is not None:
+        trace_recorder.record(datetime.now(), fahrzeugart, lade, von, bis, bool(belegt))
+    return antwort, belegt
+
+
+def save_reservation(client: str, von: datetime, bis: datetime, belegt) -> str:
+    """Legt eine Reservierung an, plant Erinnerung + Ablauf und liefert die RID."""
+    rid = str(uuid.uuid4())[:8]
+    reservations[rid] = {
+        "sender": client,
+        "start": von,
+        "end": bis,
+        "belegt": belegt,
+        "reminder_sent": False,
+        "bestaetigungen": [],     # (client, idempotency_key) der Antworten zu dieser Reservierung
+    }
+    persist_reservation(rid)
+    schedule_reservation(rid, bis)
+    return rid
+
+
+def persist_reservation(rid: str):
+    """Schreibt den aktuellen Stand einer Reservierung ins WAL (dauerhaft nach store.commit())."""
+    r = reservations[rid]
+    store.put("reservations", rid, {
+        "sender": r["sender"],
+        "start": r["start"].isoformat(),
+        "end": r["end"].isoformat(),
+        "belegt": [list(b) for b in r["belegt"]],
+        "reminder_sent": r["reminder_sent"],
+        "bestaetigungen": [list(b) for b in r["bestaetigungen"]],
+    })
+
+
+def restore_reservations():
+    """Lädt Reservierungen + Bestätigungen nach einem Neustart und belegt Kalender + Fristen neu."""
+    now = datetime.now()
+    tabellen = store.open()
+    bestaetigungen.restore()
+    for rid, d in tabellen.get("reservations", {}).items():
+        start, end = datetime.fromisoformat(d["start"]), datetime.fromisoformat(d["end"])
+        belegt = [tuple(b) for b in d["belegt"]]
+        schluessel = [tuple(b) for b in d.get("bestaetigungen", [])]
+        if end <= now:
+            store.delete("reservations", rid)     # während der Auszeit abgelaufen
+            for client, key in schluessel:
+                bestaetigungen.discard(client, key)
+            continue
+        ok = []
+        for kategorie, art in belegt:
+            if not parkplatz_kalender.reservieren(kategorie, art, start, end, jetzt=now):
+                break
+            ok.append((kategorie, art))
+        if len(ok) < len(belegt):
+            # nur möglich, wenn die Kapazität zwischendurch verkleinert wurde
+            release_slots(ok, start, end)
+            store.delete("reservations", rid)
+            for client, key in schluessel:
+                bestaetigungen.discard(client, key)
+            print(f"⚠️ Reservierung {rid} passt nicht mehr in die Kapazität – verworfen")
+            continue
+        reservations[rid] = {
+            "sender": d["sender"],
+            "start": start,
+            "end": end,
+            "belegt": belegt,
+            "reminder_sent": d["reminder_sent"],
+            "bestaetigungen": schluessel,
+        }
+        schedule_reservation(rid, end)
+    store.flush()
+    if reservations:
+        print(f"♻️ {len(reservations)} Reservierung(en) wiederhergestellt")
 
 
 # ============================================================
@@ -144,161 +355,377 @@ def try_allocate_lkw():
 @parkplatzAgent.on_message(model=ParkplatzMessage)
 async def parkplatz_handler(ctx: Context, sender: str, msg: ParkplatzMessage):
 
-    fahrzeugart = msg.fahrzeugart.lower()
-    lade = bool(msg.ladestation)
     client = msg.client_sender or sender
 
-    antwort = "❌ Kein geeigneter Parkplatz verfügbar."
-    rid = None
+    # Wiederholte Anfrage? -> ursprüngliche Bestätigung erneut senden
+    cached = bestaetigungen.get(client, msg.idempotency_key)
+    if cached:
+        await ctx.send(client, Message(**cached))
+        ctx.logger.info(f"Wiederholung {msg.idempotency_key} von {client} – Bestätigung erneut gesendet")
+        return
+
+    von, bis = reservation_window(msg)
+    antwort, belegt = allocate_single(msg.fahrzeugart, bool(msg.ladestation), von, bis)
+    rid = save_reservation(client, von, bis, belegt) if belegt else None
+    if not rid:
+        antwort = "❌ Kein geeigneter Parkplatz verfügbar."
 
     # ============================================================
-    #               PKW BEHINDERT
+    #              SEND RESPONSE BACK TO CLIENT
     # ============================================================
-    if "pkw" in fahrzeugart and "behindert" in fahrzeugart:
 
-        if lade and parkplatz_status["PKW_Behindert"]["lade"] > 0:
-            parkplatz_status["PKW_Behindert"]["lade"] -= 1
-            antwort = "♿🔌 Behinderten-PKW-Ladeparkplatz reserviert."
-            rid = str(uuid.uuid4())[:8]
+    if rid and msg.von:
+        antwort += f" ({von.strftime('%H:%M')}–{bis.strftime('%H:%M')})"
 
-        elif not lade and parkplatz_status["PKW_Behindert"]["frei"] > 0:
-            parkplatz_status["PKW_Behindert"]["frei"] -= 1
-            antwort = "♿ PKW-Behindertenparkplatz reserviert."
-            rid = str(uuid.uuid4())[:8]
+    reply = {
+        "type": "parkplatz_bestaetigung",
+        "message": antwort + (f" (RID={rid})" if rid else ""),
+        "zeit": msg.zeit,
+    }
+    if rid:
+        cache_confirmation(client, msg.idempotency_key, reply, [rid])
+        # erst antworten, wenn Reservierung + Bestätigung auf der Platte sind
+        if not await store.commit_or_undo(lambda: drop_reservation(rid)):
+            rid = None
+            antwort = SPEICHERFEHLER
+            reply = {"type": "parkplatz_bestaetigung", "message": antwort, "zeit": msg.zeit}
 
-        elif total_pkw_available() >= 2 and consume_pkw_slots(2) == 2:
-            antwort = "♿ (Fallback) 2× PKW → Behindertenplatz reserviert."
-            rid = str(uuid.uuid4())[:8]
+    await ctx.send(client, Message(**reply))
 
+    # Logging
+    ctx.logger.info(
+        f"[Parkplatz] Gesendet an {client} | Antwort: '{antwort}' | RID={rid or '-'}"
+    )
 
-    # ============================================================
-    #               PKW NORMAL
-    # ============================================================
-    elif "pkw" in fahrzeugart:
 
-        if lade and parkplatz_status["PKW"]["lade"] > 0:
-            parkplatz_status["PKW"]["lade"] -= 1
-            antwort = "🔌🚗 PKW-Ladeparkplatz reserviert."
-            rid = str(uuid.uuid4())[:8]
+# ============================================================
+#                     GRUPPEN-HANDLER
+# ============================================================
 
-        elif not lade and parkplatz_status["PKW"]["frei"] > 0:
-            parkplatz_status["PKW"]["frei"] -= 1
-            antwort = "🚗 PKW-Parkplatz reserviert."
-            rid = str(uuid.uuid4())[:8]
+GRUPPE_MAX_FAHRZEUGE = 200
+
+
+def _gruppen_rang(fahrzeugart: str) -> int:
+    """
+    Reihenfolge innerhalb einer Gruppe: Fahrzeuge mit wenigen Ausweichmöglichkeiten
+    zuerst, damit z. B. LKW-Fallbacks nicht die Bus- oder PKW-Plätze belegen,
+    die ein anderes Fahrzeug derselben Gruppe braucht.
+    """
+    f = fahrzeugart.lower()
+    if "bus" in f:
+        return 0
+    if "pkw" in f:
+        return 2 if "behindert" in f else 1
+    if "lkw" in f:
+        return 3 if "behindert" in f else 4
+    return 5
+
+
+def allocate_group(fahrzeuge, von: datetime, bis: datetime):
+    """
+    Belegt Plätze für alle Fahrzeuge oder keinen (Rollback beim ersten Fehlschlag).
+
+    `fahrzeuge` ist eine Liste aus (fahrzeugart, ladestation).
+    Liefert (vergeben, fehlgeschlagen): vergeben = [(antwort, belegt), ...]
+    in Eingabereihenfolge, fehlgeschlagen = (fahrzeugart, ladestation) oder None.
+    """
+    reihenfolge = sorted(range(len(fahrzeuge)), key=lambda i: _gruppen_rang(fahrzeuge[i][0]))
+    vergeben = {}
+    for i in reihenfolge:
+        fahrzeugart, lade = fahrzeuge[i]
+        antwort, belegt = allocate_single(fahrzeugart, lade, von, bis)
+        if not belegt:
+            for _, b in vergeben.values():
+                release_slots(b, von, bis)
+            return [], (fahrzeugart, lade)
+        vergeben[i] = (antwort, belegt)
+    return [vergeben[i] for i in range(len(fahrzeuge))], None
+
+
+@parkplatzAgent.on_message(model=ParkplatzGruppenMessage)
+async def parkplatz_gruppen_handler(ctx: Context, sender: str, msg: ParkplatzGruppenMessage):
+    """Mehrere Plätze (z. B. Konvoi, Busunternehmen) in einer Anfrage, alles oder nichts."""
 
+    client = msg.client_sender or sender
 
-    # ============================================================
-    #               LKW BEHINDERT
-    # ============================================================
-    elif "lkw" in fahrzeugart and "behindert" in fahrzeugart:
+    cached = bestaetigungen.get(client, msg.idempotency_key)
+    if cached:
+        await ctx.send(client, Message(**cached))
+        ctx.logger.info(f"Wiederholung {msg.idempotency_key} von {client} – Bestätigung erneut gesendet")
+        return
+
+    fahrzeuge = []
+    fehler = None
+    try:
+        gesamt = 0
+        for eintrag in msg.fahrzeuge:
+            anzahl = int(eintrag.get("anzahl", 1))
+            if anzahl <= 0:
+                raise ValueError(f"anzahl={anzahl}")
+            # vor dem Aufblähen der Liste prüfen, sonst reicht ein riesiges "anzahl" für einen MemoryError
+            gesamt += anzahl
+            if gesamt > GRUPPE_MAX_FAHRZEUGE:
+                fehler = f"❌ Höchstens {GRUPPE_MAX_FAHRZEUGE} Fahrzeuge pro Gruppenanfrage."
+                break
+            fahrzeuge += [(str(eintrag["fahrzeugart"]), bool(eintrag.get("ladestation", False)))] * anzahl
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        ctx.logger.warning(f"[Parkplatz] Ungültige Gruppenanfrage von {client}: {e}")
+        fehler = "❌ Gruppenanfrage ohne gültige Fahrzeuge."
+
+    rids = []
+    if fehler or not fahrzeuge:
+        antwort = fehler or "❌ Gruppenanfrage ohne gültige Fahrzeuge."
+        fahrzeuge = []
+    else:
+        von, bis = reservation_window(msg)
+        vergeben, fehlgeschlagen = allocate_group(fahrzeuge, von, bis)
+        if fehlgeschlagen:
+            art, lade = fehlgeschlagen
+            antwort = (
+                f"❌ Gruppe abgelehnt: kein Platz für {art}{' mit Ladesäule' if lade else ''} – "
+                "es wurde nichts reserviert."
+            )
+        else:
+            rids = [save_reservation(client, von, bis, belegt) for _, belegt in vergeben]
+            anzahl_pro_art = Counter(text for text, _ in vergeben)
+            details = ", ".join(f"{n}× {text.rstrip('.')}" for text, n in anzahl_pro_art.items())
+            antwort = f"✅ {len(rids)} Parkplätze reserviert: {details}."
+            if msg.von:
+                antwort += f" ({von.strftime('%H:%M')}–{bis.strftime('%H:%M')})"
+
+    reply = {
+        "type": "parkplatz_gruppe_bestaetigung",
+        "message": antwort + (f" (RIDs={', '.join(rids)})" if rids else ""),
+        "zeit": msg.zeit,
+    }
+    if rids:
+        cache_confirmation(client, msg.idempotency_key, reply, rids)
+        gruppe = list(rids)
+
+        def zuruecknehmen():
+            for rid in gruppe:
+                drop_reservation(rid)
+
+        if not await store.commit_or_undo(zuruecknehmen):
+            rids = []
+            antwort = SPEICHERFEHLER
+            reply = {"type": "parkplatz_gruppe_bestaetigung", "message": antwort, "zeit": msg.zeit}
+
+    await ctx.send(client, Message(**reply))
+    ctx.logger.info(
+        f"[Parkplatz] Gruppe an {client} | {len(fahrzeuge)} Fahrzeuge | "
+        f"{len(rids)} reserviert | Antwort: '{antwort[:80]}'"
+    )
 
-        if parkplatz_status["LKW_Behindert"]["lade"] > 0:
-            parkplatz_status["LKW_Behindert"]["lade"] -= 1
-            antwort = "♿🚚🔌 Behinderten-LKW-Parkplatz reserviert."
-            rid = str(uuid.uuid4())[:8]
 
-        else:
-            ok, msg2 = try_allocate_lkw()
-            if ok:
-                antwort = "♿🚚 (Fallback) " + msg2
-                rid = str(uuid.uuid4())[:8]
+# ============================================================
+#             VERLÄNGERN + VORZEITIG FREIGEBEN
+# ============================================================
 
+VERLAENGERUNG_MAX_MINUTEN = 24 * 60
+
+
+def extend_reservation(rid: str, client: str, minutes: int):
+    """
+    Verlängert eine Reservierung um `minutes` auf denselben Plätzen.
+
+    Belegt [Ende, neues Ende) im Kalender (alles oder nichts) und plant
+    Erinnerung + Ablauf neu (O(log n)). Liefert (ok, antwort, rueckgaengig);
+    `rueckgaengig()` nimmt eine erfolgreiche Verlängerung wieder zurück.
+    """
+    r = reservations.get(rid)
+    if r is None or r["sender"] != client:
+        return False, f"❌ Reservierung {rid or '-'} nicht gefunden.", None
+    if not 0 < minutes <= VERLAENGERUNG_MAX_MINUTEN:
+        return False, f"❌ Verlängerung nur um 1–{VERLAENGERUNG_MAX_MINUTEN} Minuten möglich.", None
+
+    end = r["end"]
+    new_end = end + timedelta(minutes=minutes)
+    # beim Ablauf wird [start, new_end) auf einmal freigegeben -> muss in den Horizont passen
+    if not parkplatz_kalender.buchbar(r["start"], new_end):
+        return False, f"❌ Reservierung {rid} kann nicht so weit verlängert werden.", None
+
+    # der Kalender rundet das Ende auf die volle Minute auf -> erst ab dort belegen
+    ab = end.replace(second=0, microsecond=0)
+    if ab < end:
+        ab += timedelta(minutes=1)
+
+    gebucht = []
+    for (kategorie, art), n in Counter(r["belegt"]).items():
+        if not parkplatz_kalender.reservieren(kategorie, art, ab, new_end, n=n):
+            for k, a, m in gebucht:
+                parkplatz_kalender.freigeben(k, a, ab, new_end, n=m)
+            return False, f"❌ Verlängerung nicht möglich – Platz ab {end.strftime('%H:%M')} bereits vergeben.", None
+        gebucht.append((kategorie, art, n))
+
+    reminder_sent = r["reminder_sent"]
+    r["end"] = new_end
+    r["reminder_sent"] = False
+    persist_reservation(rid)
+    schedule_reservation(rid, new_end)
+
+    def rueckgaengig():
+        # inzwischen freigegeben/abgelaufen -> der ganze Zeitraum ist schon frei
+        if reservations.get(rid) is not r:
+            return
+        for k, a, m in gebucht:
+            parkplatz_kalender.freigeben(k, a, ab, new_end, n=m)
+        r["end"] = end
+        r["reminder_sent"] = reminder_sent
+        persist_reservation(rid)
+        schedule_reservation(rid, end)
+
+    return True, f"⏱️ Reservierung {rid} verlängert bis {new_end.strftime('%H:%M')}.", rueckgaengig
+
+
+def release_reservation(rid: str, client: str):
+    """
+    Gibt eine Reservierung vorzeitig frei.
+
+    Die Plätze sind sofort wieder buchbar (nicht erst beim nächsten
+    Wartungslauf); die Fristen werden im Index storniert. Liefert
+    (ok, antwort, rueckgaengig) wie extend_reservation().
+    """
+    r = reservations.get(rid)
+    if r is None or r["sender"] != client:
+        return False, f"❌ Reservierung {rid or '-'} nicht gefunden.", None
+    r, vergessen = drop_reservation(rid)
+    return True, f"✅ Reservierung {rid} freigegeben.", lambda: reinstate_reservation(rid, r, vergessen)
+
+
+@parkplatzAgent.on_message(model=ParkplatzExtendMessage)
+async def parkplatz_extend_handler(ctx: Context, sender: str, msg: ParkplatzExtendMessage):
+    client = msg.client_sender or sender
 
-    # ============================================================
-    #               LKW NORMAL
-    # ============================================================
-    elif "lkw" in fahrzeugart:
+    cached = bestaetigungen.get(client, msg.idempotency_key)
+    if cached:
+        await ctx.send(client, Message(**cached))
+        return
 
-        ok, msg2 = try_allocate_lkw()
-        if ok:
-            antwort = msg2
-            rid = str(uuid.uuid4())[:8]
+    ok, antwort, rueckgaengig = extend_reservation(msg.reservation_id, client, int(msg.minutes))
+    reply = {"type": "parkplatz_verlaengert", "message": antwort, "zeit": datetime.now().strftime("%H:%M")}
+    if ok:
+        cache_confirmation(client, msg.idempotency_key, reply, [msg.reservation_id])
 
+        def zuruecknehmen():
+            rueckgaengig()
+            bestaetigungen.discard(client, msg.idempotency_key)
 
-    # ============================================================
-    #               BUS
-    # ============================================================
-    elif "bus" in fahrzeugart:
+        if not await store.commit_or_undo(zuruecknehmen):
+            antwort = SPEICHERFEHLER
+            reply = {**reply, "message": antwort}
 
-        if parkplatz_status["BUS"]["lade"] > 0:
-            parkplatz_status["BUS"]["lade"] -= 1
-            antwort = "🚌🔌 Bus-Parkplatz reserviert."
-            rid = str(uuid.uuid4())[:8]
+    await ctx.send(client, Message(**reply))
+    ctx.logger.info(f"[Parkplatz] Verlängerung {msg.reservation_id or '-'} (+{msg.minutes} min) | {antwort}")
 
 
-    # ============================================================
-    #              SEND RESPONSE BACK TO CLIENT
-    # ============================================================
+@parkplatzAgent.on_message(model=ParkplatzReleaseMessage)
+async def parkplatz_release_handler(ctx: Context, sender: str, msg: ParkplatzReleaseMessage):
+    client = msg.client_sender or sender
 
-    await ctx.send(
-        client,
-        Message(
-            type="parkplatz_bestaetigung",
-            message=antwort + (f" (RID={rid})" if rid else ""),
-            zeit=msg.zeit
-        )
-    )
+    cached = bestaetigungen.get(client, msg.idempotency_key)
+    if cached:
+        await ctx.send(client, Message(**cached))
+        return
 
-    # Logging
-    ctx.logger.info(
-        f"[Parkplatz] Gesendet an {client} | Antwort: '{antwort}' | RID={rid or '-'}"
-    )
+    ok, antwort, rueckgaengig = release_reservation(msg.reservation_id, client)
+    reply = {"type": "parkplatz_freigegeben", "message": antwort, "zeit": datetime.now().strftime("%H:%M")}
+    if ok:
+        bestaetigungen.put(client, msg.idempotency_key, reply)
 
-    # ============================================================
-    #              SAVE RESERVATION IF VALID
-    # ============================================================
+        def zuruecknehmen():
+            bestaetigungen.discard(client, msg.idempotency_key)
+            rueckgaengig()
 
-    if rid:
-        end_dt = parse_time_field(msg.zeit) or (datetime.now() + timedelta(minutes=60))
-        reservations[rid] = {
-            "sender": client,
-            "end": end_dt,
-            "reminder_sent": False
-        }
+        if not await store.commit_or_undo(zuruecknehmen):
+            antwort = SPEICHERFEHLER
+            reply = {**reply, "message": antwort}
+
+    await ctx.send(client, Message(**reply))
+    ctx.logger.info(f"[Parkplatz] Freigabe {msg.reservation_id or '-'} | {antwort}")
 
 
 # ============================================================
 #             REMINDER + EXPIRATION LOOP
 # ============================================================
 
-@parkplatzAgent.on_interval(period=30.0)
-async def reservation_maintenance(ctx: Context):
+async def process_due(ctx: Context, now: datetime):
+    """Bearbeitet nur die bis `now` fälligen Erinnerungen und Abläufe."""
 
-    REMINDER_MINUTES = 5
-    now = datetime.now()
-    expired = []
-
-    for rid, r in reservations.items():
+    for rid, kind in deadlines.pop_due(now):
+        r = reservations.get(rid)
+        if r is None:
+            continue
         end = r["end"]
 
         # Reminder
-        if not r["reminder_sent"] and now + timedelta(minutes=REMINDER_MINUTES) >= end > now:
+        if kind == REMINDER:
+            if not r["reminder_sent"] and end > now:
+                await ctx.send(
+                    r["sender"],
+                    Message(type="parkplatz_reminder",
+                            message=f"⏰ Ihre Reservierung {rid} läuft um {end.strftime('%H:%M')} ab.",
+                            zeit=end.strftime("%H:%M"))
+                )
+                r["reminder_sent"] = True
+                persist_reservation(rid)
+
+        # Ablauf: Plätze freigeben und Reservierung löschen
+        elif kind == EXPIRY:
+            data, _ = drop_reservation(rid)
             await ctx.send(
-                r["sender"],
-                Message(type="parkplatz_reminder",
-                        message=f"⏰ Ihre Reservierung {rid} läuft um {end.strftime('%H:%M')} ab.",
-                        zeit=end.strftime("%H:%M"))
+                data["sender"],
+                Message(type="parkplatz_abgelaufen",
+                        message=f"❗ Ihre Reservierung {rid} ist abgelaufen und wurde freigegeben.",
+                        zeit=datetime.now().strftime("%H:%M"))
             )
-            r["reminder_sent"] = True
 
-        # Ablauf
-        if now >= end:
-            expired.append(rid)
 
-    # Abgelaufene Reservierungen löschen
-    for rid in expired:
-        data = reservations.pop(rid)
-        await ctx.send(
-            data["sender"],
-            Message(type="parkplatz_abgelaufen",
-                    message=f"❗ Ihre Reservierung {rid} ist abgelaufen und wurde freigegeben.",
-                    zeit=datetime.now().strftime("%H:%M"))
-        )
+async def reservation_maintenance(ctx: Context):
+    """Schläft bis zur nächsten Frist (oder bis eine frühere eingetragen wird)."""
+
+    while True:
+        try:
+            next_at = deadlines.next_deadline()
+            timeout = None if next_at is None else max(0.0, (next_at - datetime.now()).total_seconds())
+
+            _deadline_changed.clear()
+            try:
+                await asyncio.wait_for(_deadline_changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            await process_due(ctx, datetime.now())
+            await store.commit()
+
+        except Exception as e:
+            ctx.logger.error(f"[Parkplatz] Fehler in der Reservierungs-Wartung: {e}")
+            await asyncio.sleep(1.0)
+
+
+@parkplatzAgent.on_event("startup")
+async def starter(ctx: Context):
+    """Startet den Wartungs-Task beim Start des Agenten, ohne ihn zu blockieren."""
+    global _deadline_changed, _maintenance_task
+
+    _deadline_changed = asyncio.Event()
+    if deadlines.next_deadline() is not None:
+        _deadline_changed.set()
+    _maintenance_task = asyncio.create_task(reservation_maintenance(ctx))
+
+    def on_done(task: asyncio.Task):
+        # die Schleife fängt ihre Fehler selbst ab; endet sie trotzdem, soll es im Log stehen
+        if not task.cancelled() and task.exception() is not None:
+            ctx.logger.error(f"[Parkplatz] Reservierungs-Wartung beendet: {task.exception()!r}")
+
+    _maintenance_task.add_done_callback(on_done)
 
 
 # ============================================================
 #                     START
 # ============================================================
 
+restore_reservations()
+
 if __name__ == "__main__":
     parkplatzAgent.run()
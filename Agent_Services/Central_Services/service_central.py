@@ -1,3 +1,4 @@
+import asyncio
 from uagents import Agent, Context, Model
 from typing import List
 
@@ -11,11 +12,13 @@ class EssenMessage(Model):
     vegan: int
     glutenfrei: int
     client_sender: str
+    idempotency_key: str = ""
 
 class KaffeeMessage(Model):
     type: str
     zeit: str
     client_sender: str
+    idempotency_key: str = ""
 
 class HaustierMessage(Model):
     type: str
@@ -24,6 +27,7 @@ class HaustierMessage(Model):
     betreuung_von: str
     betreuung_bis: str
     client_sender: str
+    idempotency_key: str = ""
 
 class HotelMessage(Model):
     type: str
@@ -31,6 +35,7 @@ class HotelMessage(Model):
     zeit: str
     naechte: int
     client_sender: str
+    idempotency_key: str = ""
 
 class ParkplatzMessage(Model):
     type: str
@@ -39,6 +44,29 @@ class ParkplatzMessage(Model):
     zeit: str
     reservation_id: str
     client_sender: str
+    idempotency_key: str = ""
+    von: str = ""   # Beginn "HH:MM" (leer = sofort), zeit = Ende
+
+class ParkplatzGruppenMessage(Model):
+    type: str
+    fahrzeuge: list   # Liste aus dicts: {"fahrzeugart": "LKW", "ladestation": true, "anzahl": 30}
+    zeit: str
+    client_sender: str
+    idempotency_key: str = ""
+    von: str = ""
+
+class ParkplatzExtendMessage(Model):
+    type: str
+    reservation_id: str
+    minutes: int
+    client_sender: str
+    idempotency_key: str = ""
+
+class ParkplatzReleaseMessage(Model):
+    type: str
+    reservation_id: str
+    client_sender: str
+    idempotency_key: str = ""
 
 
 # ---------- CentralServiceMessage ----------
@@ -53,6 +81,9 @@ model_factory = {
     "haustierbetreuung": HaustierMessage,
     "hotel": HotelMessage,
     "parkplatz": ParkplatzMessage,
+    "parkplatz_gruppe": ParkplatzGruppenMessage,
+    "parkplatz_extend": ParkplatzExtendMessage,
+    "parkplatz_release": ParkplatzReleaseMessage,
 }
 
 # ---------- Zieladressen ----------
@@ -62,9 +93,20 @@ service_map = {
     "haustierbetreuung": "test-agent://agent1qffjvchcs36qed3ghwng43l9zw4x3pefxck3t8rsdsakkaww9trpwyh9qx0",
     "hotel": "test-agent://agent1q2ar07qp4r8kale8pz2w5paefx90lf8w8z05xuja43rrwc75mw5j2s6e0zj",
     "parkplatz": "test-agent://agent1qtctwqx03uw8d4fy86c4c6jp4g4d60ujcuqfd2hhkm3s8jmza0phu7t0hn9",
+    "parkplatz_gruppe": "test-agent://agent1qtctwqx03uw8d4fy86c4c6jp4g4d60ujcuqfd2hhkm3s8jmza0phu7t0hn9",
+    "parkplatz_extend": "test-agent://agent1qtctwqx03uw8d4fy86c4c6jp4g4d60ujcuqfd2hhkm3s8jmza0phu7t0hn9",
+    "parkplatz_release": "test-agent://agent1qtctwqx03uw8d4fy86c4c6jp4g4d60ujcuqfd2hhkm3s8jmza0phu7t0hn9",
 }
 
 
+# ---------- Dispatch-Konfiguration ----------
+# True  -> alle Einträge einer CentralServiceMessage parallel senden
+# False -> alter Modus, Einträge nacheinander senden
+PARALLEL_DISPATCH = True
+# Obergrenze gleichzeitiger ctx.send-Aufrufe pro Envelope
+MAX_PARALLEL_SENDS = 8
+
+
 central = Agent(
     name="CentralService",
     port=8000,
@@ -73,32 +115,71 @@ central = Agent(
 )
 
 
-@central.on_message(model=CentralServiceMessage)
-async def handle(ctx: Context, sender: str, msg: CentralServiceMessage):
-
-    print(f"\n📨 [Central] {len(msg.messages)} Nachricht(en) erhalten von {sender[:20]}...")
+async def dispatch_entry(ctx: Context, entry: dict, semaphore: asyncio.Semaphore) -> dict:
+    """Leitet einen Eintrag weiter und liefert seinen Zustellstatus zurück."""
 
-    for entry in msg.messages:
+    msg_type = entry.get("type")
+    target = service_map.get(msg_type)
 
-        msg_type = entry.get("type")
-        target = service_map.get(msg_type)
+    if not target:
+        print(f"❌ [Central] Kein Ziel für Typ '{msg_type}'")
+        return {"type": msg_type, "status": "kein_ziel"}
 
-        if not target:
-            print(f"❌ [Central] Kein Ziel für Typ '{msg_type}'")
-            continue
+    constructor = model_factory.get(msg_type)
+    if not constructor:
+        print(f"❌ [Central] Kein Model-Constructor für Typ '{msg_type}'")
+        return {"type": msg_type, "status": "kein_model"}
 
-        constructor = model_factory.get(msg_type)
-        if not constructor:
-            print(f"❌ [Central] Kein Model-Constructor für Typ '{msg_type}'")
-            continue
+    # dict -> spezifisches Model konvertieren
+    try:
+        reconstructed = constructor(**entry)
+    except Exception as e:
+        print(f"❌ [Central] Fehler beim Verarbeiten von {msg_type}: {e}")
+        return {"type": msg_type, "status": "ungueltig", "fehler": str(e)}
 
-        # dict -> spezifisches Model konvertieren
+    async with semaphore:
         try:
-            reconstructed = constructor(**entry)
             print(f"✅ [Central] Weiterleiten an {msg_type} → {target[:40]}...")
-            await ctx.send(target, reconstructed)
+            result = await ctx.send(target, reconstructed)
         except Exception as e:
-            print(f"❌ [Central] Fehler beim Verarbeiten von {msg_type}: {e}")
+            print(f"❌ [Central] Fehler beim Senden an {msg_type}: {e}")
+            return {"type": msg_type, "status": "fehlgeschlagen", "fehler": str(e)}
+
+    # ctx.send liefert (je nach uagents-Version) einen MsgStatus mit DeliveryStatus
+    delivery = getattr(result, "status", None)
+    status = getattr(delivery, "value", delivery) or "gesendet"
+    return {"type": msg_type, "status": str(status)}
+
+
+async def dispatch_messages(
+    ctx: Context,
+    entries: list,
+    parallel: bool = PARALLEL_DISPATCH,
+    limit: int = MAX_PARALLEL_SENDS,
+) -> List[dict]:
+    """Sendet alle Einträge eines Envelopes und liefert die Status in Eingabereihenfolge."""
+
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    if parallel:
+        return list(await asyncio.gather(
+            *(dispatch_entry(ctx, entry, semaphore) for entry in entries)
+        ))
+
+    return [await dispatch_entry(ctx, entry, semaphore) for entry in entries]
+
+
+@central.on_message(model=CentralServiceMessage)
+async def handle(ctx: Context, sender: str, msg: CentralServiceMessage):
+
+    print(f"\n📨 [Central] {len(msg.messages)} Nachricht(en) erhalten von {sender[:20]}...")
+
+    results = await dispatch_messages(ctx, msg.messages)
+
+    ok = sum(1 for r in results if r["status"] in ("gesendet", "sent", "delivered"))
+    print(f"📊 [Central] Zustellung: {ok}/{len(results)} erfolgreich")
+    for r in results:
+        print(f"   • {r['type']}: {r['status']}" + (f" ({r['fehler']})" if r.get("fehler") else ""))
 
 
 if __name__ == "__main__":
@@ -1,6 +1,13 @@
+import os
+import sys
 import uuid
 from uagents import Agent, Context, Model
 
+from slot_allocator import SlotAllocator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from state_store import StateStore  # noqa: E402
+
 
 # --- Models --- #
 
@@ -33,21 +40,26 @@ garderobe = Agent(
     endpoint=["http://localhost:8006/submit"]
 )
 
-slots = {}
-MAX_SLOTS = 100
+# Anzahl Fächer, z.B. GARDEROBE_MAX_SLOTS=200000 für Event-Locations
+MAX_SLOTS = int(os.environ.get("GARDEROBE_MAX_SLOTS", "100"))
 
+faecher = SlotAllocator(MAX_SLOTS)
+slots = faecher.slots
 
-def freier_slot():
-    for i in range(MAX_SLOTS):
-        if i not in slots:
-            return i
-    return None
+# Belegte Fächer überleben einen Neustart (WAL + Snapshot)
+store = StateStore("garderobe")
+faecher.restore({int(slot): data for slot, data in store.open().get("slots", {}).items()})
 
 
 @garderobe.on_message(model=GarderobeAbgabeRequest)
 async def handle_abgabe(ctx: Context, sender: str, msg: GarderobeAbgabeRequest):
 
-    slot = freier_slot()
+    qr = str(uuid.uuid4())
+    slot = faecher.allocate({
+        "artikel": msg.artikel,
+        "qr": qr,
+        "token_typ": msg.token_typ
+    })
     if slot is None:
         await ctx.send(sender, GarderobeAbgabeResponse(
             qr_code="",
@@ -55,13 +67,20 @@ async def handle_abgabe(ctx: Context, sender: str, msg: GarderobeAbgabeRequest):
             correlation_id=msg.correlation_id
         ))
         return
+    store.put("slots", slot, slots[slot])
 
-    qr = str(uuid.uuid4())
-    slots[slot] = {
-        "artikel": msg.artikel,
-        "qr": qr,
-        "token_typ": msg.token_typ
-    }
+    def zuruecknehmen():
+        faecher.release_by_qr(qr)
+        store.delete("slots", slot)
+
+    # ohne gespeichertes Fach wäre der QR-Code nach einem Neustart wertlos
+    if not await store.commit_or_undo(zuruecknehmen):
+        await ctx.send(sender, GarderobeAbgabeResponse(
+            qr_code="",
+            info="❌ Ablage konnte nicht gespeichert werden, bitte erneut versuchen",
+            correlation_id=msg.correlation_id
+        ))
+        return
 
     # -----------------------------------
     #   Neue Logik: Token-Ausgabe
@@ -87,18 +106,22 @@ async def handle_abgabe(ctx: Context, sender: str, msg: GarderobeAbgabeRequest):
 @garderobe.on_message(model=GarderobeAbholungRequest)
 async def handle_abholung(ctx: Context, sender: str, msg: GarderobeAbholungRequest):
 
-    for slot, data in list(slots.items()):
-        if data["qr"] == msg.qr_code:
-            artikel = data["artikel"]
-            token_typ = data["token_typ"]
-            del slots[slot]
-
-            await ctx.send(sender, GarderobeAbholungResponse(
-                artikel=artikel,
-                info=f"Artikel '{artikel}' aus Fach {slot} ausgegeben. Token war: {token_typ}",
-                correlation_id=msg.correlation_id
-            ))
-            return
+    found = faecher.release_by_qr(msg.qr_code)
+    if found:
+        slot, data = found
+        store.delete("slots", slot)
+        # der Artikel wird trotzdem ausgegeben; die Löschung bleibt gepuffert
+        # und geht mit dem nächsten erfolgreichen commit() auf die Platte
+        await store.commit_or_undo(lambda: None)
+        artikel = data["artikel"]
+        token_typ = data["token_typ"]
+
+        await ctx.send(sender, GarderobeAbholungResponse(
+            artikel=artikel,
+            info=f"Artikel '{artikel}' aus Fach {slot} ausgegeben. Token war: {token_typ}",
+            correlation_id=msg.correlation_id
+        ))
+        return
 
     await ctx.send(sender, GarderobeAbholungResponse(
         artikel="",
@@ -113,6 +136,7 @@ if __name__ == "__main__":
     print("=" * 60)
     print(f"📍 Agent-Adresse: {garderobe.address}")
     print(f"🌐 Endpoint: http://localhost:8006/submit")
+    print(f"🗄️ Fächer: {MAX_SLOTS}")
     print("=" * 60)
     print()
     garderobe.run()
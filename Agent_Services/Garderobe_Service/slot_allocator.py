@@ -0,0 +1,70 @@
+"""
+slot_allocator.py
+
+Fächer-Verwaltung der Garderobe mit konstanten Kosten pro Abgabe/Abholung.
+
+- Freie Fächer: Hochwassermarke + Stapel zurückgegebener Fächer.
+  Noch nie benutzte Fächer werden nicht vorab angelegt, daher kostet
+  auch eine Garderobe mit einer Million Fächern beim Start nichts.
+- QR-Index: qr -> Fach, damit die Abholung nicht alle Fächer durchsucht.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+class SlotAllocator:
+
+    def __init__(self, max_slots: int):
+        self.max_slots = max_slots
+        self.slots: Dict[int, dict] = {}
+        self.qr_index: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._next_unused = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def allocate(self, data: dict) -> Optional[int]:
+        """Legt `data` (mit Schlüssel "qr") in ein freies Fach; None, wenn alles belegt ist."""
+        if self._free:
+            slot = self._free.pop()
+        elif self._next_unused < self.max_slots:
+            slot = self._next_unused
+            self._next_unused += 1
+        else:
+            return None
+
+        self.slots[slot] = data
+        self.qr_index[data["qr"]] = slot
+        return slot
+
+    def release_by_qr(self, qr: str) -> Optional[Tuple[int, dict]]:
+        """Gibt das Fach zum QR-Code frei und liefert (Fach, Daten) oder None."""
+        slot = self.qr_index.pop(qr, None)
+        if slot is None:
+            return None
+        data = self.slots.pop(slot)
+        if slot < self.max_slots:     # Fächer jenseits der Kapazität (siehe restore) nicht neu vergeben
+            self._free.append(slot)
+        return slot, data
+
+    def restore(self, slots: Dict[int, dict]):
+        """
+        Stellt belegte Fächer wieder her (z. B. nach einem Neustart aus dem StateStore).
+
+        Fächer ab `max_slots` (etwa nach Verkleinern von GARDEROBE_MAX_SLOTS)
+        bleiben abholbar, werden danach aber nicht wieder vergeben; die
+        Hochwassermarke wird auf die Kapazität begrenzt.
+        """
+        self.slots.clear()          # gleiches Dict, der Service hält eine Referenz darauf
+        self.slots.update(slots)
+        self.qr_index = {data["qr"]: slot for slot, data in slots.items()}
+        zu_gross = sorted(s for s in slots if s >= self.max_slots)
+        if zu_gross:
+            print(
+                f"⚠️ Garderobe: {len(zu_gross)} belegte(s) Fach/Fächer ab Nr. {zu_gross[0]} "
+                f"über der Kapazität {self.max_slots} – nur noch Abholung möglich"
+            )
+        self._next_unused = min(max(slots) + 1, self.max_slots) if slots else 0
+        # Lücken unterhalb der Hochwassermarke sind frei, kleinste zuerst vergeben
+        self._free = [s for s in range(self._next_unused - 1, -1, -1) if s not in self.slots]
@@ -0,0 +1,287 @@
+"""
+state_store.py
+
+Absturzsicherer Zustand für die Services (Buchung + Garderobe).
+
+Der Zustand eines Service liegt als benannte Tabellen (key -> JSON-Wert)
+vor, z. B. "zimmer" -> {"einzel": 19, ...} oder "reservations" -> {rid: {...}}.
+Jede Änderung ist ein put/delete und wird
+
+- sofort in den Tabellen übernommen und als Zeile ans Write-Ahead-Log
+  gehängt (`<crc32>\\t<json>\\n`, mit fortlaufender LSN),
+- mit `await store.commit()` dauerhaft gemacht. Commit ist ein
+  Group-Commit: während ein fsync läuft, sammeln sich neue Zeilen und
+  gehen gemeinsam mit dem nächsten fsync raus – bei vielen gleichzeitigen
+  Buchungen also ein fsync für viele Buchungen, ohne Zusatzwartezeit für
+  eine einzelne.
+
+Alle `snapshot_alle` Einträge wird ein kompakter Snapshot (Kopfzeile mit
+LSN, dann `tabelle\tkey\twert` pro Eintrag) atomar geschrieben
+(tmp + fsync + rename) und das WAL geleert.
+Wiederherstellung = Snapshot laden + WAL-Einträge mit LSN > Snapshot-LSN
+nachspielen, also proportional zum WAL-Rest. Eine beim Absturz nur halb
+geschriebene letzte Zeile (falsche Prüfsumme, kein Zeilenende) wird
+verworfen und abgeschnitten.
+
+Schlüssel sind Strings (JSON-Objekte). Der Ablageort ist EMS_STATE_DIR
+(Standard: Agent_Services/state).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+STATE_DIR = os.environ.get(
+    "EMS_STATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "state")
+)
+
+
+def _fsync_dir(path: str):
+    # macht das rename selbst dauerhaft; unter Windows nicht möglich/nötig
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StateStore:
+    """Tabellen mit Write-Ahead-Log, Group-Commit und Snapshots für einen Service."""
+
+    def __init__(
+        self,
+        name: str,
+        verzeichnis: Optional[str] = None,
+        snapshot_alle: int = 10_000,
+        fsync: bool = True,
+    ):
+        self.name = name
+        self.verzeichnis = verzeichnis or STATE_DIR
+        self.snapshot_alle = snapshot_alle
+        self.fsync = fsync
+
+        self.wal_pfad = os.path.join(self.verzeichnis, f"{name}.wal")
+        self.snapshot_pfad = os.path.join(self.verzeichnis, f"{name}.snapshot")
+
+        self._tabellen: Dict[str, Dict[str, str]] = {}   # Werte JSON-kodiert
+        self._puffer: List[bytes] = []
+        self._lsn = 0
+        self._dauerhaft_lsn = 0
+        self._snapshot_lsn = 0
+        self._lock = threading.Lock()           # Puffer + Tabellen (Anhängen vs. Flush)
+        self._schreib_lock = threading.Lock()   # ein Flush zur Zeit, in LSN-Reihenfolge
+        self._wal = None
+        self._flush_task: Optional[asyncio.Future] = None
+        self._defekt: Optional[BaseException] = None   # WAL nach Schreibfehler nicht reparierbar
+
+        # Statistik
+        self.fsyncs = 0
+        self.wiederhergestellt = 0        # beim Öffnen nachgespielte WAL-Einträge
+
+    # ------------------------------------------------------------------
+    #   Öffnen / Wiederherstellen
+    # ------------------------------------------------------------------
+    def open(self) -> Dict[str, Dict[str, Any]]:
+        """Stellt den letzten Zustand her und liefert die Tabellen (Werte dekodiert)."""
+        os.makedirs(self.verzeichnis, exist_ok=True)
+        self._lade_snapshot()
+        gueltig = self._spiele_wal_nach()
+        self._dauerhaft_lsn = self._lsn
+
+        self._wal = open(self.wal_pfad, "ab")
+        if self._wal.tell() != gueltig:
+            # halb geschriebene Zeile vom Absturz abschneiden, sonst hängen neue dahinter
+            self._wal.truncate(gueltig)
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+        return {t: self.table(t) for t in self._tabellen}
+
+    def _lade_snapshot(self):
+        if not os.path.exists(self.snapshot_pfad):
+            return
+        with open(self.snapshot_pfad, "r", encoding="utf-8") as f:
+            kopf = json.loads(f.readline())
+            for zeile in f:
+                # Tabelle und Schlüssel JSON-kodiert, Wert unverändert übernehmen
+                tabelle, key, kodiert = zeile.rstrip("\n").split("\t", 2)
+                self._tabellen.setdefault(json.loads(tabelle), {})[json.loads(key)] = kodiert
+        self._lsn = self._snapshot_lsn = kopf["lsn"]
+
+    def _spiele_wal_nach(self) -> int:
+        """Spielt das WAL ab der Snapshot-LSN nach; liefert die Länge des gültigen Teils."""
+        if not os.path.exists(self.wal_pfad):
+            return 0
+        gueltig = 0
+        with open(self.wal_pfad, "rb") as f:
+            for zeile in f:
+                eintrag = self._dekodiere(zeile)
+                if eintrag is None:
+                    print(f"⚠️ [{self.name}] WAL: unvollständige Zeile bei Byte {gueltig} verworfen")
+                    break
+                gueltig += len(zeile)
+                if eintrag["lsn"] <= self._lsn:
+                    continue      # steckt schon im Snapshot
+                tabelle = self._tabellen.setdefault(eintrag["t"], {})
+                if eintrag["op"] == "put":
+                    tabelle[eintrag["k"]] = json.dumps(eintrag["v"], ensure_ascii=False)
+                else:
+                    tabelle.pop(eintrag["k"], None)
+                self._lsn = eintrag["lsn"]
+                self.wiederhergestellt += 1
+        return gueltig
+
+    @staticmethod
+    def _dekodiere(zeile: bytes) -> Optional[dict]:
+        if not zeile.endswith(b"\n"):
+            return None
+        crc, sep, payload = zeile[:-1].partition(b"\t")
+        if not sep:
+            return None
+        try:
+            if int(crc, 16) != zlib.crc32(payload):
+                return None
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    # ------------------------------------------------------------------
+    #   Lesen / Ändern
+    # ------------------------------------------------------------------
+    def table(self, tabelle: str) -> Dict[str, Any]:
+        """Kopie einer Tabelle mit dekodierten Werten."""
+        return {k: json.loads(v) for k, v in self._tabellen.get(tabelle, {}).items()}
+
+    def put(self, tabelle: str, key: str, wert: Any) -> int:
+        """Setzt tabelle[key] = wert (muss JSON-serialisierbar sein); liefert die LSN."""
+        kodiert = json.dumps(wert, ensure_ascii=False)
+        return self._anhaengen("put", tabelle, str(key), kodiert)
+
+    def delete(self, tabelle: str, key: str) -> int:
+        """Entfernt tabelle[key]; liefert die LSN."""
+        return self._anhaengen("del", tabelle, str(key), None)
+
+    def _anhaengen(self, op: str, tabelle: str, key: str, kodiert: Optional[str]) -> int:
+        kopf = f'"op":"{op}","t":{json.dumps(tabelle)},"k":{json.dumps(key, ensure_ascii=False)}'
+        with self._lock:
+            self._lsn += 1
+            payload = (
+                f'{{"lsn":{self._lsn},{kopf},"v":{kodiert}}}' if op == "put"
+                else f'{{"lsn":{self._lsn},{kopf}}}'
+            ).encode("utf-8")
+            self._puffer.append(b"%08x\t%s\n" % (zlib.crc32(payload), payload))
+            if op == "put":
+                self._tabellen.setdefault(tabelle, {})[key] = kodiert
+            else:
+                self._tabellen.get(tabelle, {}).pop(key, None)
+            return self._lsn
+
+    # ------------------------------------------------------------------
+    #   Dauerhaft machen
+    # ------------------------------------------------------------------
+    async def commit(self):
+        """Wartet, bis alle bisherigen Änderungen auf der Platte sind (Group-Commit)."""
+        ziel = self._lsn
+        while self._dauerhaft_lsn < ziel:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.ensure_future(asyncio.to_thread(self.flush))
+            await asyncio.shield(self._flush_task)
+
+    async def commit_or_undo(self, undo: Callable[[], None]) -> bool:
+        """
+        commit(); schlägt er fehl, wird `undo()` ausgeführt und False geliefert.
+
+        `undo` nimmt die Änderung im Speicher zurück und schreibt dafür
+        Gegen-Einträge (put/delete), denn die ursprünglichen Zeilen bleiben
+        im Puffer und gehen mit dem nächsten erfolgreichen Flush raus.
+        """
+        try:
+            await self.commit()
+            return True
+        except Exception as e:
+            print(f"⚠️ [{self.name}] Speichern fehlgeschlagen, Änderung zurückgenommen: {e}")
+            undo()
+            return False
+
+    def flush(self) -> int:
+        """Schreibt den Puffer synchron ins WAL (+ fsync) und kompaktiert bei Bedarf."""
+        return self._flush(self.snapshot_alle)
+
+    def snapshot(self):
+        """Schreibt sofort einen Snapshot und leert das WAL."""
+        self._flush(1)
+
+    def _flush(self, snapshot_ab: int) -> int:
+        # _schreib_lock hält die Reihenfolge der Batches; _lock nur kurz für den
+        # Puffer-Tausch, damit put() während des fsync nicht blockiert
+        with self._schreib_lock:
+            if self._defekt is not None:
+                raise RuntimeError(f"StateStore {self.name}: WAL nicht mehr beschreibbar") from self._defekt
+            with self._lock:
+                zeilen, self._puffer = self._puffer, []
+                bis = self._lsn
+                stand = None
+                if bis - self._snapshot_lsn >= snapshot_ab:
+                    stand = {t: dict(e) for t, e in self._tabellen.items()}
+            if zeilen:
+                pos = self._wal.tell()
+                try:
+                    self._wal.write(b"".join(zeilen))
+                    self._wal.flush()
+                    if self.fsync:
+                        os.fsync(self._wal.fileno())
+                        self.fsyncs += 1
+                except BaseException:
+                    # nichts gilt als dauerhaft: Teilschreibung abschneiden und die
+                    # Zeilen vorne zurück in den Puffer, der nächste Flush versucht es erneut
+                    try:
+                        self._wal.truncate(pos)
+                        # truncate() lässt die Position stehen -> sonst liefert tell() beim
+                        # nächsten Versuch das alte Ende und die Teilschreibung bleibt liegen
+                        self._wal.seek(pos)
+                    except (OSError, ValueError) as e:
+                        # WAL-Ende unklar -> nichts mehr anhängen, jeder Flush schlägt fehl
+                        self._defekt = e
+                    with self._lock:
+                        self._puffer[:0] = zeilen
+                    raise
+            self._dauerhaft_lsn = bis
+            if stand is not None:
+                self._schreibe_snapshot(stand, bis)
+        return bis
+
+    def _schreibe_snapshot(self, stand: Dict[str, Dict[str, str]], lsn: int):
+        tmp = self.snapshot_pfad + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"lsn": lsn}) + "\n")
+            for tabelle, eintraege in stand.items():
+                t = json.dumps(tabelle)
+                for key, kodiert in eintraege.items():
+                    f.write(f"{t}\t{json.dumps(key, ensure_ascii=False)}\t{kodiert}\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_pfad)
+        if self.fsync:
+            _fsync_dir(self.verzeichnis)
+        self._snapshot_lsn = lsn
+
+        # alles im WAL ist jetzt im Snapshot (neuere Zeilen liegen noch im Puffer);
+        # ein Absturz vor dem Leeren schadet nicht, LSN <= Snapshot-LSN wird übersprungen
+        self._wal.truncate(0)
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+    def close(self):
+        if self._wal is not None:
+            self.flush()
+            self._wal.close()
+            self._wal = None
@@ -0,0 +1,94 @@
+"""
+bench_central_dispatch.py
+
+Misst die End-to-End-Latenz eines CentralServiceMessage-Envelopes
+(erster Eintrag empfangen -> letzter Eintrag beim Service angekommen)
+für sequentielles und paralleles Weiterleiten.
+
+ctx.send wird durch einen Fake mit zufälliger Netzwerklatenz ersetzt,
+damit der Benchmark ohne laufende Service-Agenten funktioniert.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_central_dispatch.py
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Services", "Central_Services"))
+
+from service_central import dispatch_messages, service_map  # noqa: E402
+
+
+ENTRY_COUNTS = [1, 5, 10, 25, 50]
+RUNS = 200
+SEND_LATENCY_MS = (5.0, 25.0)   # gleichverteilte Round-Trip-Zeit pro ctx.send
+
+
+class FakeContext:
+    async def send(self, target, msg):
+        await asyncio.sleep(random.uniform(*SEND_LATENCY_MS) / 1000.0)
+        return None
+
+
+def make_entries(n: int) -> list:
+    types = list(service_map.keys())
+    entries = []
+    for i in range(n):
+        t = types[i % len(types)]
+        base = {"type": t, "zeit": "12:00", "client_sender": "bench"}
+        if t == "essensservice":
+            base.update(standard=1, vegetarisch=0, vegan=0, glutenfrei=0)
+        elif t == "haustierbetreuung":
+            base.update(haustierart="hund", betreuung_von="12:00", betreuung_bis="14:00")
+        elif t == "hotel":
+            base.update(zimmerart="einzel", naechte=1)
+        elif t == "parkplatz":
+            base.update(fahrzeugart="PKW", ladestation=False, reservation_id="")
+        entries.append(base)
+    return entries
+
+
+def percentile(values, p):
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+async def run(parallel: bool, n: int) -> list:
+    ctx = FakeContext()
+    entries = make_entries(n)
+    latencies = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        await dispatch_messages(ctx, entries, parallel=parallel)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return latencies
+
+
+async def main():
+    # Ausgaben der Dispatch-Funktion unterdrücken
+    devnull = open(os.devnull, "w")
+    real_stdout = sys.stdout
+
+    print(f"{'Einträge':>8} | {'seq p50':>9} | {'seq p99':>9} | {'par p50':>9} | {'par p99':>9}")
+    print("-" * 56)
+    for n in ENTRY_COUNTS:
+        sys.stdout = devnull
+        seq = await run(False, n)
+        par = await run(True, n)
+        sys.stdout = real_stdout
+        print(
+            f"{n:>8} | {percentile(seq, 50):>7.1f}ms | {percentile(seq, 99):>7.1f}ms | "
+            f"{percentile(par, 50):>7.1f}ms | {percentile(par, 99):>7.1f}ms"
+        )
+    devnull.close()
+    print(f"\n(mittlere Sende-Latenz {statistics.mean(SEND_LATENCY_MS):.0f} ms, {RUNS} Läufe pro Zeile)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+bench_garderobe_slots.py
+
+Mikrobenchmark der Garderobe: Abgabe (freies Fach finden) und Abholung
+(Fach zum QR-Code finden) bei 100, 10.000 und 1.000.000 Fächern.
+
+- alt: lineare Suche über range(MAX_SLOTS) bzw. über alle Fächer
+- neu: SlotAllocator (Freiliste + QR-Index)
+
+Gemessen wird bei 90 % Belegung, also im typischen Betrieb einer
+vollen Garderobe.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_garderobe_slots.py
+"""
+
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Services", "Garderobe_Service"))
+
+from slot_allocator import SlotAllocator  # noqa: E402
+
+
+SIZES = [100, 10_000, 1_000_000]
+FILL = 0.9
+
+
+# ---------- alter Pfad (wie vorher in service_garderobe.py) ----------
+
+def freier_slot_alt(slots: dict, max_slots: int):
+    for i in range(max_slots):
+        if i not in slots:
+            return i
+    return None
+
+
+def abholung_alt(slots: dict, qr: str):
+    for slot, data in list(slots.items()):
+        if data["qr"] == qr:
+            del slots[slot]
+            return slot
+    return None
+
+
+def per_op(fn, ops: int) -> float:
+    t0 = time.perf_counter()
+    fn(ops)
+    return (time.perf_counter() - t0) / ops * 1e6
+
+
+def bench(max_slots: int):
+    filled = int(max_slots * FILL)
+    qrs = [str(uuid.uuid4()) for _ in range(filled)]
+    # bei 1M Fächern braucht der alte Pfad Sekunden pro Operation
+    ops = max(3, min(filled // 2, 1000, 2_000_000 // max_slots))
+    ops_neu = min(filled // 2, 10_000)
+
+    # --- alt ---
+    slots = {i: {"qr": qrs[i], "artikel": "Jacke", "token_typ": "digital"} for i in range(filled)}
+
+    def alt_abholung(n):
+        for i in range(n):
+            abholung_alt(slots, qrs[filled - 1 - i])
+
+    def alt_abgabe(n):
+        for i in range(n):
+            slot = freier_slot_alt(slots, max_slots)
+            slots[slot] = {"qr": "neu", "artikel": "Jacke", "token_typ": "digital"}
+
+    alt_pick = per_op(alt_abholung, ops)
+    alt_dep = per_op(alt_abgabe, ops)
+
+    # --- neu ---
+    faecher = SlotAllocator(max_slots)
+    for i in range(filled):
+        faecher.allocate({"qr": qrs[i], "artikel": "Jacke", "token_typ": "digital"})
+
+    def neu_abholung(n):
+        for i in range(n):
+            faecher.release_by_qr(qrs[filled - 1 - i])
+
+    def neu_abgabe(n):
+        for i in range(n):
+            faecher.allocate({"qr": f"neu-{i}", "artikel": "Jacke", "token_typ": "digital"})
+
+    neu_pick = per_op(neu_abholung, ops_neu)
+    neu_dep = per_op(neu_abgabe, ops_neu)
+
+    return alt_dep, neu_dep, alt_pick, neu_pick
+
+
+def main():
+    print(f"{'Fächer':>9} | {'Abgabe alt':>12} | {'Abgabe neu':>10} | {'Abholung alt':>12} | {'Abholung neu':>12}")
+    print("-" * 68)
+    for size in SIZES:
+        alt_dep, neu_dep, alt_pick, neu_pick = bench(size)
+        print(
+            f"{size:>9} | {alt_dep:>10.1f}µs | {neu_dep:>8.2f}µs | "
+            f"{alt_pick:>10.1f}µs | {neu_pick:>10.2f}µs"
+        )
+    print(f"\n(Belegung {FILL:.0%}, Zeiten pro Operation)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+bench_intent_cache.py
+
+Trefferquote und Lookup-Kosten des Intent-Caches.
+
+Der Cache wird mit dem Korpus (Agent_Test/intent_corpus.jsonl) gefüllt und
+dann mit Whisper-typischen Varianten derselben Sätze abgefragt
+(Groß/Klein, Satzzeichen, getrennte Komposita, Füllwörter) sowie mit
+Sätzen, die sich nur in einer Zahl oder "mit/ohne" unterscheiden – die
+dürfen NICHT treffen.
+
+Berichtet:
+- Trefferquote exakt / ähnlich, falsche Treffer
+- Lookup-Latenz bei 1 000 gefüllten Einträgen (Treffer und Fehlschlag)
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_intent_cache.py
+"""
+
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Agent_Fahrer"))
+
+from intent_classifier import Intent, IntentCache  # noqa: E402
+
+VARIANTEN = [
+    lambda t: t.lower(),
+    lambda t: t.rstrip(".?!"),
+    lambda t: t.replace("Parkplatz", "Park Platz").replace("zimmer", " Zimmer"),
+    lambda t: "Ähm " + t,
+    lambda t: t.replace("bitte", "").replace("Bitte", ""),
+]
+
+GEGENPROBEN = [
+    ("Ich brauche einen PKW Parkplatz mit Ladesäule für zwei Stunden.",
+     "Ich brauche einen PKW Parkplatz ohne Ladesäule für zwei Stunden."),
+    ("Ich brauche ein Einzelzimmer für zwei Nächte.",
+     "Ich brauche ein Einzelzimmer für drei Nächte."),
+    ("Buch mir bitte ein Doppelzimmer für drei Nächte.",
+     "Buch mir bitte ein Einzelzimmer für drei Nächte."),
+    ("Gibt es einen LKW-Parkplatz ohne Ladestation?",
+     "Gibt es einen PKW-Parkplatz ohne Ladestation?"),
+]
+
+
+def main():
+    with open(os.path.join(HERE, "intent_corpus.jsonl"), "r", encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    cache = IntentCache()
+    for row in corpus:
+        cache.put(row["text"], Intent(row["action"], row["parameters"], 0.9, row["text"]))
+
+    falsch = 0
+    for row in corpus:
+        for variante in VARIANTEN:
+            intent = cache.get(variante(row["text"]))
+            if intent is not None and (intent.action, intent.parameters) != (row["action"], row["parameters"]):
+                falsch += 1
+
+    gegen_treffer = sum(cache.get(anders) is not None for _, anders in GEGENPROBEN)
+
+    total = cache.hits_exact + cache.hits_similar + cache.misses
+    print(f"Varianten: {total} Anfragen")
+    print(f"  exakt:   {cache.hits_exact / total:.1%}")
+    print(f"  ähnlich: {cache.hits_similar / total:.1%}")
+    print(f"  gesamt:  {(cache.hits_exact + cache.hits_similar) / total:.1%}")
+    print(f"  falsche Treffer: {falsch}")
+    print(f"Gegenproben (Zahl/mit-ohne/Zimmerart geändert): {gegen_treffer}/{len(GEGENPROBEN)} Treffer (soll 0)")
+
+    # Lookup-Kosten bei vollem Cache
+    gross = IntentCache(max_entries=1000)
+    for i in range(1000):
+        gross.put(f"Ich brauche einen Parkplatz Nummer {i} für den Wagen", Intent("parking", {}, 0.9, ""))
+    for row in corpus:
+        gross.put(row["text"], Intent(row["action"], row["parameters"], 0.9, row["text"]))
+
+    for name, text in [
+        ("exakt", corpus[0]["text"]),
+        ("ähnlich", corpus[0]["text"].replace("Parkplatz", "Park Platz")),
+        ("Fehlschlag", "Wie spät ist es in Tokio?"),
+    ]:
+        n = 2000
+        t0 = time.perf_counter()
+        for _ in range(n):
+            gross.get(text)
+        print(f"Lookup {name:<10} bei 1000 Einträgen: {(time.perf_counter() - t0) / n * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+bench_intent_classifier.py
+
+Offline-Benchmark und Regressionstest für die Intent-Erkennung.
+
+Fährt einen Classifier über den beschrifteten Korpus
+(Agent_Test/intent_corpus.jsonl: parking, food, hotel, coffee, pet, help,
+unknown) und berichtet:
+- Genauigkeit pro action und gesamt
+- Parameter-Exakttreffer (bei richtiger action)
+- Latenz p50/p95/p99 bei einem Aufrufer
+- Durchsatz und p95 bei N gleichzeitigen Aufrufern
+
+Backends:
+    rules   nur der regelbasierte Matcher (Fehlschlag = "unknown")
+    local   nur der LocalIntentClassifier (ohne LLM, immer eine Antwort)
+    llm     LLMIntentClassifier.aclassify() gegen den Mock-Ollama
+            (Agent_Test/mock_ollama.py, Standard) oder mit --api-url
+            gegen einen echten Server; --fast-path schaltet den Matcher davor,
+            --lokal den LocalIntentClassifier (LLM nur bei kleiner Marge)
+
+Achtung: der Mock antwortet selbst mit dem regelbasierten Matcher – mit
+ihm sind nur Latenz/Durchsatz aussagekräftig, Genauigkeit nur mit echtem LLM.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_intent_classifier.py --backend rules
+    python Agent_Test/bench_intent_classifier.py --backend local --runden 20
+    python Agent_Test/bench_intent_classifier.py --backend llm --fast-path --token-ms 10 --gleichzeitig 1,4,16
+    python Agent_Test/bench_intent_classifier.py --backend llm --api-url http://localhost:11434 \\
+        --model llama3.2 --min-genauigkeit 0.85
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Agent_Fahrer"))
+sys.path.insert(0, HERE)
+
+from intent_classifier import (  # noqa: E402
+    Intent,
+    LLMIntentClassifier,
+    LocalIntentClassifier,
+    RuleBasedIntentMatcher,
+)
+
+ACTIONS = ["parking", "food", "hotel", "coffee", "pet", "help", "unknown"]
+
+
+def load_corpus(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def make_backend(args):
+    """Liefert (async classify(text) -> Intent, Aufräum-Coroutine-Funktion)."""
+    if args.backend == "rules":
+        matcher = RuleBasedIntentMatcher()
+
+        async def classify(text: str) -> Intent:
+            return matcher.match(text) or Intent("unknown", {}, 0.0, text)
+
+        async def close():
+            pass
+
+        return classify, close
+
+    if args.backend == "local":
+        local = LocalIntentClassifier()
+
+        async def classify(text: str) -> Intent:
+            return local.predict(text)[0]
+
+        async def close():
+            pass
+
+        return classify, close
+
+    server = None
+    api_url = args.api_url
+    if api_url is None:
+        from mock_ollama import start_mock_server
+
+        server = start_mock_server(
+            model=args.model,
+            latency_ms=args.latenz_ms,
+            prefix_ms=0.0,
+            token_ms=args.token_ms,
+        )
+        api_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    clf = LLMIntentClassifier(
+        model=args.model,
+        api_url=api_url,
+        use_fast_path=args.fast_path,
+        use_cache=False,
+        use_local=args.lokal,
+        local_min_margin=args.marge,
+        stream=args.stream,
+        max_in_flight=max(args.gleichzeitig),
+    )
+
+    async def close():
+        await clf.aclose()
+        clf.close()
+        if server is not None:
+            server.shutdown()
+
+    return clf.aclassify, close
+
+
+async def accuracy_pass(classify, corpus, zeige_fehler: bool):
+    per_action = collections.defaultdict(lambda: [0, 0])   # action -> [richtig, gesamt]
+    params_ok = params_total = 0
+    latencies = []
+
+    for row in corpus:
+        t0 = time.perf_counter()
+        intent = await classify(row["text"])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        stats = per_action[row["action"]]
+        stats[1] += 1
+        if intent.action == row["action"]:
+            stats[0] += 1
+            params_total += 1
+            if intent.parameters == row["parameters"]:
+                params_ok += 1
+            elif zeige_fehler:
+                print(f"  Parameter: {row['text']!r}: {intent.parameters} statt {row['parameters']}")
+        elif zeige_fehler:
+            print(f"  Action:    {row['text']!r}: {intent.action} statt {row['action']}")
+
+    return per_action, params_ok, params_total, latencies
+
+
+async def throughput_pass(classify, texts, concurrency: int):
+    queue: asyncio.Queue = asyncio.Queue()
+    for text in texts:
+        queue.put_nowait(text)
+    latencies = []
+
+    async def worker():
+        while True:
+            try:
+                text = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            await classify(text)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    return len(texts) / wall, latencies
+
+
+async def main_async(args):
+    corpus = load_corpus(args.korpus)
+    classify, close = make_backend(args)
+
+    try:
+        per_action, params_ok, params_total, latencies = await accuracy_pass(
+            classify, corpus, args.fehler
+        )
+
+        richtig = sum(s[0] for s in per_action.values())
+        gesamt = sum(s[1] for s in per_action.values())
+        extras = (" + Fast-Path" if args.fast_path else "") + (" + lokal" if args.lokal else "")
+        print(f"\nBackend: {args.backend}{extras}, {gesamt} Sätze\n")
+        print(f"{'action':<9} | {'richtig':>7} | {'Genauigkeit':>11}")
+        print("-" * 34)
+        for action in ACTIONS:
+            ok, total = per_action.get(action, (0, 0))
+            if total:
+                print(f"{action:<9} | {ok:>3}/{total:<3} | {ok / total:>11.1%}")
+        print("-" * 34)
+        print(f"{'gesamt':<9} | {richtig:>3}/{gesamt:<3} | {richtig / gesamt:>11.1%}")
+        if params_total:
+            print(f"Parameter exakt (bei richtiger action): {params_ok / params_total:.1%} "
+                  f"({params_ok}/{params_total})")
+
+        print(f"\nLatenz (1 Aufrufer): p50 {percentile(latencies, 0.5):.2f} ms, "
+              f"p95 {percentile(latencies, 0.95):.2f} ms, p99 {percentile(latencies, 0.99):.2f} ms")
+
+        texts = [row["text"] for row in corpus] * args.runden
+        print(f"\n{'gleichzeitig':>12} | {'Anfragen/s':>10} | {'p50 ms':>8} | {'p95 ms':>8}")
+        print("-" * 48)
+        for n in args.gleichzeitig:
+            rate, lat = await throughput_pass(classify, texts, n)
+            print(f"{n:>12} | {rate:>10.1f} | {percentile(lat, 0.5):>8.2f} | {percentile(lat, 0.95):>8.2f}")
+    finally:
+        await close()
+
+    accuracy = richtig / gesamt
+    if args.min_genauigkeit is not None and accuracy < args.min_genauigkeit:
+        print(f"\n❌ Genauigkeit {accuracy:.1%} unter der Schwelle {args.min_genauigkeit:.1%}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["rules", "local", "llm"], default="rules")
+    parser.add_argument("--korpus", default=os.path.join(HERE, "intent_corpus.jsonl"))
+    parser.add_argument("--fast-path", action="store_true", help="Regel-Matcher vor dem LLM (nur llm)")
+    parser.add_argument("--lokal", action="store_true", help="LocalIntentClassifier vor dem LLM (nur llm)")
+    parser.add_argument("--marge", type=float, default=0.1, help="local_min_margin für --lokal")
+    parser.add_argument("--stream", action="store_true", help="Streaming-Modus des LLM-Aufrufs")
+    parser.add_argument("--api-url", default=None, help="echter Ollama-Server statt Mock")
+    parser.add_argument("--model", default="gpt-oss:20b-cloud")
+    parser.add_argument("--latenz-ms", type=float, default=40.0, help="Mock: Rechenzeit pro Anfrage")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Mock: Zeit pro Token")
+    parser.add_argument("--gleichzeitig", default="1,4,16",
+                        type=lambda v: [int(x) for x in v.split(",")],
+                        help="Anzahl gleichzeitiger Aufrufer, kommagetrennt")
+    parser.add_argument("--runden", type=int, default=1, help="Korpus-Durchläufe pro Durchsatzmessung")
+    parser.add_argument("--fehler", action="store_true", help="Fehlklassifikationen ausgeben")
+    parser.add_argument("--min-genauigkeit", type=float, default=None,
+                        help="Exit-Code 1, wenn die Gesamtgenauigkeit darunter liegt (Regressionstest)")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+bench_intent_fast_path.py
+
+Bewertet den regelbasierten Fast-Path des Intent-Classifiers auf dem
+beschrifteten Korpus (Agent_Test/intent_corpus.jsonl).
+
+Berichtet:
+- Trefferquote: Anteil der Sätze, die ohne LLM beantwortet werden
+- Präzision auf den Treffern: action und Parameter stimmen exakt
+- Latenz pro Aufruf des Matchers (p50/p99)
+- optional (--ollama): Latenz des vollen LLM-Aufrufs zum Vergleich
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_intent_fast_path.py
+    python Agent_Test/bench_intent_fast_path.py --ollama --model gpt-oss:20b-cloud
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Fahrer"))
+
+from intent_classifier import LLMIntentClassifier, RuleBasedIntentMatcher  # noqa: E402
+
+
+def load_corpus(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--korpus", default=os.path.join(here, "intent_corpus.jsonl"))
+    parser.add_argument("--runden", type=int, default=200, help="Wiederholungen für die Latenzmessung")
+    parser.add_argument("--ollama", action="store_true", help="zusätzlich das LLM auf allen Sätzen messen")
+    parser.add_argument("--model", default="gpt-oss:20b-cloud")
+    parser.add_argument("--api-url", default="http://localhost:11434")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.korpus)
+    matcher = RuleBasedIntentMatcher()
+
+    hits = correct = 0
+    for row in corpus:
+        intent = matcher.match(row["text"])
+        if intent is None:
+            print(f"  →LLM   {row['text']}")
+            continue
+        hits += 1
+        ok = intent.action == row["action"] and intent.parameters == row["parameters"]
+        correct += ok
+        mark = "  ok    " if ok else "  FALSCH"
+        print(f"{mark} {row['text']}  ->  {intent.action} {intent.parameters}")
+
+    timings = []
+    for _ in range(args.runden):
+        for row in corpus:
+            t0 = time.perf_counter()
+            matcher.match(row["text"])
+            timings.append((time.perf_counter() - t0) * 1e6)
+
+    print(f"\nKorpus: {len(corpus)} Sätze")
+    print(f"Trefferquote Fast-Path: {hits / len(corpus):.1%} ({hits}/{len(corpus)})")
+    if hits:
+        print(f"Präzision auf Treffern: {correct / hits:.1%} ({correct}/{hits})")
+    print(f"Matcher-Latenz: p50 {percentile(timings, 0.5):.1f} µs, p99 {percentile(timings, 0.99):.1f} µs")
+
+    if args.ollama:
+        clf = LLMIntentClassifier(model=args.model, api_url=args.api_url, use_fast_path=False)
+        llm_ms = []
+        for row in corpus:
+            t0 = time.perf_counter()
+            clf.classify(row["text"])
+            llm_ms.append((time.perf_counter() - t0) * 1000)
+        miss_share = 1 - hits / len(corpus)
+        print(f"LLM-Latenz:     p50 {percentile(llm_ms, 0.5):.0f} ms, p99 {percentile(llm_ms, 0.99):.0f} ms")
+        print(f"Erwartete mittlere Latenz mit Fast-Path: {miss_share * statistics.mean(llm_ms):.0f} ms "
+              f"(ohne: {statistics.mean(llm_ms):.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+bench_ollama_client.py
+
+Latenz des Ollama-Aufrufs im Intent-Classifier: vorher/nachher.
+
+    vorher  = Nachrichtenliste pro Aufruf neu bauen + requests.post
+              (neue TCP-Verbindung pro Aufruf, kein keep_alive)
+    nachher = vorgebauter Präfix + gepoolte requests.Session + keep_alive,
+              Präfix per warmup() schon vor der ersten Anfrage ausgewertet
+    Streaming = wie nachher, aber Antwort als Token-Stream; Lesen endet
+              an der schließenden Klammer, die Action ist noch früher da
+
+Standardmäßig gegen den lokalen Stub (Agent_Test/mock_ollama.py); mit
+--api-url gegen einen echten Ollama-Server.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_ollama_client.py --handshake-ms 30
+    python Agent_Test/bench_ollama_client.py --token-ms 15
+    python Agent_Test/bench_ollama_client.py --api-url http://localhost:11434 --model llama3.2
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "Agent_Fahrer"))
+sys.path.insert(0, HERE)
+
+from intent_classifier import LLMIntentClassifier  # noqa: E402
+from mock_ollama import start_mock_server  # noqa: E402
+
+
+def classify_alt(clf: LLMIntentClassifier, text: str):
+    """Der Aufrufpfad vor der Umstellung (ohne Fast-Path)."""
+    messages = [{"role": "system", "content": clf.system_prompt}]
+    for ex in clf.examples:
+        messages.append({"role": "user", "content": ex["user"]})
+        messages.append({"role": "assistant", "content": ex["response"]})
+    messages.append({"role": "user", "content": text})
+
+    response = requests.post(
+        f"{clf.api_url}/api/chat",
+        json={
+            "model": clf.model,
+            "messages": messages,
+            "stream": False,
+            "options": {"temperature": 0.0, "top_p": 0.9},
+        },
+        timeout=clf.request_timeout,
+    )
+    return clf._parse_reply(response.json()["message"]["content"], text)
+
+
+def measure(fn, texts, runden):
+    timings = []
+    for _ in range(runden):
+        for text in texts:
+            t0 = time.perf_counter()
+            fn(text)
+            timings.append((time.perf_counter() - t0) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<34} | {timings[0]:>7.1f} | {statistics.median(timings):>7.1f} | "
+          f"{p95:>7.1f} | {statistics.mean(timings):>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--api-url", default=None, help="echter Server statt Stub")
+    parser.add_argument("--model", default="gpt-oss:20b-cloud")
+    parser.add_argument("--runden", type=int, default=5)
+    parser.add_argument("--latenz-ms", type=float, default=40.0)
+    parser.add_argument("--prefix-ms", type=float, default=200.0)
+    parser.add_argument("--handshake-ms", type=float, default=0.0,
+                        help="simulierte Kosten pro neuer Verbindung (z. B. TLS zur Cloud)")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="simulierte Generierungszeit pro Token")
+    args = parser.parse_args()
+
+    server = None
+    api_url = args.api_url
+    if api_url is None:
+        server = start_mock_server(
+            model=args.model,
+            latency_ms=args.latenz_ms,
+            prefix_ms=args.prefix_ms,
+            handshake_ms=args.handshake_ms,
+            token_ms=args.token_ms,
+        )
+        api_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with open(os.path.join(HERE, "intent_corpus.jsonl"), "r", encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+
+    print(f"Server: {api_url}, {len(texts)} Sätze × {args.runden} Runden\n")
+    print(f"{'Variante':<34} | {'min':>7} | {'p50':>7} | {'p95':>7} | {'mittel':>7}  (ms)")
+    print("-" * 80)
+
+    # Kaltstart: erster Aufruf zahlt Modell-Laden / Präfix-Auswertung
+    if server is not None:
+        server.cached_prefix = None
+    clf_alt = LLMIntentClassifier(model=args.model, api_url=api_url, use_fast_path=False, use_cache=False)
+    t0 = time.perf_counter()
+    classify_alt(clf_alt, texts[0])
+    print(f"{'vorher: erster Aufruf':<34} | {(time.perf_counter() - t0) * 1000:>7.1f}")
+
+    if server is not None:
+        server.cached_prefix = None
+    clf = LLMIntentClassifier(model=args.model, api_url=api_url, use_fast_path=False, use_cache=False)
+    clf.warmup()
+    t0 = time.perf_counter()
+    clf.classify(texts[0])
+    print(f"{'nachher: erster Aufruf (warm-up)':<34} | {(time.perf_counter() - t0) * 1000:>7.1f}")
+
+    report("vorher: requests.post", measure(lambda t: classify_alt(clf_alt, t), texts, args.runden))
+    conns_before = server.connections if server else 0
+    report("nachher: Session + Präfix", measure(clf.classify, texts, args.runden))
+
+    conns_before_stream = server.connections if server else 0
+
+    clf_stream = LLMIntentClassifier(model=args.model, api_url=api_url, use_fast_path=False,
+                                     use_cache=False, stream=True)
+    bis_action = []
+
+    def classify_stream(text):
+        t0 = time.perf_counter()
+        clf_stream.classify(text, on_action=lambda _: bis_action.append((time.perf_counter() - t0) * 1000))
+
+    report("Streaming: bis Intent", measure(classify_stream, texts, args.runden))
+    report("Streaming: bis Action (on_action)", bis_action)
+
+    if server is not None:
+        print(f"\nVerbindungen im Nachher-Lauf: {conns_before_stream - conns_before} "
+              f"(vorher: eine pro Aufruf)")
+        print(f"Abgebrochene Generierungen im Streaming-Lauf: {server.cancelled}")
+        server.shutdown()
+    clf.close()
+    clf_stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+bench_parking_calendar.py
+
+Kapazitätskalender des Parkplatz-Service bei 10 000 Reservierungen pro Tag.
+
+Jede Anfrage kommt zu einer zufälligen Tageszeit, will einen Platz einer
+Kategorie für [von, bis) mit 0–6 h Vorlauf und 15 bis --max-dauer (240)
+Minuten Dauer; abgelaufene Reservierungen werden wie im Service freigegeben.
+
+Verglichen werden:
+    Segmentbaum  = CapacityCalendar (O(log Buckets) pro Prüfung/Buchung)
+    Minutenliste = dieselben Minuten-Buckets als Python-Liste, Prüfung
+                   und Buchung laufen über alle Minuten des Zeitraums
+    Zähler       = das alte Modell: ein Zähler pro Kategorie, der Platz
+                   ist von der Anfrage bis zum Ende belegt (keine Buchung
+                   für später möglich)
+
+Berichtet: µs pro Anfrage (Prüfen + Buchen) und Ablehnungsquote.
+Die Minutenliste kostet proportional zur Dauer (bei kurzen Zeiträumen
+ist sie dank C-Slicing trotzdem schneller), der Segmentbaum nicht –
+mit --max-dauer 1440 (Ganztags-/Übernachtbuchungen) sieht man den Unterschied.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_parking_calendar.py
+    python Agent_Test/bench_parking_calendar.py --anfragen 20000 --tage 2
+    python Agent_Test/bench_parking_calendar.py --max-dauer 1440
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Services", "Buchung_Service"))
+
+from capacity_calendar import CapacityCalendar  # noqa: E402
+
+# wie parkplatz_kapazitaet in service_parkplatz.py
+KAPAZITAET = {
+    ("PKW", "frei"): 46, ("PKW", "lade"): 50,
+    ("PKW_Behindert", "frei"): 2, ("PKW_Behindert", "lade"): 2,
+    ("LKW", "lade"): 294, ("LKW_Behindert", "lade"): 6,
+    ("BUS", "lade"): 3,
+}
+GEWICHTE = [30, 25, 2, 2, 38, 1, 2]
+
+
+def trace(anfragen: int, tage: int, start: datetime, max_dauer: float = 240, seed: int = 7):
+    rng = random.Random(seed)
+    kategorien = list(KAPAZITAET)
+    out = []
+    for _ in range(anfragen * tage):
+        anfrage = start + timedelta(minutes=rng.uniform(0, 24 * 60 * tage))
+        von = anfrage + timedelta(minutes=rng.choice([0, 0, 0, rng.uniform(0, 360)]))
+        bis = von + timedelta(minutes=rng.uniform(15, max_dauer))
+        out.append((anfrage, rng.choices(kategorien, GEWICHTE)[0], von, bis))
+    out.sort(key=lambda r: r[0])
+    return out
+
+
+class Minutenliste:
+    """Vergleich: Belegung pro Minute, lineare Prüfung über den Zeitraum."""
+
+    def __init__(self, kapazitaet, start: datetime, minuten: int):
+        self.kapazitaet = kapazitaet
+        self.start = start
+        self.belegung = {kat: [0] * minuten for kat in kapazitaet}
+
+    def _bereich(self, von, bis):
+        lo = int((von - self.start).total_seconds() // 60)
+        hi = int(-(-(bis - self.start).total_seconds() // 60))
+        return lo, max(lo + 1, hi)
+
+    def reservieren(self, kat, art, von, bis, jetzt=None):
+        lo, hi = self._bereich(von, bis)
+        b = self.belegung[(kat, art)]
+        if max(b[lo:hi]) >= self.kapazitaet[(kat, art)]:
+            return False
+        for i in range(lo, hi):
+            b[i] += 1
+        return True
+
+    def freigeben(self, kat, art, von, bis):
+        lo, hi = self._bereich(von, bis)
+        b = self.belegung[(kat, art)]
+        for i in range(lo, hi):
+            b[i] -= 1
+
+
+class Zaehler:
+    """Das alte Modell: ein Zähler, belegt von der Anfrage bis zum Ende."""
+
+    def __init__(self, kapazitaet):
+        self.frei = dict(kapazitaet)
+
+    def reservieren(self, kat, art, von, bis, jetzt=None):
+        if self.frei[(kat, art)] <= 0:
+            return False
+        self.frei[(kat, art)] -= 1
+        return True
+
+    def freigeben(self, kat, art, von, bis):
+        self.frei[(kat, art)] += 1
+
+
+def replay(kalender, anfragen):
+    """Spielt die Anfragen ab; Abläufe werden vor jeder Anfrage freigegeben."""
+    ablauf = []     # (bis, n, kat, von)
+    abgelehnt = 0
+    t0 = time.perf_counter()
+    for n, (jetzt, kat, von, bis) in enumerate(anfragen):
+        while ablauf and ablauf[0][0] <= jetzt:
+            e_bis, _, e_kat, e_von = heapq.heappop(ablauf)
+            kalender.freigeben(*e_kat, e_von, e_bis)
+        if isinstance(kalender, Zaehler):
+            von = jetzt     # alter Service: belegt ab Anfrage
+        if kalender.reservieren(*kat, von, bis, jetzt=jetzt):
+            heapq.heappush(ablauf, (bis, n, kat, von))
+        else:
+            abgelehnt += 1
+    dauer = time.perf_counter() - t0
+    return dauer / len(anfragen) * 1e6, abgelehnt / len(anfragen)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--anfragen", type=int, default=10_000, help="Reservierungen pro Tag")
+    parser.add_argument("--tage", type=int, default=1)
+    parser.add_argument("--max-dauer", type=float, default=240, help="längste Reservierung in Minuten")
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 5, 0, 0)
+    anfragen = trace(args.anfragen, args.tage, start, args.max_dauer)
+    minuten = (args.tage + 2) * 24 * 60
+
+    print(f"{len(anfragen)} Anfragen über {args.tage} Tag(e), {sum(KAPAZITAET.values())} Plätze\n")
+    print(f"{'Variante':<13} | {'µs/Anfrage':>10} | {'abgelehnt':>9}")
+    print("-" * 39)
+    for name, kalender in [
+        ("Segmentbaum", CapacityCalendar(KAPAZITAET)),
+        ("Minutenliste", Minutenliste(KAPAZITAET, start, minuten)),
+        ("Zähler (alt)", Zaehler(KAPAZITAET)),
+    ]:
+        us, quote = replay(kalender, anfragen)
+        print(f"{name:<13} | {us:>10.1f} | {quote:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
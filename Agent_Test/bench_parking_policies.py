@@ -0,0 +1,135 @@
+"""
+bench_parking_policies.py
+
+Vergabe-Strategien des Parkplatz-Service (parking_policy.py) im Vergleich.
+
+Eine Trace (JSONL wie vom TraceRecorder, oder synthetisch) wird mit jeder
+Policy gegen den Kapazitätskalender abgespielt:
+    greedy     = erster freie Kandidat (bisheriges Verhalten)
+    reserve    = Fallbacks lassen eine feste Reserve frei
+    lookahead  = Fallbacks nur, wenn die erwartete eigene Nachfrage der
+                 Kategorie im Zeitraum sie nicht braucht (Profil aus
+                 einer separaten Lern-Trace)
+
+Synthetische Szenarien (--szenario, --lkw erhöht den Druck):
+    nacht  = viele LKW ab dem frühen Abend, die über den Fallback
+             "3× PKW" in den noch gut gefragten PKW-Bereich überlaufen,
+             dazu ein kleiner Bus-Peak am Abend
+    bus    = eine LKW-Welle am Nachmittag füllt die LKW-Plätze, bevor
+             der Bus-Peak (17–21 Uhr) beginnt; Greedy gibt die Busplätze
+             an LKW, Reserve und Lookahead halten sie für die Busse frei
+
+Berichtet: Ablehnungsquote gesamt und pro Fahrzeugart.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_parking_policies.py
+    python Agent_Test/bench_parking_policies.py --tage 14 --lkw 800 --schwelle 0.5
+    python Agent_Test/bench_parking_policies.py --szenario bus
+    python Agent_Test/bench_parking_policies.py --trace parkplatz_trace.jsonl
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Services", "Buchung_Service"))
+
+from parking_policy import (  # noqa: E402
+    DemandProfile, GreedyPolicy, LookaheadPolicy, ReserveProtectingPolicy, load_trace, simulate,
+)
+
+# wie parkplatz_kapazitaet in service_parkplatz.py
+KAPAZITAET = {
+    ("PKW", "frei"): 46, ("PKW", "lade"): 50,
+    ("PKW_Behindert", "frei"): 2, ("PKW_Behindert", "lade"): 2,
+    ("LKW", "lade"): 294, ("LKW_Behindert", "lade"): 6,
+    ("BUS", "lade"): 3,
+}
+
+# (fahrzeugart, ladestation, Anfragen pro Tag, Stunden-Gewichte, Dauer min–max in Minuten)
+NACHT = [1 if 6 <= h < 18 else 4 for h in range(24)]
+NACHMITTAG = [0.3] * 11 + [4] * 5 + [0.3] * 8
+TAG = [0.2 if h < 6 else 1 for h in range(24)]
+ABEND = [0.1] * 17 + [3, 4, 4, 2] + [0.1] * 3
+PROFIL = [
+    ("LKW", True, 700, NACHT, (240, 600)),
+    ("LKW Behindert", True, 6, NACHT, (240, 600)),
+    ("PKW", False, 500, TAG, (20, 120)),
+    ("PKW", True, 450, TAG, (30, 180)),
+    ("PKW Behindert", False, 10, TAG, (20, 120)),
+    ("PKW Behindert", True, 8, TAG, (30, 180)),
+    ("Bus", True, 5, ABEND, (45, 120)),
+]
+# LKW kommen 11–16 Uhr und bleiben lange, die Busse danach
+PROFIL_BUS = [
+    ("LKW", True, 400, NACHMITTAG, (300, 600)),
+    ("LKW Behindert", True, 6, NACHMITTAG, (240, 600)),
+    *PROFIL[2:6],
+    ("Bus", True, 4, ABEND, (45, 120)),
+]
+SZENARIEN = {"nacht": (PROFIL, 700), "bus": (PROFIL_BUS, 400)}
+
+
+def synthetic_trace(tage: int, start: datetime, seed: int, lkw: int = 700, profil=PROFIL):
+    rng = random.Random(seed)
+    out = []
+    for tag in range(tage):
+        basis = start + timedelta(days=tag)
+        for art, lade, pro_tag, gewichte, (d_min, d_max) in profil:
+            if art == "LKW":
+                pro_tag = lkw
+            for _ in range(int(rng.gauss(pro_tag, pro_tag ** 0.5))):
+                stunde = rng.choices(range(24), gewichte)[0]
+                von = basis + timedelta(hours=stunde, minutes=rng.uniform(0, 60))
+                anfrage = von - timedelta(minutes=rng.choice([0, 0, rng.uniform(0, 180)]))
+                bis = von + timedelta(minutes=rng.uniform(d_min, d_max))
+                out.append({
+                    "anfrage": anfrage.isoformat(timespec="seconds"),
+                    "fahrzeugart": art,
+                    "ladestation": lade,
+                    "von": von.isoformat(timespec="seconds"),
+                    "bis": bis.isoformat(timespec="seconds"),
+                })
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trace", default=None, help="JSONL-Trace (TraceRecorder); sonst synthetisch")
+    parser.add_argument("--lern-trace", default=None, help="Trace für das Nachfrageprofil (Standard: --trace)")
+    parser.add_argument("--tage", type=int, default=7, help="Tage der synthetischen Trace")
+    parser.add_argument("--szenario", choices=sorted(SZENARIEN), default="nacht", help="synthetische Trace")
+    parser.add_argument("--lkw", type=int, default=None, help="LKW-Anfragen pro Tag (Standard je Szenario)")
+    parser.add_argument("--schwelle", type=float, default=1.0, help="Lookahead: max. Preis eines Fallbacks")
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 5)
+    if args.trace:
+        records = load_trace(args.trace)
+        lern = load_trace(args.lern_trace) if args.lern_trace else records
+    else:
+        profil, lkw = SZENARIEN[args.szenario]
+        lkw = args.lkw or lkw
+        records = synthetic_trace(args.tage, start, seed=1, lkw=lkw, profil=profil)
+        lern = synthetic_trace(args.tage, start - timedelta(days=args.tage), seed=2, lkw=lkw, profil=profil)
+    profil = DemandProfile.from_trace(lern)
+
+    arten = sorted({r["fahrzeugart"] for r in records})
+    print(f"{len(records)} Anfragen, Profil aus {len(lern)} Anfragen\n")
+    print(f"{'Policy':<10} | {'gesamt':>7} | " + " | ".join(f"{a:>13}" for a in arten))
+    print("-" * (22 + 16 * len(arten)))
+    for name, policy in [
+        ("greedy", GreedyPolicy()),
+        ("reserve", ReserveProtectingPolicy()),
+        ("lookahead", LookaheadPolicy(profil, schwelle=args.schwelle)),
+    ]:
+        res = simulate(records, policy, KAPAZITAET)
+        gesamt = sum(res["abgelehnt"].values()) / len(records)
+        spalten = " | ".join(f"{res['abgelehnt'][a] / max(1, res['anfragen'][a]):>13.1%}" for a in arten)
+        print(f"{name:<10} | {gesamt:>7.1%} | {spalten}")
+
+
+if __name__ == "__main__":
+    main()
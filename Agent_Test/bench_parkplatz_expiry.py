@@ -0,0 +1,95 @@
+"""
+bench_parkplatz_expiry.py
+
+Vergleicht die Kosten eines Wartungs-Ticks des Parkplatz-Service:
+
+- alt: jeder Tick läuft über das ganze `reservations`-Dict (O(N))
+- neu: DeadlineIndex liefert nur die fälligen Einträge (O(k log N))
+
+Pro Tick werden gleich viele Reservierungen fällig, nur die Anzahl
+der lebenden Reservierungen wächst. Die Kosten pro Tick des Index
+sollen dabei konstant bleiben.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_parkplatz_expiry.py
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Services", "Buchung_Service"))
+
+from reservation_deadlines import DeadlineIndex  # noqa: E402
+
+
+LIVE_COUNTS = [1_000, 10_000, 100_000]
+TICKS = 50
+DUE_PER_TICK = 20
+REMINDER_MINUTES = 5
+TICK = timedelta(seconds=30)
+
+
+def build(live: int, start: datetime):
+    reservations = {}
+    index = DeadlineIndex()
+    # DUE_PER_TICK Abläufe pro Tick, der Rest liegt weit in der Zukunft
+    for i in range(live):
+        if i < TICKS * DUE_PER_TICK:
+            end = start + TICK * (i // DUE_PER_TICK + 1)
+        else:
+            end = start + timedelta(hours=2, seconds=random.randint(0, 86_400))
+        rid = f"r{i}"
+        reservations[rid] = {"end": end, "reminder_sent": False}
+        index.schedule(rid, end, reminder_at=end - timedelta(minutes=REMINDER_MINUTES))
+    return reservations, index
+
+
+def tick_scan(reservations: dict, now: datetime):
+    expired = []
+    for rid, r in reservations.items():
+        end = r["end"]
+        if not r["reminder_sent"] and now + timedelta(minutes=REMINDER_MINUTES) >= end > now:
+            r["reminder_sent"] = True
+        if now >= end:
+            expired.append(rid)
+    for rid in expired:
+        reservations.pop(rid)
+
+
+def tick_index(reservations: dict, index: DeadlineIndex, now: datetime):
+    for rid, kind in index.pop_due(now):
+        if kind == "expiry":
+            reservations.pop(rid, None)
+        else:
+            reservations[rid]["reminder_sent"] = True
+
+
+def main():
+    random.seed(1)
+    start = datetime.now()
+
+    print(f"{'live':>8} | {'scan/tick':>11} | {'index/tick':>11} | {'speed-up':>8}")
+    print("-" * 48)
+    for live in LIVE_COUNTS:
+        reservations, _ = build(live, start)
+        t0 = time.perf_counter()
+        for t in range(1, TICKS + 1):
+            tick_scan(reservations, start + TICK * t)
+        scan = (time.perf_counter() - t0) / TICKS
+
+        reservations, index = build(live, start)
+        t0 = time.perf_counter()
+        for t in range(1, TICKS + 1):
+            tick_index(reservations, index, start + TICK * t)
+        idx = (time.perf_counter() - t0) / TICKS
+
+        print(f"{live:>8} | {scan * 1e6:>9.0f}µs | {idx * 1e6:>9.1f}µs | {scan / idx:>7.0f}×")
+
+    print(f"\n({DUE_PER_TICK} Abläufe + Erinnerungen pro Tick, {TICKS} Ticks)")
+
+
+if __name__ == "__main__":
+    main()
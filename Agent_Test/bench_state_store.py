@@ -0,0 +1,144 @@
+"""
+bench_state_store.py
+
+Schreibkosten des StateStore (Agent_Services/state_store.py) pro Buchung
+und Dauer der Wiederherstellung.
+
+Jede Buchung ist ein put() einer Parkplatz-Reservierung (wie im Service)
+und ein `await store.commit()`, bevor die Bestätigung rausginge.
+--clients gleichzeitige Clients buchen jeweils nacheinander.
+
+Verglichen werden:
+    ohne Store      = nur das Dict im Speicher (bisheriger Stand)
+    WAL ohne fsync  = Zeilen werden geschrieben, aber nicht gesynct
+    fsync einzeln   = ein fsync pro Buchung (flush() nach jedem put)
+    Group-Commit    = commit(): ein fsync für alle bis dahin gepufferten
+
+Berichtet: µs pro Buchung, fsyncs pro Buchung, Commit-Latenz p50/p99.
+Danach: Öffnen mit verschieden langem WAL-Rest und mit Snapshot.
+
+Die Werte hängen stark vom Datenträger ab (SSD vs. SD-Karte am Edge-Gerät);
+für aussagekräftige Zahlen --dir auf das echte Ziel-Laufwerk legen.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_state_store.py
+    python Agent_Test/bench_state_store.py --buchungen 5000 --clients 1,16,64 --dir /var/lib/ems
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Services"))
+
+from state_store import StateStore  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def reservierung(i: int) -> dict:
+    start = datetime(2026, 1, 5, 12, 0) + timedelta(seconds=i)
+    return {
+        "sender": "agent1q" + "x" * 58,
+        "start": start.isoformat(),
+        "end": (start + timedelta(hours=1)).isoformat(),
+        "belegt": [["LKW", "lade"]],
+        "reminder_sent": False,
+    }
+
+
+async def run(variante: str, verzeichnis: str, buchungen: int, clients: int):
+    store = None
+    if variante != "ohne Store":
+        store = StateStore("bench", verzeichnis, snapshot_alle=10 ** 9, fsync=variante != "WAL ohne fsync")
+        store.open()
+    speicher = {}
+    latenzen = []
+    pro_client = buchungen // clients
+
+    async def client():
+        for i in range(pro_client):
+            rid = uuid.uuid4().hex[:8]
+            wert = reservierung(i)
+            t0 = time.perf_counter()
+            speicher[rid] = wert
+            if store is not None:
+                store.put("reservations", rid, wert)
+                if variante == "fsync einzeln":
+                    store.flush()
+                else:
+                    await store.commit()
+            latenzen.append((time.perf_counter() - t0) * 1e6)
+            await asyncio.sleep(0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    dauer = time.perf_counter() - t0
+    fsyncs = store.fsyncs if store else 0
+    if store is not None:
+        store.close()
+    n = pro_client * clients
+    return dauer / n * 1e6, fsyncs / n, latenzen
+
+
+def recovery(verzeichnis: str, eintraege: int, snapshot: bool):
+    pfad = os.path.join(verzeichnis, f"rec{eintraege}{'s' if snapshot else ''}")
+    store = StateStore("bench", pfad, snapshot_alle=10 ** 9, fsync=False)
+    store.open()
+    for i in range(eintraege):
+        store.put("reservations", f"r{i}", reservierung(i))
+    if snapshot:
+        store.snapshot()
+        for i in range(100):        # kleiner WAL-Rest nach dem Snapshot
+            store.put("reservations", f"n{i}", reservierung(i))
+    store.close()
+
+    t0 = time.perf_counter()
+    neu = StateStore("bench", pfad)
+    tabellen = neu.open()
+    dauer = (time.perf_counter() - t0) * 1000
+    neu.close()
+    return dauer, neu.wiederhergestellt, len(tabellen["reservations"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buchungen", type=int, default=2000)
+    parser.add_argument("--clients", default="1,16,64", type=lambda v: [int(x) for x in v.split(",")])
+    parser.add_argument("--dir", default=None, help="Verzeichnis auf dem Ziel-Laufwerk (Standard: temp)")
+    args = parser.parse_args()
+
+    basis = tempfile.mkdtemp(prefix="ems_state_", dir=args.dir)
+    try:
+        print(f"{args.buchungen} Buchungen, Verzeichnis {basis}\n")
+        print(f"{'Clients':>7} | {'Variante':<14} | {'µs/Buchung':>10} | {'fsync/Buchung':>13} | "
+              f"{'p50 µs':>8} | {'p99 µs':>8}")
+        print("-" * 76)
+        for clients in args.clients:
+            for variante in ["ohne Store", "WAL ohne fsync", "fsync einzeln", "Group-Commit"]:
+                verzeichnis = os.path.join(basis, f"{clients}-{variante.replace(' ', '_')}")
+                us, fsyncs, lat = asyncio.run(run(variante, verzeichnis, args.buchungen, clients))
+                print(f"{clients:>7} | {variante:<14} | {us:>10.1f} | {fsyncs:>13.3f} | "
+                      f"{percentile(lat, 0.5):>8.0f} | {percentile(lat, 0.99):>8.0f}")
+
+        print(f"\n{'Einträge':>8} | {'Snapshot':<8} | {'Öffnen ms':>9} | {'nachgespielt':>12}")
+        print("-" * 48)
+        for eintraege in [1_000, 10_000, 100_000]:
+            for snapshot in (False, True):
+                ms, replay, n = recovery(basis, eintraege, snapshot)
+                print(f"{eintraege:>8} | {'ja' if snapshot else 'nein':<8} | {ms:>9.1f} | {replay:>12}")
+    finally:
+        shutil.rmtree(basis, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
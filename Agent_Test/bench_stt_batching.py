@@ -0,0 +1,131 @@
+"""
+bench_stt_batching.py
+
+Durchsatz und Latenz des gemeinsamen STT-Servers (stt_batching.MicroBatcher)
+bei 1, 4 und 16 gleichzeitigen Sprechern.
+
+Jeder Sprecher schickt nacheinander --aeusserungen Äußerungen (mit
+zufälliger Pause dazwischen) und wartet jeweils auf das Transkript.
+Verglichen werden:
+    einzeln   = max_batch 1 (ein Modell, Anfragen strikt nacheinander)
+    Batching  = max_batch / max_wait wie eingestellt
+
+Berichtet pro Variante: Äußerungen/s, Latenz p50/p95, Ø Batchgröße.
+
+Modelle:
+    --fake (Standard)   simuliertes Modell: Batch von n kostet
+                        --fix-ms + n × --pro-ms (wie GPU/CTranslate2, wo
+                        der Encoder-Aufruf den Großteil ausmacht)
+    --whisper small     echtes Faster-Whisper; Audio aus --wav oder
+                        3 s Rauschen
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_stt_batching.py
+    python Agent_Test/bench_stt_batching.py --fix-ms 300 --pro-ms 40 --max-wait-ms 80
+    python Agent_Test/bench_stt_batching.py --whisper small --wav Agent_Test/probe.wav --aeusserungen 3
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Fahrer"))
+
+from stt_batching import MicroBatcher, whisper_batch_fn  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def fake_batch_fn(fix_ms: float, pro_ms: float):
+    def batch(audios, language=None):
+        time.sleep((fix_ms + pro_ms * len(audios)) / 1000)
+        return [f"{len(a)} Samples" for a in audios]
+    return batch
+
+
+def load_audio(path):
+    if path is None:
+        return (np.random.default_rng(0).standard_normal(3 * 16000) * 0.01).astype(np.float32)
+    import soundfile as sf
+
+    audio, sr = sf.read(path, dtype="float32")
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if sr != 16000:
+        n = int(len(audio) * 16000 / sr)
+        audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+async def run(batch_fn, audio, sprecher, aeusserungen, max_batch, max_wait_ms, pause_ms):
+    batcher = MicroBatcher(batch_fn, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    latencies = []
+    rng = random.Random(1)
+
+    async def speaker():
+        for _ in range(aeusserungen):
+            await asyncio.sleep(rng.uniform(0, pause_ms) / 1000)
+            t0 = time.perf_counter()
+            await batcher.transcribe(audio)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(speaker() for _ in range(sprecher)))
+    wall = time.perf_counter() - t0
+    await batcher.close()
+    return len(latencies) / wall, latencies, batcher.mean_batch_size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--whisper", default=None, help="Modellgröße für echtes Faster-Whisper (sonst Fake)")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--wav", default=None, help="16-kHz-Aufnahme als Testäußerung")
+    parser.add_argument("--fix-ms", type=float, default=250.0, help="Fake: Kosten pro Batch")
+    parser.add_argument("--pro-ms", type=float, default=30.0, help="Fake: Kosten pro Äußerung im Batch")
+    parser.add_argument("--sprecher", default="1,4,16", type=lambda v: [int(x) for x in v.split(",")])
+    parser.add_argument("--aeusserungen", type=int, default=10, help="Äußerungen pro Sprecher")
+    parser.add_argument("--pause-ms", type=float, default=500.0, help="max. Pause zwischen zwei Äußerungen")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=60.0)
+    args = parser.parse_args()
+
+    audio = load_audio(args.wav)
+    if args.whisper:
+        from faster_whisper import WhisperModel
+
+        model = WhisperModel(args.whisper, device=args.device, compute_type=args.compute_type)
+        batch_fn = whisper_batch_fn(model, language="de")
+        batch_fn([audio])  # Warm-up
+        print(f"Modell: faster-whisper {args.whisper} ({args.device}, {args.compute_type})")
+    else:
+        batch_fn = fake_batch_fn(args.fix_ms, args.pro_ms)
+        print(f"Modell: Fake ({args.fix_ms:.0f} ms + {args.pro_ms:.0f} ms × n pro Batch)")
+    print(f"Äußerung: {len(audio) / 16000:.1f} s, {args.aeusserungen} pro Sprecher, "
+          f"max_batch {args.max_batch}, max_wait {args.max_wait_ms:.0f} ms\n")
+
+    print(f"{'Sprecher':>8} | {'Variante':<9} | {'Äuß./s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'Ø Batch':>7}")
+    print("-" * 62)
+    for n in args.sprecher:
+        for name, max_batch, max_wait in [
+            ("einzeln", 1, 0.0),
+            ("Batching", args.max_batch, args.max_wait_ms),
+        ]:
+            rate, lat, mean_batch = asyncio.run(
+                run(batch_fn, audio, n, args.aeusserungen, max_batch, max_wait, args.pause_ms)
+            )
+            print(f"{n:>8} | {name:<9} | {rate:>7.2f} | {percentile(lat, 0.5):>8.0f} | "
+                  f"{percentile(lat, 0.95):>8.0f} | {mean_batch:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
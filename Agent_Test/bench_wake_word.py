@@ -0,0 +1,133 @@
+"""
+bench_wake_word.py
+
+Bewertet den Wake-Word-Spotter auf einem aufgenommenen Test-Korpus und
+vergleicht die CPU-Last im Leerlauf vorher/nachher.
+
+Korpus-Aufbau (16 kHz mono WAV):
+    <korpus>/positive/*.wav   Äußerungen mit "Hallo"
+    <korpus>/negative/*.wav   andere Sprache, Radio, Fahrgeräusche …
+
+Berichtet:
+- False-Accept- und False-Reject-Rate bei der eingestellten Schwelle
+  sowie für eine Schwellen-Reihe (zum Tunen von WAKE_SPOTTER_THRESHOLD)
+- CPU-Zeit pro Sekunde Audio im Leerlauf:
+    vorher  = Whisper (small, beam_size=5) auf jedem 3-s-Block
+    nachher = nur VAD; Spotter/Whisper laufen erst bei Sprache
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/bench_wake_word.py --korpus Agent_Test/wake_corpus \\
+        --templates Agent_Fahrer/wake_templates
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Fahrer"))
+
+from wake_word import WakeWordSpotter  # noqa: E402
+
+
+def load_dir(path: str):
+    clips = []
+    for f in sorted(glob.glob(os.path.join(path, "*.wav"))):
+        audio, sr = sf.read(f, dtype="float32")
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        clips.append((f, audio))
+    return clips
+
+
+def rates(pos_scores, neg_scores, threshold):
+    fr = sum(s > threshold for s in pos_scores) / max(1, len(pos_scores))
+    fa = sum(s <= threshold for s in neg_scores) / max(1, len(neg_scores))
+    return fa, fr
+
+
+def cpu_per_audio_second(fn, audio_seconds: float, repeats: int = 3) -> float:
+    t0 = time.process_time()
+    for _ in range(repeats):
+        fn()
+    return (time.process_time() - t0) / repeats / audio_seconds
+
+
+def vad_idle_cost(seconds: float = 30.0) -> float:
+    """CPU-Sekunden pro Audio-Sekunde für die VAD-Entscheidung auf Rauschen."""
+    from audio_capture import VADCapture
+
+    vad = VADCapture()
+    rng = np.random.default_rng(0)
+    frames = [
+        (rng.standard_normal(vad.frame_len) * 0.003).astype(np.float32)
+        for _ in range(int(seconds / vad.frame_s))
+    ]
+
+    def run():
+        for f in frames:
+            vad.is_speech(f)
+
+    return cpu_per_audio_second(run, seconds)
+
+
+def whisper_idle_cost() -> float:
+    """CPU-Sekunden pro Audio-Sekunde für Whisper auf einem 3-s-Block Rauschen."""
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel("small", device="cpu", compute_type="int8")
+    chunk = (np.random.default_rng(0).standard_normal(3 * 16000) * 0.003).astype(np.float32)
+
+    def run():
+        segments, _ = model.transcribe(chunk, beam_size=5, language="de")
+        list(segments)
+
+    run()  # warm-up
+    return cpu_per_audio_second(run, 3.0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--korpus", default="Agent_Test/wake_corpus")
+    parser.add_argument("--templates", default="Agent_Fahrer/wake_templates")
+    parser.add_argument("--threshold", type=float, default=0.35)
+    parser.add_argument("--ohne-whisper", action="store_true", help="Whisper-CPU-Messung überspringen")
+    args = parser.parse_args()
+
+    spotter = WakeWordSpotter(args.templates, args.threshold)
+    if not spotter.ready:
+        sys.exit(f"Keine Templates in {args.templates} (python Agent_Fahrer/wake_word.py enroll)")
+
+    positives = load_dir(os.path.join(args.korpus, "positive"))
+    negatives = load_dir(os.path.join(args.korpus, "negative"))
+    if not positives or not negatives:
+        sys.exit(f"Korpus unvollständig: {args.korpus}/positive und /negative benötigt")
+
+    t0 = time.perf_counter()
+    pos_scores = [spotter.score(a) for _, a in positives]
+    neg_scores = [spotter.score(a) for _, a in negatives]
+    per_clip_ms = (time.perf_counter() - t0) / (len(positives) + len(negatives)) * 1000
+
+    fa, fr = rates(pos_scores, neg_scores, args.threshold)
+    print(f"Korpus: {len(positives)} positiv, {len(negatives)} negativ, {len(spotter.templates)} Templates")
+    print(f"Spotter: {per_clip_ms:.1f} ms pro Äußerung")
+    print(f"\nSchwelle {args.threshold:.2f}: False-Accept {fa:.1%}, False-Reject {fr:.1%}\n")
+
+    print(f"{'Schwelle':>8} | {'FA':>6} | {'FR':>6}")
+    print("-" * 26)
+    for thr in np.arange(0.15, 0.56, 0.05):
+        fa, fr = rates(pos_scores, neg_scores, thr)
+        print(f"{thr:>8.2f} | {fa:>6.1%} | {fr:>6.1%}")
+
+    print("\nCPU im Leerlauf (CPU-s pro Audio-s, 1.0 = ein voller Kern):")
+    print(f"  nachher (nur VAD):             {vad_idle_cost():.4f}")
+    if not args.ohne_whisper:
+        print(f"  vorher  (Whisper alle 3 s):    {whisper_idle_cost():.4f}")
+
+
+if __name__ == "__main__":
+    main()
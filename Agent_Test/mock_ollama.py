@@ -0,0 +1,204 @@
+"""
+mock_ollama.py
+
+Kleiner Ollama-Stub für Benchmarks des Intent-Classifiers ohne GPU/Cloud.
+
+- /api/chat antwortet mit dem JSON des regelbasierten Matchers
+  (Fehlschläge -> "unknown"), nach einer einstellbaren Rechenzeit
+- simuliert den Prompt-Cache: weicht der Nachrichten-Präfix vom zuletzt
+  gesehenen ab, kostet die Anfrage zusätzlich --prefix-ms
+- simuliert den Verbindungsaufbau (TCP/TLS zu einem entfernten Server):
+  jede neue Verbindung kostet einmalig --handshake-ms
+- Rechenzeit pro Modell einstellbar (model_latency_ms), z. B. großes
+  Cloud-Modell langsam, kleines lokales schnell – für Hedging-Tests
+- "stream": true -> NDJSON-Chunks (chunked) mit --token-ms pro Token;
+  die Antwort steht wie bei vielen Modellen in einem ```json-Zaun mit
+  einem Satz Erklärung dahinter. Trennt der Client die Verbindung,
+  bricht die "Generierung" ab (gezählt in cancelled)
+- /api/tags listet das Modell, damit test_connection() funktioniert
+
+Start als eigener Prozess:
+    python Agent_Test/mock_ollama.py --port 11435 --latenz-ms 40
+
+oder im Benchmark über start_mock_server().
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Fahrer"))
+
+from intent_classifier import RuleBasedIntentMatcher  # noqa: E402
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Standard 5 verwirft SYNs bei vielen parallelen Clients
+
+    def __init__(self, address, model="mock", latency_ms=40.0, prefix_ms=200.0, handshake_ms=0.0,
+                 token_ms=0.0, model_latency_ms=None):
+        super().__init__(address, MockOllamaHandler)
+        self.model = model
+        self.latency_ms = latency_ms
+        self.prefix_ms = prefix_ms
+        self.handshake_ms = handshake_ms
+        self.token_ms = token_ms
+        self.model_latency_ms = model_latency_ms or {}
+        self.matcher = RuleBasedIntentMatcher()
+        self.cached_prefix = None
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.prefix_misses = 0
+        self.cancelled = 0
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive wie der echte Ollama-Server
+    # Header und Body in einem Segment, sonst misst man auf einer
+    # Keep-alive-Verbindung nur Nagle + Delayed-ACK (~40 ms)
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.handshake_ms / 1000)
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client hat den Stream abgebrochen
+
+    def finish(self):
+        try:
+            super().finish()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.model}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path != "/api/chat":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        messages = body.get("messages", [])
+        prefix = hashlib.sha256(json.dumps(messages[:-1], sort_keys=True).encode("utf-8")).digest()
+        with self.server.lock:
+            self.server.requests += 1
+            prefix_hit = prefix == self.server.cached_prefix
+            if not prefix_hit:
+                self.server.prefix_misses += 1
+                self.server.cached_prefix = prefix
+
+        model = body.get("model", self.server.model)
+        latency = self.server.model_latency_ms.get(model, self.server.latency_ms)
+        delay = latency + (0 if prefix_hit else self.server.prefix_ms)
+        time.sleep(delay / 1000)
+
+        text = messages[-1]["content"] if messages else ""
+        intent = self.server.matcher.match(text)
+        if intent is None:
+            reply = {"action": "unknown", "parameters": {}, "confidence": 0.5}
+        else:
+            reply = {"action": intent.action, "parameters": intent.parameters, "confidence": 0.9}
+
+        content = json.dumps(reply, ensure_ascii=False)
+
+        if body.get("stream", True):
+            self._stream_reply(model, content)
+            return
+
+        # ohne Streaming wird die ganze Antwort generiert, bevor etwas rausgeht
+        time.sleep(self.server.token_ms * len(self._tokens(content)) / 1000)
+        self._send_json(200, {
+            "model": model,
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+        })
+
+    @staticmethod
+    def _tokens(content: str):
+        text = "```json\n" + content + "\n```\nDie Anfrage betrifft eine Buchung an der Raststätte."
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+    def _stream_reply(self, model: str, content: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in self._tokens(content):
+                time.sleep(self.server.token_ms / 1000)
+                self._write_chunk({"model": model, "message": {"role": "assistant", "content": token}, "done": False})
+            self._write_chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server.lock:
+                self.server.cancelled += 1
+            self.close_connection = True
+
+    def _write_chunk(self, obj: dict):
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_mock_server(port: int = 0, **kwargs) -> MockOllamaServer:
+    """Startet den Stub in einem Hintergrund-Thread; port=0 wählt einen freien Port."""
+    server = MockOllamaServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="gpt-oss:20b-cloud")
+    parser.add_argument("--latenz-ms", type=float, default=40.0, help="Rechenzeit pro Anfrage")
+    parser.add_argument("--prefix-ms", type=float, default=200.0, help="Zusatzkosten bei neuem Prompt-Präfix")
+    parser.add_argument("--handshake-ms", type=float, default=0.0, help="Kosten pro neuer Verbindung")
+    parser.add_argument("--token-ms", type=float, default=0.0, help="Generierungszeit pro Token")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(
+        ("127.0.0.1", args.port),
+        model=args.model,
+        latency_ms=args.latenz_ms,
+        prefix_ms=args.prefix_ms,
+        handshake_ms=args.handshake_ms,
+        token_ms=args.token_ms,
+    )
+    print(f"Mock-Ollama auf http://127.0.0.1:{args.port} (Modell {args.model})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -12,11 +12,13 @@ class EssenMessage(Model):
     vegan: int
     glutenfrei: int
     client_sender: str
+    idempotency_key: str = ""
 
 class KaffeeMessage(Model):
     type: str
     zeit: str
     client_sender: str
+    idempotency_key: str = ""
 
 class HaustierMessage(Model):
     type: str
@@ -25,6 +27,7 @@ class HaustierMessage(Model):
     betreuung_von: str
     betreuung_bis: str
     client_sender: str
+    idempotency_key: str = ""
 
 class HotelMessage(Model):
     type: str
@@ -32,6 +35,7 @@ class HotelMessage(Model):
     zeit: str
     naechte: int
     client_sender: str
+    idempotency_key: str = ""
 
 class ParkplatzMessage(Model):
     type: str
@@ -40,6 +44,8 @@ class ParkplatzMessage(Model):
     zeit: str
     reservation_id: str
     client_sender: str
+    idempotency_key: str = ""
+    von: str = ""   # Beginn "HH:MM" (leer = sofort), zeit = Ende
 
 
 class CentralServiceMessage(Model):
@@ -64,6 +70,14 @@ testAgent = Agent(
 )
 
 
+# Feste Schlüssel: jede Wiederholung ist dieselbe Buchung und wird
+# von den Services nur einmal belegt (Bestätigung wird erneut gesendet)
+idempotency_keys = {
+    t: str(uuid.uuid4())
+    for t in ("essensservice", "kaffee", "haustierbetreuung", "hotel", "parkplatz")
+}
+
+
 @testAgent.on_interval(period=10)
 async def send_test_msgs(ctx: Context):
 
@@ -79,13 +93,15 @@ async def send_test_msgs(ctx: Context):
             vegetarisch=2,
             vegan=0,
             glutenfrei=1,
-            client_sender=testAgent.address
+            client_sender=testAgent.address,
+            idempotency_key=idempotency_keys["essensservice"]
         ).dict(),
 
         KaffeeMessage(
             type="kaffee",
             zeit=in_10_min,
-            client_sender=testAgent.address
+            client_sender=testAgent.address,
+            idempotency_key=idempotency_keys["kaffee"]
         ).dict(),
 
         HaustierMessage(
@@ -94,7 +110,8 @@ async def send_test_msgs(ctx: Context):
             zeit=jetzt,
             betreuung_von=jetzt,
             betreuung_bis=in_10_min,
-            client_sender=testAgent.address
+            client_sender=testAgent.address,
+            idempotency_key=idempotency_keys["haustierbetreuung"]
         ).dict(),
 
         HotelMessage(
@@ -102,7 +119,8 @@ async def send_test_msgs(ctx: Context):
             zimmerart="Einzelzimmer",
             zeit=jetzt,
             naechte=2,
-            client_sender=testAgent.address
+            client_sender=testAgent.address,
+            idempotency_key=idempotency_keys["hotel"]
         ).dict(),
 
         ParkplatzMessage(
@@ -111,7 +129,8 @@ async def send_test_msgs(ctx: Context):
             ladestation=True,
             zeit=in_10_min,
             reservation_id=str(uuid.uuid4())[:8],
-            client_sender=testAgent.address
+            client_sender=testAgent.address,
+            idempotency_key=idempotency_keys["parkplatz"]
         ).dict(),
     ]
 
@@ -0,0 +1,51 @@
+"""
+test_slot_allocator.py
+
+Prüft SlotAllocator.restore(): belegte Fächer oberhalb der Kapazität
+(z. B. nach Verkleinern von GARDEROBE_MAX_SLOTS) dürfen die
+Hochwassermarke nicht über max_slots heben.
+
+Aufruf (aus dem Repo-Root):
+    python Agent_Test/test_slot_allocator.py
+    (oder mit pytest)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Agent_Services", "Garderobe_Service"))
+
+from slot_allocator import SlotAllocator  # noqa: E402
+
+
+def fach(qr: str) -> dict:
+    return {"artikel": "Jacke", "qr": qr, "token_typ": "digital"}
+
+
+def test_restore_fuellt_luecken():
+    faecher = SlotAllocator(5)
+    faecher.restore({0: fach("a"), 3: fach("b")})
+    assert [faecher.allocate(fach(f"n{i}")) for i in range(4)] == [1, 2, 4, None]
+
+
+def test_restore_ueber_kapazitaet():
+    faecher = SlotAllocator(3)
+    faecher.restore({1: fach("a"), 7: fach("b")})
+
+    # Fach 7 bleibt abholbar ...
+    assert faecher.release_by_qr("b") == (7, fach("b"))
+    # ... aber vergeben werden nur 0 und 2, nie mehr als max_slots Fächer
+    vergeben = [faecher.allocate(fach(f"n{i}")) for i in range(3)]
+    assert vergeben == [0, 2, None]
+    assert len(faecher) == 3
+
+
+def main():
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()